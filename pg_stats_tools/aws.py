@@ -1,22 +1,65 @@
 """"AWS boto functions for pi_reports"""
 
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Any, List, Literal
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Literal, Sequence, Union
 
 from boto3.session import Session
+from botocore.config import Config
 from mypy_boto3_pi.client import PIClient
 from mypy_boto3_pi.type_defs import GetResourceMetricsResponseTypeDef, MetricQueryTypeDef
 from mypy_boto3_rds.client import RDSClient
 from mypy_boto3_rds.type_defs import DBInstanceMessageTypeDef
 
+from pg_stats_tools.aws_metadata import InstanceMetadata, InstanceMetadataCache
+from pg_stats_tools.pi import (
+    PI_MAX_RESULTS,
+    PI_WINDOW_POINTS,
+    MetricSeries,
+    MetricsSeries,
+    PeriodPlan,
+    expected_points,
+    merge_series,
+    metric_key,
+    plan_period,
+    time_windows,
+)
+from pg_stats_tools.pi_cache import PI_DEFAULT_RETENTION_DAYS, PIMetricsCache
+from pg_stats_tools.throttle import AdaptiveRateLimiter, call_with_backoff
 from pg_stats_tools.time import parse_time
 
+# HTTP connections kept open by each client, one per concurrent request
+AWS_MAX_POOL_CONNECTIONS = 10
+
+_clients_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def aws_session(aws_profile: str, aws_region: str) -> Session:
+    return Session(profile_name=aws_profile, region_name=aws_region)
+
+
+def aws_client(aws_profile: str, aws_region: str, service_name: str, max_pool_connections: int = AWS_MAX_POOL_CONNECTIONS) -> Any:
+    """Client of service_name, created once per profile, region and pool size and reused afterwards"""
+    with _clients_lock:
+        # Sessions are not thread safe, clients are
+        return _aws_client(aws_profile, aws_region, service_name, max_pool_connections)
+
+
+@lru_cache(maxsize=None)
+def _aws_client(aws_profile: str, aws_region: str, service_name: str, max_pool_connections: int) -> Any:
+    return aws_session(aws_profile, aws_region).client(service_name, config=Config(max_pool_connections=max_pool_connections))  # type: ignore
+
 
 class PIAwsClient:
     """PI AWS Client"""
 
-    def __init__(self) -> None:
+    def __init__(self, rate_limiter: Union[AdaptiveRateLimiter, None] = None) -> None:
         self._pi_client: PIClient
+        self._rate_limiter = rate_limiter or AdaptiveRateLimiter()
+        self._pi_cache: Union[PIMetricsCache, None] = None
 
     def pi_get_resource_metrics(
         self,
@@ -26,46 +69,228 @@ class PIAwsClient:
         start_time: datetime,
         end_time: datetime,
         period_in_seconds: int = 3600,
-        max_results: int = 100,
-        next_token: str = "string",
+        max_results: int = PI_MAX_RESULTS,
+        next_token: Union[str, None] = None,
         period_alignment: Literal["END_TIME", "START_TIME"] = "END_TIME",
     ) -> GetResourceMetricsResponseTypeDef:
-        result: GetResourceMetricsResponseTypeDef = self._pi_client.get_resource_metrics(
-            ServiceType=service_type,
-            Identifier=identifier,
-            MetricQueries=metric_queries,
-            StartTime=start_time,
-            EndTime=end_time,
-            PeriodInSeconds=period_in_seconds,
-            MaxResults=max_results,
-            NextToken=next_token,
-            PeriodAlignment=period_alignment,
+        """One page of metrics. The first page is requested without next_token. Calls are rate limited and retried when throttled"""
+        pagination: Any = {"NextToken": next_token} if next_token else {}
+        result: GetResourceMetricsResponseTypeDef = call_with_backoff(
+            lambda: self._pi_client.get_resource_metrics(
+                ServiceType=service_type,
+                Identifier=identifier,
+                MetricQueries=metric_queries,
+                StartTime=start_time,
+                EndTime=end_time,
+                PeriodInSeconds=period_in_seconds,
+                MaxResults=max_results,
+                PeriodAlignment=period_alignment,
+                **pagination,
+            ),
+            self._rate_limiter,
         )
         return result
 
+    def pi_iter_resource_metrics(
+        self,
+        service_type: Literal["DOCDB", "RDS"],
+        identifier: str,
+        metric_queries: List[MetricQueryTypeDef],
+        start_time: datetime,
+        end_time: datetime,
+        period_in_seconds: int = 3600,
+        max_results: int = PI_MAX_RESULTS,
+        period_alignment: Literal["END_TIME", "START_TIME"] = "END_TIME",
+    ) -> Iterator[MetricsSeries]:
+        """
+        Follow NextToken until the last page. Datapoints of each page are copied into one MetricSeries per metric,
+        preallocated for the whole time range, and the series are yielded after each page. Pages are not kept
+        """
+        capacity = expected_points(start_time, end_time, period_in_seconds)
+        series: MetricsSeries = {}
+        next_token: Union[str, None] = None
+        while True:
+            page = self.pi_get_resource_metrics(
+                service_type=service_type,
+                identifier=identifier,
+                metric_queries=metric_queries,
+                start_time=start_time,
+                end_time=end_time,
+                period_in_seconds=period_in_seconds,
+                max_results=max_results,
+                next_token=next_token,
+                period_alignment=period_alignment,
+            )
+            for metric in page.get("MetricList", []):
+                key = metric_key(metric["Key"])
+                if key not in series:
+                    series[key] = MetricSeries(key, capacity)
+                series[key].append(metric.get("DataPoints", []))
+            yield series
+            next_token = page.get("NextToken")
+            if not next_token:
+                return
+
+    def pi_get_all_resource_metrics(
+        self,
+        service_type: Literal["DOCDB", "RDS"],
+        identifier: str,
+        metric_queries: List[MetricQueryTypeDef],
+        start_time: datetime,
+        end_time: datetime,
+        period_in_seconds: int = 3600,
+        max_results: int = PI_MAX_RESULTS,
+        period_alignment: Literal["END_TIME", "START_TIME"] = "END_TIME",
+    ) -> MetricsSeries:
+        """Series of every page"""
+        series: MetricsSeries = {}
+        for page_series in self.pi_iter_resource_metrics(
+            service_type=service_type,
+            identifier=identifier,
+            metric_queries=metric_queries,
+            start_time=start_time,
+            end_time=end_time,
+            period_in_seconds=period_in_seconds,
+            max_results=max_results,
+            period_alignment=period_alignment,
+        ):
+            series = page_series
+        return series
+
+    def pi_get_sharded_resource_metrics(
+        self,
+        service_type: Literal["DOCDB", "RDS"],
+        identifier: str,
+        metric_queries: List[MetricQueryTypeDef],
+        start_time: datetime,
+        end_time: datetime,
+        period_in_seconds: int = 3600,
+        max_results: int = PI_MAX_RESULTS,
+        period_alignment: Literal["END_TIME", "START_TIME"] = "END_TIME",
+        max_workers: int = AWS_MAX_POOL_CONNECTIONS,
+        window_points: int = PI_WINDOW_POINTS,
+    ) -> MetricsSeries:
+        """
+        Series of the range split in time windows of window_points datapoints. Windows are fetched on max_workers threads,
+        sharing the rate limiter, and merged in time order
+        """
+        windows = time_windows(start_time, end_time, period_in_seconds, window_points)
+        if len(windows) == 1 or max_workers <= 1:
+            return self.pi_get_all_resource_metrics(
+                service_type, identifier, metric_queries, start_time, end_time, period_in_seconds, max_results, period_alignment
+            )
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(windows)), thread_name_prefix="pi") as executor:
+            parts = list(
+                executor.map(
+                    lambda window: self.pi_get_all_resource_metrics(
+                        service_type, identifier, metric_queries, window[0], window[1], period_in_seconds, max_results, period_alignment
+                    ),
+                    windows,
+                )
+            )
+        return merge_series(parts, expected_points(start_time, end_time, period_in_seconds))
+
+    def pi_get_cached_resource_metrics(
+        self,
+        service_type: Literal["DOCDB", "RDS"],
+        identifier: str,
+        metric_queries: List[MetricQueryTypeDef],
+        start_time: datetime,
+        end_time: datetime,
+        period_in_seconds: int = 3600,
+        max_results: int = PI_MAX_RESULTS,
+        period_alignment: Literal["END_TIME", "START_TIME"] = "END_TIME",
+        max_workers: int = AWS_MAX_POOL_CONNECTIONS,
+        retention_days: int = PI_DEFAULT_RETENTION_DAYS,
+    ) -> MetricsSeries:
+        """Series of the range, only fetching from PI the parts missing from the local cache (and its open tail)"""
+        if self._pi_cache is None:
+            return self.pi_get_sharded_resource_metrics(
+                service_type, identifier, metric_queries, start_time, end_time, period_in_seconds, max_results, period_alignment, max_workers
+            )
+        gaps = self._pi_cache.gaps(identifier, list(metric_queries), period_in_seconds, start_time, end_time, retention_days, period_alignment=period_alignment)
+        for gap_start, gap_end in gaps:
+            series = self.pi_get_sharded_resource_metrics(
+                service_type, identifier, metric_queries, gap_start, gap_end, period_in_seconds, max_results, period_alignment, max_workers
+            )
+            self._pi_cache.put(identifier, list(metric_queries), period_in_seconds, gap_start, gap_end, series, period_alignment=period_alignment)
+        return self._pi_cache.get(identifier, list(metric_queries), period_in_seconds, start_time, end_time, period_alignment)
+
 
 class RDSAwsCClient:
     """RDS AWS Client"""
 
     def __init__(self) -> None:
         self._rds_client: RDSClient
+        self._aws_profile = ""
+        self._aws_region = ""
+        self._metadata_cache: Union[InstanceMetadataCache, None] = None
 
-    def _rds_get_attribute(self, db_instance_identifier: str, attr_name: str) -> Any:
+    def rds_get_instance_metadata(self, db_instance_identifier: str) -> InstanceMetadata:
+        """Metadata of the instance, from the local cache when available. DescribeDBInstances is only called on a miss"""
+        if self._metadata_cache is not None:
+            metadata = self._metadata_cache.get(self._aws_profile, self._aws_region, db_instance_identifier)
+            if metadata is not None:
+                return metadata
         response: DBInstanceMessageTypeDef = self._rds_client.describe_db_instances(DBInstanceIdentifier=db_instance_identifier)
-        return response["DBInstances"][0][attr_name]  # type: ignore # pyright: ignore[reportUnknownVariableType]
+        metadata = InstanceMetadata.from_db_instance(response["DBInstances"][0])
+        if self._metadata_cache is not None:
+            self._metadata_cache.put(self._aws_profile, self._aws_region, db_instance_identifier, metadata)
+        return metadata
 
     def rds_get_database_instance_resource_id(self, db_instance_identifier: str) -> str:
-        return str(self._rds_get_attribute(db_instance_identifier=db_instance_identifier, attr_name="DbiResourceId"))
+        return self.rds_get_instance_metadata(db_instance_identifier).resource_id
+
+    def rds_find_db_instances(self, tags: Dict[str, str], engines: Sequence[str] = ("postgres", "aurora-postgresql")) -> List[Any]:
+        """Available DBInstances of engines having every tag (key: value) of tags"""
+        instances: List[Any] = []
+        paginator = self._rds_client.get_paginator("describe_db_instances")
+        for page in paginator.paginate(Filters=[{"Name": "engine", "Values": list(engines)}]):
+            for db_instance in page["DBInstances"]:
+                instance_tags = {tag.get("Key"): tag.get("Value") for tag in db_instance.get("TagList", [])}
+                if db_instance.get("DBInstanceStatus") == "available" and all(instance_tags.get(key) == value for key, value in tags.items()):
+                    instances.append(db_instance)
+        return instances
 
 
 class AWSClient(PIAwsClient, RDSAwsCClient):
-    """AWS Client"""
+    """AWS Client. boto3 clients are created on first use and shared by every AWSClient of the same profile and region"""
+
+    def __init__(
+        self,
+        aws_profile: str,
+        aws_region: str,
+        max_pool_connections: int = AWS_MAX_POOL_CONNECTIONS,
+        metadata_cache: Union[InstanceMetadataCache, None] = None,
+        rate_limiter: Union[AdaptiveRateLimiter, None] = None,
+        pi_cache: Union[PIMetricsCache, None] = None,
+    ) -> None:
+        super().__init__(rate_limiter)
+        self._pi_cache = pi_cache if pi_cache is not None else PIMetricsCache()
+        self._aws_profile = aws_profile
+        self._aws_region = aws_region
+        self._max_pool_connections = max_pool_connections
+        self._metadata_cache = metadata_cache if metadata_cache is not None else InstanceMetadataCache()
+
+    @property
+    def _pi_client(self) -> PIClient:  # type: ignore[override]
+        return aws_client(self._aws_profile, self._aws_region, "pi", self._max_pool_connections)  # type: ignore[no-any-return]
 
-    def __init__(self, aws_profile: str, aws_region: str) -> None:
-        super().__init__()
-        self._session: Session = Session(profile_name=aws_profile, region_name=aws_region)
-        self._pi_client: PIClient = self._session.client("pi")  # pyright: ignore[reportUnknownMemberType]
-        self._rds_client: RDSClient = self._session.client("rds")  # pyright: ignore[reportUnknownMemberType]
+    @property
+    def _rds_client(self) -> RDSClient:  # type: ignore[override]
+        return aws_client(self._aws_profile, self._aws_region, "rds", self._max_pool_connections)  # type: ignore[no-any-return]
+
+    def plan_resource_metrics_for_db_instance(
+        self,
+        metric_queries: List[MetricQueryTypeDef],
+        time: datetime,
+        time_delta: str,
+        max_points: Union[int, None] = None,
+        max_results: int = PI_MAX_RESULTS,
+    ) -> PeriodPlan:
+        """Period and number of calls of get_resource_metrics_for_db_instance without period_in_seconds, nothing is fetched"""
+        start_time, end_time = parse_time(time, time_delta)
+        return plan_period(start_time, end_time, metric_queries, max_points=max_points, max_results=max_results)
 
     def get_resource_metrics_for_db_instance(
         self,
@@ -74,26 +299,30 @@ class AWSClient(PIAwsClient, RDSAwsCClient):
         metric_queries: List[MetricQueryTypeDef],
         time: datetime,
         time_delta: str,
-        period_in_seconds: int = 3600,
-        max_results: int = 100,
-        next_token: str = "string",
+        period_in_seconds: Union[int, None] = None,
+        max_results: int = PI_MAX_RESULTS,
         period_alignment: Literal["END_TIME", "START_TIME"] = "END_TIME",
-    ) -> GetResourceMetricsResponseTypeDef:
+        max_points: Union[int, None] = None,
+    ) -> MetricsSeries:
+        """Metrics of the time range. Without period_in_seconds, the period is planned for max_points points per series"""
         start_time, end_time = parse_time(time, time_delta)
+        if period_in_seconds is None:
+            period_in_seconds = plan_period(start_time, end_time, metric_queries, max_points=max_points, max_results=max_results).period_in_seconds
 
-        if service_type == "RDS":
-            resource_identifier: str = RDSAwsCClient.rds_get_database_instance_resource_id(self, db_instance_identifier=db_instance_identifier)
-        else:
-            raise NotImplementedError(f"Service type {service_type} not implemented")
+        # DescribeDBInstances of the RDS API describes DocumentDB instances as well, both share the cached metadata
+        metadata = self.rds_get_instance_metadata(db_instance_identifier=db_instance_identifier)
+        if (service_type == "DOCDB") != (metadata.engine == "docdb"):
+            raise ValueError(f"Instance {db_instance_identifier} runs {metadata.engine}, it can not be queried as {service_type}")
 
-        return self.pi_get_resource_metrics(
+        return self.pi_get_cached_resource_metrics(
             service_type=service_type,
-            identifier=resource_identifier,
+            identifier=metadata.resource_id,
             metric_queries=metric_queries,
             start_time=start_time,
             end_time=end_time,
             period_in_seconds=period_in_seconds,
             max_results=max_results,
-            next_token=next_token,
             period_alignment=period_alignment,
+            max_workers=self._max_pool_connections,
+            retention_days=metadata.performance_insights_retention_period or PI_DEFAULT_RETENTION_DAYS,
         )
@@ -0,0 +1,70 @@
+"""RDS instance metadata, kept in a local cache between runs"""
+
+import os
+import sqlite3
+import time
+from contextlib import closing
+from typing import Any, NamedTuple, Union
+
+# Resource ids never change, engine version and PI settings rarely do
+INSTANCE_METADATA_TTL = 24 * 3600
+
+
+class InstanceMetadata(NamedTuple):
+    """Attributes of an instance used by PI reports"""
+
+    resource_id: str
+    engine: str
+    engine_version: str
+    performance_insights_enabled: bool
+    performance_insights_retention_period: Union[int, None]
+
+    @classmethod
+    def from_db_instance(cls, db_instance: Any) -> "InstanceMetadata":
+        """Metadata of a DescribeDBInstances DBInstances item"""
+        return cls(
+            resource_id=db_instance["DbiResourceId"],
+            engine=db_instance.get("Engine", ""),
+            engine_version=db_instance.get("EngineVersion", ""),
+            performance_insights_enabled=bool(db_instance.get("PerformanceInsightsEnabled", False)),
+            performance_insights_retention_period=db_instance.get("PerformanceInsightsRetentionPeriod"),
+        )
+
+
+class InstanceMetadataCache:
+    """
+    Persistent (profile, region, identifier) -> InstanceMetadata map, stored in a sqlite file.
+    Entries older than ttl seconds are not returned.
+    """
+
+    def __init__(self, path: Union[str, None] = None, ttl: float = INSTANCE_METADATA_TTL) -> None:
+        if path is None:
+            from pg_stats_tools.cache import cache_dir
+
+            path = os.path.join(cache_dir(), "instance_metadata.sqlite")
+        self.path = path
+        self.ttl = ttl
+        with closing(sqlite3.connect(self.path, timeout=30)) as db, db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS instance_metadata ("
+                "profile TEXT, region TEXT, identifier TEXT, resource_id TEXT, engine TEXT, engine_version TEXT, "
+                "pi_enabled INTEGER, pi_retention_period INTEGER, stored REAL, PRIMARY KEY (profile, region, identifier))"
+            )
+
+    def get(self, profile: str, region: str, identifier: str) -> Union[InstanceMetadata, None]:
+        with closing(sqlite3.connect(self.path, timeout=30)) as db:
+            row = db.execute(
+                "SELECT resource_id, engine, engine_version, pi_enabled, pi_retention_period FROM instance_metadata "
+                "WHERE profile = ? AND region = ? AND identifier = ? AND stored >= ?",
+                (profile, region, identifier, time.time() - self.ttl),
+            ).fetchone()
+        if row is None:
+            return None
+        return InstanceMetadata(row[0], row[1], row[2], bool(row[3]), row[4])
+
+    def put(self, profile: str, region: str, identifier: str, metadata: InstanceMetadata) -> None:
+        with closing(sqlite3.connect(self.path, timeout=30)) as db, db:
+            db.execute(
+                "INSERT OR REPLACE INTO instance_metadata VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (profile, region, identifier, *metadata, time.time()),
+            )
@@ -0,0 +1,12 @@
+"""Local on-disk caches shared by cli runs"""
+
+import os
+
+
+def cache_dir() -> str:
+    """Directory of the local caches: $PG_STATS_TOOLS_CACHE_DIR, else $XDG_CACHE_HOME/pg_stats_tools, else ~/.cache/pg_stats_tools"""
+    path = os.environ.get("PG_STATS_TOOLS_CACHE_DIR") or os.path.join(
+        os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "pg_stats_tools"
+    )
+    os.makedirs(path, exist_ok=True)
+    return path
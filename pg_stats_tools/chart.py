@@ -0,0 +1,61 @@
+"""Terminal charts of PI metric series"""
+
+import shutil
+from typing import List, Union
+
+import numpy as np
+from rich.console import Group
+from rich.panel import Panel
+from rich.text import Text
+
+from pg_stats_tools.downsample import FloatArray, lttb, min_max_envelope
+from pg_stats_tools.pi import MetricSeries
+
+SPARK_BLOCKS = "▁▂▃▄▅▆▇█"
+
+
+def _scale(values: FloatArray, low: float, high: float, levels: int) -> FloatArray:
+    return np.clip((values - low) / ((high - low) or 1) * levels, 0, levels - 1)
+
+
+def sparkline(values: FloatArray, low: Union[float, None] = None, high: Union[float, None] = None) -> str:
+    """One block character per value, missing values are blank"""
+    if not np.isfinite(values).any():
+        return " " * len(values)
+    low = float(np.nanmin(values)) if low is None else low
+    high = float(np.nanmax(values)) if high is None else high
+    levels = _scale(np.nan_to_num(values, nan=low), low, high, len(SPARK_BLOCKS)).astype(np.int64)
+    return "".join(" " if not np.isfinite(value) else SPARK_BLOCKS[level] for value, level in zip(values.tolist(), levels.tolist()))
+
+
+def envelope_rows(mins: FloatArray, maxs: FloatArray, height: int) -> List[str]:
+    """Rows of a column chart, top first, each column filled from the minimum to the maximum of its bucket"""
+    if not np.isfinite(maxs).any():
+        return [" " * len(maxs)] * height
+    low, high = float(np.nanmin(mins)), float(np.nanmax(maxs))
+    bottom = np.floor(_scale(np.nan_to_num(mins, nan=np.inf), low, high, height))
+    top = np.floor(_scale(np.nan_to_num(maxs, nan=-np.inf), low, high, height))
+    rows = np.arange(height - 1, -1, -1)[:, np.newaxis]
+    filled = (rows >= bottom) & (rows <= top) & np.isfinite(maxs)
+    return ["".join(np.where(row, "█", " ")) for row in filled]
+
+
+def series_chart(series: MetricSeries, width: Union[int, None] = None, height: int = 8) -> Panel:
+    """
+    Chart of a series in width columns: a sparkline of the points selected by LTTB,
+    over a min/max envelope of the same number of buckets
+    """
+    width = width or shutil.get_terminal_size().columns - 4
+    values = series.values
+    x = series.timestamps.astype(np.int64).astype(np.float64)
+    line = values[lttb(x, values, width)]
+    mins, maxs = min_max_envelope(values, width)
+    finite = values[np.isfinite(values)]
+    summary = f"min {finite.min():g}  max {finite.max():g}  last {finite[-1]:g}" if len(finite) else "no data"
+    first, last = (str(series.timestamps[0]), str(series.timestamps[-1])) if len(series) else ("", "")
+    return Panel(
+        Group(Text(sparkline(line), style="cyan"), Text("\n".join(envelope_rows(mins, maxs, height)), style="blue"), Text(summary, style="dim")),
+        title=str(series.key),
+        title_align="left",
+        subtitle=f"{first} - {last}" if first else None,
+    )
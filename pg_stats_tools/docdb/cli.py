@@ -1,7 +1,122 @@
 """cli for docdb reports"""
-# import typer
 
-# app = typer.Typer(
-#     help="""Performance Insights Reports for docdb
-#     """
-# )
+from typing import Annotated, Any, Dict, List, Union
+
+import typer
+
+from pg_stats_tools.aws import AWSClient
+from pg_stats_tools.docdb.reports import DOCDB_COUNTER_METRICS, DocDBCounterMetrics, DocDBLoadByWaitState, DocDBTopOperations
+from pg_stats_tools.format import TableFormatOption
+from pg_stats_tools.output import OutputFormat, ReportOutput
+from pg_stats_tools.time_fn import parse_timestamp
+
+docdb = typer.Typer(
+    help="""Performance Insights Reports for DocumentDB
+    """
+)
+
+DbInstanceArgument = Annotated[str, typer.Argument(help="DocumentDB instance identifier")]
+AwsProfileOption = Annotated[str, typer.Option(help="AWS profile", envvar="AWS_PROFILE")]
+AwsRegionOption = Annotated[str, typer.Option(help="AWS region", envvar="AWS_REGION")]
+TimeOption = Annotated[
+    Union[str, None],
+    typer.Option(help="Time the range is relative to, ISO format (e.g., 'YYYY-MM-DDTHH:MM:SS'). Default: now"),
+]
+TimeDeltaOption = Annotated[
+    str,
+    typer.Option(help="Range from time: -1h is the hour before time, 2d the two days after it. Units: w, d, h, m"),
+]
+PeriodOption = Annotated[
+    Union[int, None],
+    typer.Option(help="Datapoint period in seconds (1, 60, 300, 3600, 86400). Default: the finest one fitting the terminal width"),
+]
+ChartOption = Annotated[bool, typer.Option(help="Chart every series below the table")]
+FormatOption = Annotated[TableFormatOption, typer.Option(help="Output table format", case_sensitive=True)]
+OutputOption = Annotated[
+    Union[OutputFormat, None],
+    typer.Option(help="Write the summary rows in this format, without panels, instead of printing the table"),
+]
+OutputFileOption = Annotated[Union[str, None], typer.Option(help="File --output is written to. Default: stdout")]
+
+
+def _command_args(format: TableFormatOption, time_delta: str, period: Union[int, None], chart: bool) -> Dict[str, Any]:
+    return {"format": format.value, "time_delta": time_delta, "period_in_seconds": period, "chart": chart}
+
+
+def report_output(output: Union[OutputFormat, None], output_file: Union[str, None]) -> Union[ReportOutput, None]:
+    if output_file and output is None:
+        raise typer.BadParameter("--output-file needs an --output format", param_hint="--output-file")
+    return ReportOutput(output, output_file) if output else None
+
+
+@docdb.command(help=DocDBLoadByWaitState.get_help())
+def load_by_wait_state(
+    db_instance: DbInstanceArgument,
+    aws_profile: AwsProfileOption = "default",
+    aws_region: AwsRegionOption = "eu-west-1",
+    time: TimeOption = None,
+    time_delta: TimeDeltaOption = "-1h",
+    period: PeriodOption = None,
+    chart: ChartOption = False,
+    format: FormatOption = TableFormatOption.github,
+    output: OutputOption = None,
+    output_file: OutputFileOption = None,
+) -> None:
+    DocDBLoadByWaitState(
+        AWSClient(aws_profile=aws_profile, aws_region=aws_region),
+        db_instance,
+        time=parse_timestamp(time) if time else None,
+        **_command_args(format, time_delta, period, chart),
+    ).run(output=report_output(output, output_file))
+
+
+@docdb.command(help=DocDBTopOperations.get_help())
+def top_operations(
+    db_instance: DbInstanceArgument,
+    aws_profile: AwsProfileOption = "default",
+    aws_region: AwsRegionOption = "eu-west-1",
+    time: TimeOption = None,
+    time_delta: TimeDeltaOption = "-1h",
+    period: PeriodOption = None,
+    chart: ChartOption = False,
+    format: FormatOption = TableFormatOption.github,
+    output: OutputOption = None,
+    output_file: OutputFileOption = None,
+    count: Annotated[
+        int,
+        typer.Option(help="Number of operations to fetch (Performance Insights groups at most 25)", min=1, max=25),
+    ] = 10,
+) -> None:
+    DocDBTopOperations(
+        AWSClient(aws_profile=aws_profile, aws_region=aws_region),
+        db_instance,
+        time=parse_timestamp(time) if time else None,
+        count=count,
+        **_command_args(format, time_delta, period, chart),
+    ).run(output=report_output(output, output_file))
+
+
+@docdb.command(help=DocDBCounterMetrics.get_help())
+def counter_metrics(
+    db_instance: DbInstanceArgument,
+    aws_profile: AwsProfileOption = "default",
+    aws_region: AwsRegionOption = "eu-west-1",
+    time: TimeOption = None,
+    time_delta: TimeDeltaOption = "-1h",
+    period: PeriodOption = None,
+    chart: ChartOption = False,
+    format: FormatOption = TableFormatOption.github,
+    output: OutputOption = None,
+    output_file: OutputFileOption = None,
+    metric: Annotated[
+        Union[List[str], None],
+        typer.Option(help=f"Counter metric with its aggregate. Default: {', '.join(DOCDB_COUNTER_METRICS)}"),
+    ] = None,
+) -> None:
+    DocDBCounterMetrics(
+        AWSClient(aws_profile=aws_profile, aws_region=aws_region),
+        db_instance,
+        time=parse_timestamp(time) if time else None,
+        metrics=metric or DOCDB_COUNTER_METRICS,
+        **_command_args(format, time_delta, period, chart),
+    ).run(output=report_output(output, output_file))
@@ -0,0 +1,183 @@
+"""DocumentDB Performance Insights reports"""
+
+from abc import abstractmethod
+from datetime import datetime
+from typing import Any, Dict, List, Union
+
+import numpy as np
+import pandas as pd
+from rich import print
+from rich.console import Console
+from rich.panel import Panel
+from rich.pretty import Pretty
+
+from pg_stats_tools.aws import AWSClient
+from pg_stats_tools.chart import series_chart
+from pg_stats_tools.pg.stats.reports import Report, top_rows
+from pg_stats_tools.pi import MetricSeries, MetricsSeries
+from pg_stats_tools.render import print_table
+from pg_stats_tools.result import ReportData
+
+DOCDB_COUNTER_METRICS = [
+    "os.cpuUtilization.total.avg",
+    "os.memory.free.avg",
+    "os.loadAverageMinute.one.avg",
+    "os.network.rx.avg",
+    "os.network.tx.avg",
+]
+
+
+def series_summary(series: List[MetricSeries]) -> pd.DataFrame:
+    """One row per series: its dimensions (without the group prefix), then avg, max and last value"""
+    rows: List[Dict[str, Any]] = []
+    for metric_series in series:
+        values = metric_series.values[np.isfinite(metric_series.values)]
+        row: Dict[str, Any] = {name.split(".")[-1]: value for name, value in metric_series.key.dimensions}
+        if not metric_series.key.dimensions:
+            row["metric"] = metric_series.key.metric
+        row.update(
+            avg=round(float(values.mean()), 3) if len(values) else None,
+            max=round(float(values.max()), 3) if len(values) else None,
+            last=round(float(values[-1]), 3) if len(values) else None,
+        )
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+class DocDBPIReport(Report):
+    """
+    Performance Insights report of a DocumentDB instance. Datapoints come from the paginated, cached PI fetch layer
+    """
+
+    default_args: Dict[str, Any] = {"format": "github", "time_delta": "-1h", "period_in_seconds": None, "chart": False}
+
+    def __init__(self, client: AWSClient, db_instance_identifier: str, time: Union[datetime, None] = None, **kvargs: Any) -> None:
+        self._client = client
+        self._db_instance_identifier = db_instance_identifier
+        self._time = time or datetime.now().astimezone()
+        self._command_args = {**self.default_args, **kvargs}
+        self._series: MetricsSeries = {}
+
+    def get_args(self) -> Dict[str, Any]:
+        return {"db_instance_identifier": self._db_instance_identifier, "time": self._time.isoformat(), **self._command_args}
+
+    @abstractmethod
+    def metric_queries(self) -> List[Any]:
+        """MetricQueries of the PI GetResourceMetrics call"""
+        pass
+
+    def summarize(self, series: MetricsSeries) -> pd.DataFrame:
+        return series_summary(list(series.values()))
+
+    def fetch(self) -> Dict[str, ReportData]:
+        period_in_seconds = self._command_args["period_in_seconds"]
+        if period_in_seconds is None:
+            # Shown on stderr before the calls are made, so it does not mix with --output rows
+            plan = self._client.plan_resource_metrics_for_db_instance(self.metric_queries(), self._time, self._command_args["time_delta"])
+            Console(stderr=True).print(f"Planned period: {plan.describe()}", highlight=False, soft_wrap=True)
+            period_in_seconds = plan.period_in_seconds
+        self._series = self._client.get_resource_metrics_for_db_instance(
+            db_instance_identifier=self._db_instance_identifier,
+            service_type="DOCDB",
+            metric_queries=self.metric_queries(),
+            time=self._time,
+            time_delta=self._command_args["time_delta"],
+            period_in_seconds=period_in_seconds,
+        )
+        return {self.get_name(): self.summarize(self._series)}
+
+    def show(self, results: Dict[str, ReportData]) -> None:
+        help_panel = Panel(self.get_help(), title="Help", height=len(self.get_help().splitlines()) + 1)
+        input_panel = Panel(Pretty(self.get_args()), title="Input", height=len(self.get_args()) + 3)
+        print(help_panel)
+        print(input_panel)
+        print_table(self.format_data(results[self.get_name()]), self._command_args["format"])
+        if self._command_args["chart"]:
+            for series in self._series.values():
+                print(series_chart(series))
+
+
+class DocDBLoadByWaitState(DocDBPIReport):
+    """
+    DocumentDB load by wait state
+    """
+
+    @classmethod
+    def get_help(cls) -> str:
+        return """
+    DocumentDB: Database load by wait state
+
+        Dimension: db.load.avg -> average number of active sessions, grouped by db.wait_state
+        Columns:
+            - name: Wait state (CPU, IO, ...). The row with a metric and no name is the total load
+            - avg, max, last: Average, maximum and last active sessions in the time range
+            - pct_load: Share of the total load
+        """
+
+    def get_name(self) -> str:
+        return "docdb_load_by_wait_state"
+
+    def metric_queries(self) -> List[Any]:
+        return [{"Metric": "db.load.avg", "GroupBy": {"Group": "db.wait_state"}}]
+
+    def summarize(self, series: MetricsSeries) -> pd.DataFrame:
+        data = series_summary(list(series.values()))
+        if data.empty or "metric" not in data:
+            return data
+        total = data.loc[data["metric"].notna(), "avg"].sum()
+        data["pct_load"] = (data["avg"] / total * 100).round(2) if total else None
+        return top_rows(data, "avg")
+
+
+class DocDBTopOperations(DocDBPIReport):
+    """
+    DocumentDB load by query
+    """
+
+    default_args: Dict[str, Any] = {**DocDBPIReport.default_args, "count": 10}
+
+    @classmethod
+    def get_help(cls) -> str:
+        return """
+    DocumentDB: Top operations by database load
+
+        Dimension: db.load.avg -> average number of active sessions, grouped by db.query (operation statement)
+        Columns:
+            - statement: Operation. The row with a metric and no statement is the total load
+            - avg, max, last: Average, maximum and last active sessions in the time range
+        """
+
+    def get_name(self) -> str:
+        return "docdb_top_operations"
+
+    def metric_queries(self) -> List[Any]:
+        return [{"Metric": "db.load.avg", "GroupBy": {"Group": "db.query", "Limit": int(self._command_args["count"])}}]
+
+    def summarize(self, series: MetricsSeries) -> pd.DataFrame:
+        data = series_summary(list(series.values()))
+        return data if data.empty else top_rows(data, "avg")
+
+
+class DocDBCounterMetrics(DocDBPIReport):
+    """
+    DocumentDB counter metrics
+    """
+
+    default_args: Dict[str, Any] = {**DocDBPIReport.default_args, "metrics": DOCDB_COUNTER_METRICS}
+
+    @classmethod
+    def get_help(cls) -> str:
+        return """
+    DocumentDB: Counter metrics
+
+        Operating system counters of the instance
+        Columns:
+            - metric: Counter and aggregate (avg, min, max, sum)
+            - avg, max, last: Average, maximum and last value in the time range
+        """
+
+    def get_name(self) -> str:
+        return "docdb_counter_metrics"
+
+    def metric_queries(self) -> List[Any]:
+        return [{"Metric": metric} for metric in self._command_args["metrics"]]
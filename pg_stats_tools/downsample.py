@@ -0,0 +1,52 @@
+"""Downsampling of time series to the points a terminal chart can show"""
+
+from typing import Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+FloatArray = npt.NDArray[np.float64]
+IndexArray = npt.NDArray[np.int64]
+
+
+def _lttb(x: FloatArray, y: FloatArray, threshold: int) -> IndexArray:
+    size = len(y)
+    if threshold >= size or threshold < 3:
+        return np.arange(size, dtype=np.int64)
+    # First and last points are kept, the others are split in threshold - 2 buckets
+    edges = np.linspace(1, size - 1, threshold - 1).astype(np.int64)
+    counts = np.diff(edges)
+    mean_x = np.add.reduceat(x[: size - 1], edges[:-1]) / counts
+    mean_y = np.add.reduceat(y[: size - 1], edges[:-1]) / counts
+    next_x = np.append(mean_x[1:], x[-1])
+    next_y = np.append(mean_y[1:], y[-1])
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, size - 1
+    anchor = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        # Twice the area of the triangle (anchor, candidate, mean of the next bucket), for every candidate of the bucket at once
+        areas = np.abs((x[anchor] - next_x[bucket]) * (y[start:end] - y[anchor]) - (x[anchor] - x[start:end]) * (next_y[bucket] - y[anchor]))
+        anchor = start + int(np.argmax(areas))
+        selected[bucket + 1] = anchor
+    return selected
+
+
+def lttb(x: FloatArray, y: FloatArray, threshold: int) -> IndexArray:
+    """
+    Indices of threshold points selected by Largest Triangle Three Buckets, which keeps the visual shape of the series.
+    Missing (NaN) values are never selected
+    """
+    finite = np.flatnonzero(np.isfinite(y))
+    if len(finite) == len(y):
+        return _lttb(x, y, threshold)
+    return finite[_lttb(x[finite], y[finite], threshold)]
+
+
+def min_max_envelope(y: FloatArray, buckets: int) -> Tuple[FloatArray, FloatArray]:
+    """Minimum and maximum of each of buckets equal slices of y, ignoring missing values. Peaks are never lost"""
+    buckets = min(buckets, len(y))
+    if buckets == 0:
+        return np.empty(0), np.empty(0)
+    starts = np.linspace(0, len(y), buckets + 1).astype(np.int64)[:-1]
+    return np.fmin.reduceat(y, starts), np.fmax.reduceat(y, starts)
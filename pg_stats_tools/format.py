@@ -1,6 +1,11 @@
 """Format module"""
 
 from enum import Enum
+from typing import Any, Callable, Dict
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
 
 
 class TableFormatOption(str, Enum):
@@ -40,3 +45,111 @@ class TableFormatOption(str, Enum):
     latex_longtable = "latex_longtable"
     textile = "textile"
     tsv = "tsv"
+
+
+class ColumnFormat(str, Enum):
+    number = "number"
+    duration = "duration"
+    decimal = "decimal"
+
+
+LARGE_NUMBER_UNITS = ["", "k", "M", "G", "T", "P", "E", "Z", "Y"]
+DURATION_UNITS = ["ms", "s", "m", "h", "d"]
+# Milliseconds in one unit of DURATION_UNITS
+DURATION_DIVISORS = np.array([1.0, 1000.0, 60_000.0, 3_600_000.0, 86_400_000.0])
+
+
+def _to_float_array(values: pd.Series) -> npt.NDArray[np.float64]:
+    return pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)  # pyright: ignore
+
+
+def _with_nulls(text: npt.NDArray[Any], numbers: npt.NDArray[np.float64], index: pd.Index) -> pd.Series:  # type: ignore[type-arg]
+    result = pd.Series(text, index=index, dtype=object)
+    result[np.isnan(numbers)] = None
+    return result
+
+
+def format_decimal(values: pd.Series, decimals: int = 2) -> pd.Series:
+    """Numbers rounded to decimals. Integral values are shown without decimals"""
+    if values.empty:
+        return values.astype(object)
+    numbers = _to_float_array(values)
+    # Adding 0.0 turns -0.0 into 0.0. %.0f shows integral values of any size, an int64 cast would overflow
+    rounded = np.round(np.nan_to_num(numbers), decimals) + 0.0
+    integral = rounded == np.trunc(rounded)
+    text = np.where(integral, np.char.mod("%.0f", rounded), np.char.mod(f"%.{decimals}f", rounded))
+    return _with_nulls(text, numbers, values.index)
+
+
+def format_large_number(values: pd.Series, decimals: int = 2) -> pd.Series:
+    """Numbers scaled by powers of 1000 with a unit suffix: 1234567 -> 1.23M"""
+    if values.empty:
+        return values.astype(object)
+    numbers = _to_float_array(values)
+    finite = np.nan_to_num(numbers)
+    exponent = np.zeros(len(finite), dtype=np.int64)
+    large = finite >= 1000.0
+    exponent[large] = np.floor(np.log10(finite[large]) / 3).astype(np.int64)
+    exponent = np.clip(exponent, 0, len(LARGE_NUMBER_UNITS) - 1)
+    scaled = finite / np.power(1000.0, exponent)
+    # Values reaching 1000 once rounded (and values log10 rounding left one unit short) are shown in the next unit: 999.996 -> 1k
+    carry = (np.round(scaled, decimals) >= 1000.0) & (exponent < len(LARGE_NUMBER_UNITS) - 1)
+    exponent[carry] += 1
+    scaled[carry] /= 1000.0
+    text = np.char.add(format_decimal(pd.Series(scaled), decimals).to_numpy(dtype=str), np.array(LARGE_NUMBER_UNITS)[exponent])
+    return _with_nulls(text, numbers, values.index)
+
+
+def format_duration(values: pd.Series, decimals: int = 2) -> pd.Series:
+    """Milliseconds converted to the largest unit (ms, s, m, h, d) the value reaches: 90000 -> 1.50 m"""
+    if values.empty:
+        return values.astype(object)
+    numbers = _to_float_array(values)
+    finite = np.nan_to_num(numbers)
+    unit = np.searchsorted(DURATION_DIVISORS, np.abs(finite), side="right") - 1
+    unit = np.clip(unit, 0, len(DURATION_UNITS) - 1)
+    # Values reaching the next unit once rounded are shown in it: 59999.999 -> 1.00 m
+    next_unit = np.minimum(unit + 1, len(DURATION_UNITS) - 1)
+    rounded = np.abs(np.round(finite / DURATION_DIVISORS[unit], decimals))
+    carry = (rounded >= DURATION_DIVISORS[next_unit] / DURATION_DIVISORS[unit]) & (unit < next_unit)
+    unit[carry] += 1
+    scaled = finite / DURATION_DIVISORS[unit]
+    text = np.char.add(np.char.mod(f"%.{decimals}f ", np.round(scaled, decimals)), np.array(DURATION_UNITS)[unit])
+    return _with_nulls(text, numbers, values.index)
+
+
+COLUMN_FORMATTERS: Dict[ColumnFormat, Callable[[pd.Series], pd.Series]] = {
+    ColumnFormat.number: format_large_number,
+    ColumnFormat.duration: format_duration,
+    ColumnFormat.decimal: format_decimal,
+}
+
+
+def format_columns(data: pd.DataFrame, column_formats: Dict[str, ColumnFormat]) -> pd.DataFrame:
+    """Copy of data with the raw numeric columns in column_formats rendered as text. Missing columns are ignored"""
+    columns = [column for column in column_formats if column in data.columns]
+    if not columns:
+        return data
+    formatted = data.copy()
+    for column in columns:
+        formatted[column] = COLUMN_FORMATTERS[column_formats[column]](data[column])
+    return formatted
+
+
+def format_size_pretty(values: pd.Series) -> pd.Series:
+    """Byte counts rendered as postgres pg_size_pretty does: bytes, kB, MB, GB, TB"""
+    if values.empty:
+        return values.astype(object)
+    numbers = _to_float_array(values)
+    size = np.nan_to_num(numbers).astype(np.int64)
+    text = np.char.add(np.char.mod("%d", size), " bytes")
+    # pg_size_pretty keeps one extra bit for rounding: shift by 9, then by 10 for every next unit
+    shifted = size >> 9
+    pending = np.abs(size) >= 10 * 1024
+    for unit in ["kB", "MB", "GB", "TB"]:
+        fits = pending & ((np.abs(shifted) < 20 * 1024 - 1) | (unit == "TB"))
+        half_rounded = (shifted + np.where(shifted < 0, -1, 1)) // 2
+        text = np.where(fits, np.char.add(np.char.mod("%d ", half_rounded), unit), text)
+        pending = pending & ~fits
+        shifted = shifted >> 10
+    return _with_nulls(text, numbers, values.index)
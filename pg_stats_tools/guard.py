@@ -0,0 +1,57 @@
+"""Server impact guard
+
+Limits applied to every database session of the tool, so running diagnostics on a struggling server does not make it
+worse: each session is named, has statement and lock timeouts and a work_mem cap, and statements are tagged so the
+tool can account for its own pg_stat_statements entries. Statements planned above a maximum cost are refused, or run
+with downgraded settings.
+"""
+
+from enum import Enum
+from typing import Any, Dict, List, Union
+
+import click
+
+# Session settings applied unless the run overrides them
+DEFAULT_APPLICATION_NAME = "pg_stats_tools"
+DEFAULT_STATEMENT_TIMEOUT_MS = 60_000
+# Reports only read, but waiting behind an ACCESS EXCLUSIVE lock blocks every query queued after them
+DEFAULT_LOCK_TIMEOUT_MS = 1_000
+DEFAULT_WORK_MEM = "4MB"
+# Leading comment of every statement of the tool. pg_stat_statements keeps it in the query text
+STATEMENT_TAG = "/* pg_stats_tools */"
+# Settings of a statement planned above the maximum cost, with CostAction.downgrade
+DOWNGRADE_SETTINGS: Dict[str, str] = {"max_parallel_workers_per_gather": "0", "work_mem": "1MB"}
+
+
+class CostAction(str, Enum):
+    """What happens to a statement whose planner cost is above the maximum"""
+
+    refuse = "refuse"
+    downgrade = "downgrade"
+
+
+class QueryCostError(click.ClickException):
+    """A statement planned above the maximum cost. The cli prints it as an error, without a traceback"""
+
+
+def session_options(statement_timeout: Union[int, None], lock_timeout: Union[int, None], work_mem: Union[str, None]) -> str:
+    """libpq options setting the limits of a session. Timeouts are in ms, 0 or None keeps the server setting"""
+    settings: List[str] = []
+    if statement_timeout:
+        settings.append(f"-c statement_timeout={int(statement_timeout)}")
+    if lock_timeout:
+        settings.append(f"-c lock_timeout={int(lock_timeout)}")
+    if work_mem:
+        if not work_mem.replace(" ", "").isalnum():
+            raise ValueError(f"Invalid work_mem {work_mem!r}, expected a size such as 4MB")
+        settings.append(f"-c work_mem={work_mem.replace(' ', '')}")
+    return " ".join(settings)
+
+
+def tag_statement(sql: str) -> str:
+    return sql if sql.startswith(STATEMENT_TAG) else f"{STATEMENT_TAG}\n{sql}"
+
+
+def plan_cost(plan: Any) -> float:
+    """Total cost of the top node of an EXPLAIN (FORMAT JSON) result"""
+    return float(plan[0]["Plan"]["Total Cost"])
@@ -1,28 +1,75 @@
 """Reports module"""
 from __future__ import annotations
 
+import functools
 import json
 import os
-from typing import Any
+from typing import Any, Dict, NamedTuple
 
-from jinja2 import Template
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template, pass_context
+from jinja2.runtime import Context
 from rich.console import Console
 
+from pg_stats_tools import spans
+from pg_stats_tools.cache import cache_dir
+
 console = Console()
 
+REPORTS_INPUTS_DIR = os.path.join(os.path.dirname(__file__), "reports_inputs")
+
+
+class SqlInput(NamedTuple):
+    """Statement text and the values bound to its %(name)s placeholders"""
+
+    sql: str
+    params: Dict[str, Any]
+
+
+@pass_context
+def bind(context: Context, name: str) -> str:
+    """Template global: placeholder for the render variable name, whose value is sent as a driver bind parameter"""
+    context["bound_params"][name] = context[name]
+    return f"%({name})s"
+
+
+@functools.lru_cache(maxsize=None)
+def sql_environment() -> Environment:
+    """
+    Environment of the sql templates. Templates are compiled once per process and never reloaded,
+    the compiled bytecode is cached on disk for the next runs
+    """
+    bytecode_dir = os.path.join(cache_dir(), "jinja")
+    os.makedirs(bytecode_dir, exist_ok=True)
+    environment = Environment(
+        loader=FileSystemLoader(REPORTS_INPUTS_DIR),
+        bytecode_cache=FileSystemBytecodeCache(bytecode_dir),
+        auto_reload=False,
+        cache_size=-1,
+    )
+    environment.globals["bind"] = bind
+    return environment
+
+
+def get_sql_template(report_name: str) -> Template:
+    return sql_environment().get_template(f"{report_name}.sql")
+
 
 def read_report_input(report_name: str) -> Any:
-    json_file_path = os.path.join(os.path.dirname(__file__), "reports_inputs", f"{report_name}.json")
+    json_file_path = os.path.join(REPORTS_INPUTS_DIR, f"{report_name}.json")
     with open(json_file_path, "r") as json_file:
         data = json.load(json_file)
     return data
 
 
-def read_sql_input(report_name: str, **kvargs: Any) -> str:
-    json_file_path = os.path.join(os.path.dirname(__file__), "reports_inputs", f"{report_name}.sql")
-    with open(json_file_path, "r") as file:
-        data = file.read()
-    return Template(data).render(**kvargs)
+def read_sql_input(report_name: str, **kvargs: Any) -> SqlInput:
+    """
+    Render a report template. kvargs shape the statement text (fields, joins, optional clauses),
+    values referenced with bind("name") are returned as params instead of being written in the text
+    """
+    params: Dict[str, Any] = {}
+    with spans.span("template", report=report_name):
+        sql = get_sql_template(report_name).render(bound_params=params, **kvargs)
+    return SqlInput(sql=sql, params=params)
 
 
 # class ReportRunner:
@@ -0,0 +1,77 @@
+"""Lazy loading of cli subcommands
+
+Subcommand modules import the reports and their dependencies (pandas, psycopg2, sshtunnel, ...). Groups built with
+lazy_group only import the module of the subcommand being invoked. Listing subcommands (help, shell completion)
+uses the short help given here and imports nothing.
+"""
+
+import importlib
+from typing import Any, Dict, List, NamedTuple, Type, Union
+
+import click
+import typer
+from typer.core import TyperGroup
+
+
+class LazySubcommand(NamedTuple):
+    """Subcommand defined by the Typer app at import_path (module:attribute)"""
+
+    import_path: str
+    short_help: str
+
+
+def load_subcommand(name: str, subcommand: LazySubcommand, rich_markup_mode: Any = None) -> click.Command:
+    module_name, attribute = subcommand.import_path.split(":")
+    app: typer.Typer = getattr(importlib.import_module(module_name), attribute)
+    if rich_markup_mode is not None:
+        app.rich_markup_mode = rich_markup_mode
+    command: click.Command
+    if len(app.registered_commands) == 1 and not app.registered_groups and app.registered_callback is None:
+        # An app with a single command is that command, as typer does for the root app
+        command = typer.main.get_command_from_info(
+            app.registered_commands[0], pretty_exceptions_short=app.pretty_exceptions_short, rich_markup_mode=app.rich_markup_mode
+        )
+    else:
+        command = typer.main.get_group(app)
+    command.name = name
+    return command
+
+
+def lazy_group(subcommands: Dict[str, LazySubcommand]) -> Type[TyperGroup]:
+    """Typer group class (Typer(cls=...)) adding subcommands that are imported when invoked"""
+
+    class LazyGroup(TyperGroup):
+        lazy_subcommands = subcommands
+
+        def __init__(self, **kvargs: Any) -> None:
+            super().__init__(**kvargs)
+            self._listing = False
+
+        def list_commands(self, ctx: click.Context) -> List[str]:
+            return sorted({*super().list_commands(ctx), *self.lazy_subcommands})
+
+        def get_command(self, ctx: click.Context, cmd_name: str) -> Union[click.Command, None]:
+            if cmd_name in self.commands or cmd_name not in self.lazy_subcommands:
+                return super().get_command(ctx, cmd_name)
+            subcommand = self.lazy_subcommands[cmd_name]
+            if self._listing:
+                # Placeholder with the short help only, the subcommand is not going to run
+                return click.Command(cmd_name, short_help=subcommand.short_help, help=subcommand.short_help)
+            self.commands[cmd_name] = load_subcommand(cmd_name, subcommand, self.rich_markup_mode)
+            return self.commands[cmd_name]
+
+        def format_help(self, ctx: click.Context, formatter: click.HelpFormatter) -> None:
+            self._listing = True
+            try:
+                super().format_help(ctx, formatter)
+            finally:
+                self._listing = False
+
+        def shell_complete(self, ctx: click.Context, incomplete: str) -> List[Any]:
+            self._listing = True
+            try:
+                return super().shell_complete(ctx, incomplete)
+            finally:
+                self._listing = False
+
+    return LazyGroup
@@ -2,11 +2,8 @@
 import typer
 from dotenv import load_dotenv
 
+from pg_stats_tools.lazy import LazySubcommand, lazy_group
 from pg_stats_tools.pg.cli import pg
-from pg_stats_tools.pg.stats.cli import stats
-from pg_stats_tools.pg.stats.sql.cli import sql
-from pg_stats_tools.pg.stats.indexes.cli import indexes
-from pg_stats_tools.pg.stats.buffers.cli import buffers
 
 load_dotenv()
 # print(os.environ)
@@ -15,13 +12,11 @@ app: typer.Typer = typer.Typer(
     help="""Welcome to AWS Pertformance Insights Reports cli tool
     """,
     rich_markup_mode="rich",
+    cls=lazy_group({"docdb": LazySubcommand("pg_stats_tools.docdb.cli:docdb", "Performance Insights Reports for DocumentDB")}),
 )
 
+# Subcommands below pg, and docdb, are imported when invoked (see pg_stats_tools.lazy)
 app.add_typer(pg, name="pg")
-pg.add_typer(stats, name="stats")
-stats.add_typer(sql, name="sql")
-stats.add_typer(indexes, name="indexes")
-stats.add_typer(buffers, name="buffers")
 
 if __name__ == "__main__":
     app()
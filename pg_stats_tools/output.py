@@ -0,0 +1,253 @@
+"""Machine readable report output
+
+Report tables are written batch by batch (one batch per cursor fetch for reports streaming their rows), so a large
+result never has to be held in memory or rendered. Every row carries the report section it belongs to.
+"""
+
+import csv
+import io
+import json
+import math
+import sys
+from abc import ABC, abstractmethod
+from contextlib import contextmanager, nullcontext
+from datetime import date, datetime
+from datetime import time as datetime_time
+from datetime import timedelta
+from decimal import Decimal
+from enum import Enum
+from typing import IO, Any, Dict, Iterator, List, NamedTuple, Tuple, Type, Union
+
+from pg_stats_tools.result import ReportData, ResultSet, as_frame
+
+# Column holding the report section of every row
+OUTPUT_SECTION_COLUMN = "section"
+
+
+class OutputFormat(str, Enum):
+    jsonl = "jsonl"
+    csv = "csv"
+    arrow = "arrow"
+    parquet = "parquet"
+
+
+def columns_rows(data: ReportData) -> Tuple[List[str], Iterator[Tuple[Any, ...]]]:
+    if isinstance(data, ResultSet):
+        return data.columns, data.rows()
+    return [str(column) for column in data.columns], data.itertuples(index=False, name=None)
+
+
+def json_value(value: Any) -> Any:
+    """JSON form of a value: NULL, NaN and NaT are null, intervals are seconds, dates ISO strings, unknown types their text"""
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, Decimal):
+        return float(value) if value.is_finite() else None
+    # NaT, the missing timestamp of pandas, is a datetime different from itself
+    if isinstance(value, (datetime, timedelta)) and value != value:
+        return None
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    if isinstance(value, (datetime, date, datetime_time)):
+        return value.isoformat()
+    import numpy as np
+
+    if isinstance(value, np.generic):
+        return json_value(value.item())
+    return str(value)
+
+
+class BatchWriter(ABC):
+    """Writes the tables of a report to a binary stream, one batch at a time"""
+
+    def __init__(self, stream: IO[bytes]) -> None:
+        self._stream = stream
+
+    @abstractmethod
+    def write(self, section: str, data: ReportData) -> None:
+        pass
+
+    def close(self) -> None:
+        self._stream.flush()
+
+
+class JsonlWriter(BatchWriter):
+    """One JSON object per row"""
+
+    def write(self, section: str, data: ReportData) -> None:
+        columns, rows = columns_rows(data)
+        keys = [OUTPUT_SECTION_COLUMN, *columns]
+        lines = [json.dumps(dict(zip(keys, [section, *map(json_value, row)])), ensure_ascii=False) for row in rows]
+        if lines:
+            self._stream.write(("\n".join(lines) + "\n").encode())
+            self._stream.flush()
+
+
+class CsvWriter(BatchWriter):
+    """CSV rows. A header is written before the first row, and again when a section has other columns"""
+
+    def __init__(self, stream: IO[bytes]) -> None:
+        super().__init__(stream)
+        self._text = io.TextIOWrapper(stream, encoding="utf-8", newline="", write_through=True)  # pyright: ignore[reportGeneralTypeIssues]
+        self._writer = csv.writer(self._text, lineterminator="\n")
+        self._columns: Union[List[str], None] = None
+
+    def write(self, section: str, data: ReportData) -> None:
+        columns, rows = columns_rows(data)
+        if columns != self._columns:
+            self._writer.writerow([OUTPUT_SECTION_COLUMN, *columns])
+            self._columns = columns
+        self._writer.writerows((section, *row) for row in rows)
+        self._text.flush()
+
+    def close(self) -> None:
+        self._text.flush()
+        # The stream belongs to the caller (it may be stdout)
+        self._text.detach()
+        super().close()
+
+
+# Arrow types of the PostgreSQL types (by OID) of report columns, as to_arrow converts their values.
+# Columns of other types take the type of their values
+ARROW_TYPES_OF_PG_TYPES: Dict[int, str] = {
+    16: "bool",  # bool
+    20: "int64",  # int8
+    21: "int64",  # int2
+    23: "int64",  # int4
+    26: "int64",  # oid
+    28: "int64",  # xid
+    700: "float64",  # float4
+    701: "float64",  # float8
+    1700: "float64",  # numeric
+    18: "string",  # char
+    19: "string",  # name
+    25: "string",  # text
+    1042: "string",  # bpchar
+    1043: "string",  # varchar
+    869: "string",  # inet
+    2205: "string",  # regclass
+}
+
+
+class ArrowTableWriter(BatchWriter):
+    """
+    Base of the writers of arrow tables. The schema of the output can not change once rows are written, so:
+    - batches read from a cursor fix it from the types of their columns (the first batch having rows, as one batch may
+      be all NULLs in a column)
+    - other batches (data frames, fetched whole) are kept until the output is closed, their schema takes the widest
+      type of every column (NULL columns take the type of their values in other batches, int columns become floats
+      when other batches have floats)
+    Columns without values in any batch are written as strings
+    """
+
+    def __init__(self, stream: IO[bytes]) -> None:
+        from pg_stats_tools.snapshot import import_pyarrow
+
+        super().__init__(stream)
+        self._pa = import_pyarrow("write arrow or parquet output")
+        self._writer: Any = None
+        self._schema: Any = None
+        self._empty: Any = None
+        self._pending: List[Tuple[str, Any]] = []
+
+    @abstractmethod
+    def open(self, schema: Any) -> Any:
+        """Writer of tables having this schema"""
+        pass
+
+    def write(self, section: str, data: ReportData) -> None:
+        from pg_stats_tools.snapshot import to_arrow
+
+        pa = self._pa
+        table = to_arrow(as_frame(data)).replace_schema_metadata(None)
+        table = table.add_column(0, OUTPUT_SECTION_COLUMN, pa.array([section] * table.num_rows, pa.string()))
+        columns = self._schema.names if self._schema is not None else self._pending[0][1].column_names if self._pending else None
+        if columns is not None and table.column_names != columns:
+            raise ValueError(f"Rows of section {section} do not have the columns written before them ({', '.join(columns)}). Use jsonl or csv output")
+        if table.num_rows == 0:
+            # Keep the columns of an empty result, in case no batch has rows
+            if self._empty is None:
+                self._empty = table
+            return
+        type_codes = data.type_codes if isinstance(data, ResultSet) else None
+        if self._writer is None:
+            if type_codes is None:
+                self._pending.append((section, table))
+                return
+            self._open(self._declared_schema(table.schema, type_codes))
+        self._write(section, table)
+
+    def _declared_schema(self, schema: Any, type_codes: List[Union[int, None]]) -> Any:
+        """Schema of the columns of the types the cursor described, the section column first"""
+        pa = self._pa
+        fields = [schema.field(0)]
+        for index, code in enumerate(type_codes, start=1):
+            field = schema.field(index)
+            fields.append(field.with_type(getattr(pa, ARROW_TYPES_OF_PG_TYPES[code])()) if code in ARROW_TYPES_OF_PG_TYPES else field)
+        return pa.schema(fields)
+
+    def _open(self, schema: Any) -> None:
+        pa = self._pa
+        self._schema = pa.schema([field.with_type(pa.string()) if pa.types.is_null(field.type) else field for field in schema])
+        self._writer = self.open(self._schema)
+        pending, self._pending = self._pending, []
+        for section, table in pending:
+            self._write(section, table)
+
+    def _write(self, section: str, table: Any) -> None:
+        pa = self._pa
+        if not table.schema.equals(self._schema):
+            try:
+                table = table.cast(self._schema)
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError, ValueError) as e:
+                raise ValueError(f"Rows of section {section} do not fit the columns written before them ({e}). Use jsonl or csv output") from e
+        self._writer.write_table(table)
+
+    def close(self) -> None:
+        if self._writer is None and self._pending:
+            self._open(self._pa.unify_schemas([table.schema for _, table in self._pending], promote_options="permissive"))
+        if self._writer is None and self._empty is not None:
+            self._writer = self.open(self._empty.schema)
+        if self._writer is not None:
+            self._writer.close()
+        super().close()
+
+
+class ArrowWriter(ArrowTableWriter):
+    """Arrow IPC stream, one record batch per batch"""
+
+    def open(self, schema: Any) -> Any:
+        return self._pa.ipc.new_stream(self._stream, schema)
+
+
+class ParquetWriter(ArrowTableWriter):
+    """Parquet file, one row group per batch"""
+
+    def open(self, schema: Any) -> Any:
+        import pyarrow.parquet as pq
+
+        return pq.ParquetWriter(self._stream, schema)
+
+
+WRITERS: Dict[OutputFormat, Type[BatchWriter]] = {
+    OutputFormat.jsonl: JsonlWriter,
+    OutputFormat.csv: CsvWriter,
+    OutputFormat.arrow: ArrowWriter,
+    OutputFormat.parquet: ParquetWriter,
+}
+
+
+class ReportOutput(NamedTuple):
+    """Format and file (stdout when None) report tables are written to instead of being printed"""
+
+    format: OutputFormat
+    path: Union[str, None] = None
+
+    @contextmanager
+    def open(self) -> Iterator[BatchWriter]:
+        with open(self.path, "wb") if self.path else nullcontext(sys.stdout.buffer) as stream:
+            writer = WRITERS[self.format](stream)
+            yield writer
+            writer.close()
@@ -1,20 +1,81 @@
 """cli for RDS reports"""
 
-from typing import Annotated, Any, Dict
+import sys
+from typing import TYPE_CHECKING, Annotated, Any, Dict, Union
 
 import typer
 
+from pg_stats_tools import spans
+from pg_stats_tools.guard import DEFAULT_APPLICATION_NAME, DEFAULT_LOCK_TIMEOUT_MS, DEFAULT_STATEMENT_TIMEOUT_MS, DEFAULT_WORK_MEM, CostAction
+from pg_stats_tools.lazy import LazySubcommand, lazy_group
+from pg_stats_tools.output import OutputFormat, ReportOutput
+from pg_stats_tools.render import render_options
+
+if TYPE_CHECKING:
+    from pg_stats_tools.snapshot import Snapshot
+
 pg_params: Dict[str, Any] = {}
+# Settings of the run that are not database connection parameters
+pg_options: Dict[str, Any] = {"snapshot": None, "output": None}
+
+
+def get_pg_snapshot() -> Union["Snapshot", None]:
+    """Snapshot reports render from instead of the database (--snapshot). Opened once per run"""
+    if isinstance(pg_options["snapshot"], str):
+        from pg_stats_tools.snapshot import Snapshot
+
+        try:
+            pg_options["snapshot"] = Snapshot(pg_options["snapshot"])
+        except (OSError, ImportError) as e:
+            raise typer.BadParameter(str(e), param_hint="--snapshot") from e
+    return pg_options["snapshot"]
+
+
+def get_pg_output() -> Union[ReportOutput, None]:
+    """Where reports write their tables instead of printing them (--output), None to print them"""
+    return pg_options["output"]
+
+
+def watch_conn_params() -> Dict[str, Any]:
+    """Connection params of a report in watch mode: its statements are prepared once and re-executed"""
+    if pg_options["snapshot"] is not None:
+        raise typer.BadParameter("watch mode queries the database, it can not be used with --snapshot", param_hint="--watch")
+    if pg_options["output"] is not None:
+        raise typer.BadParameter("watch mode redraws tables in place, it can not be used with --output", param_hint="--watch")
+    return {**pg_params, "prepare": True}
+
+
+def close_sessions() -> None:
+    """Close the database sessions of the run, if any query was executed (psql is imported by the first one)"""
+    psql = sys.modules.get("pg_stats_tools.psql")
+    if psql is not None:
+        psql.close_sessions()
+
+
+def report_profile(breakdown: bool, trace_file: Union[str, None]) -> None:
+    """Print the phase breakdown of the run (--profile) and write its spans to the trace file (--profile-trace)"""
+    spans.disable()
+    if breakdown:
+        spans.print_breakdown()
+    if trace_file:
+        spans.write_trace(trace_file)
 
 
 pg = typer.Typer(
     help="""Performance Reports for Postgres
-    """
+    """,
+    cls=lazy_group(
+        {
+            "snapshot": LazySubcommand("pg_stats_tools.pg.snapshot.cli:snapshot_app", "Capture statistics views into a snapshot file"),
+            "stats": LazySubcommand("pg_stats_tools.pg.stats.cli:stats", "Performance reports based on pg_stat_statements"),
+        }
+    ),
 )
 
 
 @pg.callback()
 def sql_callback(
+    ctx: typer.Context,
     ssh_user: Annotated[str, typer.Option(help="SSH user", envvar="SSH_USER")] = "",
     db_user: Annotated[str, typer.Option(help="Database user", envvar="DB_USER")] = "",
     db_name: Annotated[str, typer.Option(help="Database used to connect to", envvar="DB_NAME")] = "",
@@ -33,6 +94,54 @@ def sql_callback(
     ssh_key_pass: Annotated[str, typer.Option(help="Password for SSH key file", envvar="SSSH_KEY_PASS")] = "",
     ssh_pass: Annotated[str, typer.Option(help="SSH user password", envvar="SSH_PASS")] = "",
     db_pass: Annotated[str, typer.Option(help="Database user password", envvar="DB_PASS")] = "",
+    db_pool_size: Annotated[int, typer.Option(help="Max number of database connections kept open during the run", envvar="DB_POOL_SIZE")] = 4,
+    application_name: Annotated[
+        str, typer.Option(help="application_name of the connections, as pg_stat_activity shows them", envvar="DB_APPLICATION_NAME")
+    ] = DEFAULT_APPLICATION_NAME,
+    db_statement_timeout: Annotated[
+        int, typer.Option(help="statement_timeout of the connections, in ms. 0 keeps the server setting", envvar="DB_STATEMENT_TIMEOUT")
+    ] = DEFAULT_STATEMENT_TIMEOUT_MS,
+    db_lock_timeout: Annotated[
+        int,
+        typer.Option(help="lock_timeout of the connections, in ms, so reports do not queue behind DDL locks. 0 keeps the server setting", envvar="DB_LOCK_TIMEOUT"),
+    ] = DEFAULT_LOCK_TIMEOUT_MS,
+    db_work_mem: Annotated[str, typer.Option(help="work_mem of the connections (e.g. 4MB). Empty keeps the server setting", envvar="DB_WORK_MEM")] = DEFAULT_WORK_MEM,
+    max_cost: Annotated[
+        Union[float, None],
+        typer.Option(help="EXPLAIN every statement first, and handle those planned above this cost as --over-cost says", envvar="DB_MAX_COST"),
+    ] = None,
+    over_cost: Annotated[
+        CostAction,
+        typer.Option(help="Statements above --max-cost are refused, or run downgraded: without parallel workers and with a small work_mem"),
+    ] = CostAction.refuse,
+    profile: Annotated[
+        bool,
+        typer.Option(
+            help="Print the time spent in each phase (tunnel, login, template, query execution and fetch, DataFrame conversion, rendering) "
+            "to stderr when the command finishes. self_s excludes nested phases: for query, it is the DataFrame conversion"
+        ),
+    ] = False,
+    profile_trace: Annotated[
+        Union[str, None],
+        typer.Option(help="Write the phase spans of the run to this file as a Chrome trace (chrome://tracing, Perfetto)"),
+    ] = None,
+    snapshot: Annotated[
+        Union[str, None],
+        typer.Option(help="Render reports from this snapshot file (see the snapshot command) instead of querying the database"),
+    ] = None,
+    output: Annotated[
+        Union[OutputFormat, None],
+        typer.Option(help="Write report rows in this format, batch by batch and without panels, instead of printing tables"),
+    ] = None,
+    output_file: Annotated[
+        Union[str, None],
+        typer.Option(help="File --output is written to. Default: stdout"),
+    ] = None,
+    page_size: Annotated[
+        Union[int, None],
+        typer.Option(help="Print tables in pages of this many rows, each with its header. On a terminal, wait for a key between pages"),
+    ] = None,
+    pager: Annotated[bool, typer.Option(help="Send tables to the pager ($PAGER, less) as they are rendered")] = False,
 ) -> None:
     pg_params["ssh_user"] = ssh_user
     pg_params["db_user"] = db_user
@@ -46,6 +155,27 @@ def sql_callback(
     pg_params["ssh_key_pass"] = ssh_key_pass
     pg_params["ssh_pass"] = ssh_pass
     pg_params["db_pass"] = db_pass
+    pg_params["db_pool_size"] = db_pool_size
+    pg_params["application_name"] = application_name
+    pg_params["db_statement_timeout"] = db_statement_timeout
+    pg_params["db_lock_timeout"] = db_lock_timeout
+    pg_params["db_work_mem"] = db_work_mem
+    pg_params["max_cost"] = max_cost
+    pg_params["over_cost"] = over_cost
+    pg_options["snapshot"] = snapshot
+    if output_file and output is None:
+        raise typer.BadParameter("--output-file needs an --output format", param_hint="--output-file")
+    pg_options["output"] = ReportOutput(output, output_file) if output else None
+    if page_size is not None and page_size < 1:
+        raise typer.BadParameter("--page-size must be a positive number of rows", param_hint="--page-size")
+    render_options["page_size"] = page_size
+    render_options["pager"] = pager
+    # Tunnel and connections are shared by every query of the invocation and released when it ends.
+    # Close callbacks run in reverse order, so timings are printed before sessions are closed.
+    ctx.call_on_close(close_sessions)
+    if profile or profile_trace:
+        spans.enable()
+        ctx.call_on_close(lambda: report_profile(profile, profile_trace))
 
 
 # api = typer.Typer(
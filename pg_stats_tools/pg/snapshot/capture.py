@@ -0,0 +1,57 @@
+"""Capture of postgres statistics views into a snapshot"""
+
+from typing import Any, Dict, List, Tuple
+
+import pandas as pd
+import psycopg2
+
+from pg_stats_tools.guard import tag_statement
+from pg_stats_tools.input_read import read_sql_input
+from pg_stats_tools.psql import get_session
+
+# Captured tables. Each one is read with reports_inputs/snapshot_<table>.sql
+SNAPSHOT_TABLES: List[str] = [
+    "pg_stat_statements",
+    "pg_stat_user_tables",
+    "pg_stat_user_indexes",
+    "pg_statio_all_tables",
+    "pg_statio_all_indexes",
+    "pg_stat_activity",
+    "pg_buffercache_usage",
+]
+
+
+def capture_snapshot(pg_conn_params: Dict[str, Any], tables: List[str] = SNAPSHOT_TABLES) -> Tuple[Dict[str, pd.DataFrame], Dict[str, Any]]:
+    """
+    Read every table in one transaction, so all statistics come from the same stats snapshot.
+    Tables that can not be read (e.g. extension not installed) are skipped and reported in the metadata.
+    """
+    conn_params = {k: v for k, v in pg_conn_params.items() if k != "statement_timeout"}
+    captured: Dict[str, pd.DataFrame] = {}
+    skipped: Dict[str, str] = {}
+    with get_session(**conn_params).connection() as conn:
+        sql, params = read_sql_input("snapshot_server")
+        server = pd.read_sql_query(tag_statement(sql), conn, params=params or None)  # pyright: ignore[reportUnknownMemberType]
+        for table in tables:
+            # pandas rolls the whole transaction back when a query fails, so tables are read with a plain cursor
+            with conn.cursor() as cursor:
+                cursor.execute("SAVEPOINT snapshot_table")
+                try:
+                    sql, params = read_sql_input(f"snapshot_{table}")
+                    cursor.execute(tag_statement(sql), params or None)
+                except psycopg2.Error as e:
+                    cursor.execute("ROLLBACK TO SAVEPOINT snapshot_table")
+                    skipped[table] = (str(e).strip().splitlines() or [""])[0]
+                    continue
+                columns = [column[0] for column in cursor.description or []]
+                captured[table] = pd.DataFrame.from_records(cursor.fetchall(), columns=columns, coerce_float=True)
+                cursor.execute("RELEASE SAVEPOINT snapshot_table")
+    metadata: Dict[str, Any] = {
+        "host": conn_params.get("db_host"),
+        "database": server["database"].iloc[0],
+        "server_version": server["server_version"].iloc[0],
+        "in_recovery": bool(server["in_recovery"].iloc[0]),
+        "captured_at": pd.Timestamp(server["captured_at"].iloc[0]).isoformat(),
+        "skipped": skipped,
+    }
+    return captured, metadata
@@ -0,0 +1,44 @@
+"""Snapshot module"""
+
+from datetime import datetime
+from typing import Annotated, Union
+
+import typer
+from rich import print
+
+from pg_stats_tools.pg.cli import pg_params
+from pg_stats_tools.pg.snapshot.capture import SNAPSHOT_TABLES, capture_snapshot
+from pg_stats_tools.snapshot import import_pyarrow, write_snapshot
+
+SNAPSHOT_HELP = f"""Capture statistics views into a snapshot file
+
+        Captured tables: {", ".join(SNAPSHOT_TABLES)}
+
+        Reports render from a snapshot instead of the database with: pg --snapshot <file> stats ...
+        """
+
+snapshot_app = typer.Typer()
+
+
+@snapshot_app.command(name="snapshot", help=SNAPSHOT_HELP)
+def snapshot(
+    output: Annotated[
+        Union[str, None],
+        typer.Option(help="Snapshot file. Default: pg_stats_snapshot_<timestamp>.tar in the current directory"),
+    ] = None,
+    compression: Annotated[
+        str,
+        typer.Option(help="Arrow buffer compression: zstd, lz4 or none"),
+    ] = "zstd",
+) -> None:
+    path = output or f"pg_stats_snapshot_{datetime.now().strftime('%Y%m%dT%H%M%S')}.tar"
+    # Fail before reading the statistics when the snapshot can not be written
+    try:
+        import_pyarrow("write snapshots")
+    except ImportError as e:
+        raise typer.BadParameter(str(e)) from e
+    tables, metadata = capture_snapshot(pg_params)
+    write_snapshot(path, tables, metadata, compression=None if compression == "none" else compression)
+    for table, reason in metadata["skipped"].items():
+        print(f"[yellow]Skipped[/yellow] {table}: {reason}")
+    print(f"Snapshot written to [bold]{path}[/bold] ({', '.join(f'{name}: {len(data)} rows' for name, data in tables.items())})")
@@ -1,12 +1,13 @@
 """SQL module"""
 
-from typing import Annotated, Any, Dict
+from typing import Annotated, Any, Dict, Union
 
 import typer
 
 from pg_stats_tools.format import TableFormatOption
-from pg_stats_tools.pg.cli import pg_params
+from pg_stats_tools.pg.cli import get_pg_output, get_pg_snapshot, pg_params, watch_conn_params
 from pg_stats_tools.pg.stats.buffers.reports import TableCacheHits, IndexCacheHits, Usage
+from pg_stats_tools.pg.stats.watch import watch_report
 
 buffers = typer.Typer(
     help="""Buffer based reports
@@ -24,11 +25,18 @@ def table_cache_hits(
         str,
         typer.Option(help="Schema. Default: public. Use _all to get all schemas"),
     ] = "public",
+    watch: Annotated[
+        Union[float, None],
+        typer.Option(help="Re-run the report every WATCH seconds on one open connection and redraw it in place, until Ctrl+C"),
+    ] = None,
 ) -> None:
     # frame: Union[FrameType, None] = inspect.currentframe()
     # f_name = frame.f_code.co_name if frame else "unknown_function"
     command_args: Dict[str, Any] = {"format": format.value, "schema": schema}
-    TableCacheHits(pg_conn_params=pg_params, **command_args).run()
+    if watch:
+        watch_report(TableCacheHits(pg_conn_params=watch_conn_params(), **command_args), watch)
+        return
+    TableCacheHits(pg_conn_params=pg_params, **command_args).run(snapshot=get_pg_snapshot(), output=get_pg_output())
 
 
 @buffers.command(help=IndexCacheHits.get_help())
@@ -41,11 +49,18 @@ def index_cache_hits(
         str,
         typer.Option(help="Schema. Default: public. Use _all to get all schemas"),
     ] = "public",
+    watch: Annotated[
+        Union[float, None],
+        typer.Option(help="Re-run the report every WATCH seconds on one open connection and redraw it in place, until Ctrl+C"),
+    ] = None,
 ) -> None:
     # frame: Union[FrameType, None] = inspect.currentframe()
     # f_name = frame.f_code.co_name if frame else "unknown_function"
     command_args: Dict[str, Any] = {"format": format.value, "schema": schema}
-    IndexCacheHits(pg_conn_params=pg_params, **command_args).run()
+    if watch:
+        watch_report(IndexCacheHits(pg_conn_params=watch_conn_params(), **command_args), watch)
+        return
+    IndexCacheHits(pg_conn_params=pg_params, **command_args).run(snapshot=get_pg_snapshot(), output=get_pg_output())
 
 
 @buffers.command(help=Usage.get_help())
@@ -58,8 +73,15 @@ def usage(
         str,
         typer.Option(help="Schema. Default: public. Use _all to get all schemas"),
     ] = "public",
+    watch: Annotated[
+        Union[float, None],
+        typer.Option(help="Re-run the report every WATCH seconds on one open connection and redraw it in place, until Ctrl+C"),
+    ] = None,
 ) -> None:
     # frame: Union[FrameType, None] = inspect.currentframe()
     # f_name = frame.f_code.co_name if frame else "unknown_function"
     command_args: Dict[str, Any] = {"format": format.value, "schema": schema}
-    Usage(pg_conn_params=pg_params, **command_args).run()
+    if watch:
+        watch_report(Usage(pg_conn_params=watch_conn_params(), **command_args), watch)
+        return
+    Usage(pg_conn_params=pg_params, **command_args).run(snapshot=get_pg_snapshot(), output=get_pg_output())
@@ -1,16 +1,39 @@
 """SQL Reports module"""
 
-from typing import Any, Dict
+from typing import Any, Dict, Iterator, List, Tuple
 
 import pandas as pd
 from rich import print
 from rich.panel import Panel
 from rich.pretty import Pretty
-from tabulate import tabulate
 
-from pg_stats_tools.input_read import read_sql_input
-from pg_stats_tools.psql import execute_sql
-from pg_stats_tools.pg.stats.reports import Report
+from pg_stats_tools.input_read import SqlInput, read_sql_input
+from pg_stats_tools.psql import fetch_result_set, iter_result_set
+from pg_stats_tools.render import print_table
+from pg_stats_tools.result import ReportData, ResultSet
+from pg_stats_tools.pg.stats.reports import Report, top_rows
+from pg_stats_tools.snapshot import Snapshot
+
+RELATION_KINDS: Dict[str, str] = {
+    "r": "ordinary table",
+    "i": "index",
+    "S": "sequence",
+    "t": "TOAST table",
+    "v": "view",
+    "m": "materialized view",
+    "c": "composite type",
+    "f": "foreign table",
+    "p": "partitioned table",
+    "I": "partitioned index",
+}
+
+
+def snapshot_hit_ratios(data: pd.DataFrame, group_by: List[str], hit: str, read: str, ratio: str) -> pd.DataFrame:
+    """hit / (hit + read) percentage per group, -1 for groups without reads"""
+    data = data.groupby(group_by, as_index=False, dropna=False)[[hit, read]].sum()  # pyright: ignore
+    total = (data[hit] + data[read]).astype(float)
+    data[ratio] = (data[hit] / total.where(total != 0) * 100).fillna(-1.0).round(2)
+    return top_rows(data[[*group_by, ratio]], ratio)
 
 
 class TableCacheHits(Report):
@@ -18,6 +41,8 @@ class TableCacheHits(Report):
     Standard SQL Report
     """
 
+    default_args: Dict[str, Any] = {"format": "github", "schema": "public"}
+
     def __init__(self, pg_conn_params: Dict[str, Any], **kvargs: Any) -> None:
         self._pg_conn_params = pg_conn_params
         self._command_args = kvargs
@@ -43,27 +68,45 @@ class TableCacheHits(Report):
     def get_args(self) -> Dict[str, Any]:
         return self._command_args
 
-    def read_sql(self) -> str:
+    def read_sql(self) -> SqlInput:
         return read_sql_input(self.get_name(), **self.get_args())
 
-    def execute_sql(self) -> pd.DataFrame:
-        return execute_sql(
-            sql=self.read_sql(),
+    def execute_sql(self) -> ResultSet:
+        sql, params = self.read_sql()
+        return fetch_result_set(
+            sql=sql,
+            params=params,
             **self._pg_conn_params,
         )
 
-    def print(self, data: pd.DataFrame) -> None:
+    def print(self, data: ReportData) -> None:
         help_panel = Panel(self.get_help(), title="Help", height=len(self.get_help().splitlines()) + 1)
         input_panel = Panel(Pretty(self.get_args()), title="Input", height=len(self.get_args()) + 3)
 
         # layout["Info"]["input"].size=200
         print(help_panel)
         print(input_panel)
-        print(tabulate(data, headers="keys", tablefmt=self._command_args["format"]))  # pyright: ignore
+        print_table(self.format_data(data), self._command_args["format"])
+
+    def fetch(self) -> Dict[str, ReportData]:
+        return {self.get_name(): self.execute_sql()}
+
+    def iter_batches(self) -> Iterator[Tuple[str, ReportData]]:
+        sql, params = self.read_sql()
+        for batch in iter_result_set(sql=sql, params=params, **self._pg_conn_params):
+            yield self.get_name(), batch
 
-    def run(self) -> None:
-        data = self.execute_sql()
-        self.print(data=data)
+    def fetch_snapshot(self, snapshot: Snapshot) -> Dict[str, ReportData]:
+        schema = self._command_args["schema"]
+        data = snapshot.table("pg_statio_all_tables")
+        if schema != "_all":
+            data = data[data["schemaname"] == schema]
+        group_by = ["relname"] if schema != "_all" else ["schemaname", "relname"]
+        data = snapshot_hit_ratios(data, group_by, "heap_blks_hit", "heap_blks_read", "table_cache_hit_ratio_pct")
+        return {self.get_name(): data.rename(columns={"relname": "tablename"})}
+
+    def show(self, results: Dict[str, ReportData]) -> None:
+        self.print(data=results[self.get_name()])
 
 
 class IndexCacheHits(Report):
@@ -71,6 +114,8 @@ class IndexCacheHits(Report):
     Standard SQL Report
     """
 
+    default_args: Dict[str, Any] = {"format": "github", "schema": "public"}
+
     def __init__(self, pg_conn_params: Dict[str, Any], **kvargs: Any) -> None:
         self._pg_conn_params = pg_conn_params
         self._command_args = kvargs
@@ -97,27 +142,45 @@ class IndexCacheHits(Report):
     def get_args(self) -> Dict[str, Any]:
         return self._command_args
 
-    def read_sql(self) -> str:
+    def read_sql(self) -> SqlInput:
         return read_sql_input(self.get_name(), **self.get_args())
 
-    def execute_sql(self) -> pd.DataFrame:
-        return execute_sql(
-            sql=self.read_sql(),
+    def execute_sql(self) -> ResultSet:
+        sql, params = self.read_sql()
+        return fetch_result_set(
+            sql=sql,
+            params=params,
             **self._pg_conn_params,
         )
 
-    def print(self, data: pd.DataFrame) -> None:
+    def print(self, data: ReportData) -> None:
         help_panel = Panel(self.get_help(), title="Help", height=len(self.get_help().splitlines()) + 1)
         input_panel = Panel(Pretty(self.get_args()), title="Input", height=len(self.get_args()) + 3)
 
         # layout["Info"]["input"].size=200
         print(help_panel)
         print(input_panel)
-        print(tabulate(data, headers="keys", tablefmt=self._command_args["format"]))  # pyright: ignore
+        print_table(self.format_data(data), self._command_args["format"])
 
-    def run(self) -> None:
-        data = self.execute_sql()
-        self.print(data=data)
+    def fetch(self) -> Dict[str, ReportData]:
+        return {self.get_name(): self.execute_sql()}
+
+    def iter_batches(self) -> Iterator[Tuple[str, ReportData]]:
+        sql, params = self.read_sql()
+        for batch in iter_result_set(sql=sql, params=params, **self._pg_conn_params):
+            yield self.get_name(), batch
+
+    def fetch_snapshot(self, snapshot: Snapshot) -> Dict[str, ReportData]:
+        schema = self._command_args["schema"]
+        data = snapshot.table("pg_statio_all_indexes")
+        if schema != "_all":
+            data = data[data["schemaname"] == schema]
+        group_by = ["relname", "indexrelname"] if schema != "_all" else ["schemaname", "relname", "indexrelname"]
+        data = snapshot_hit_ratios(data, group_by, "idx_blks_hit", "idx_blks_read", "idx_cache_hit_ratio_pct")
+        return {self.get_name(): data.rename(columns={"relname": "tablename", "indexrelname": "indexname"})}
+
+    def show(self, results: Dict[str, ReportData]) -> None:
+        self.print(data=results[self.get_name()])
 
 
 class Usage(Report):
@@ -125,6 +188,8 @@ class Usage(Report):
     Standard SQL Report
     """
 
+    default_args: Dict[str, Any] = {"format": "github", "schema": "public"}
+
     def __init__(self, pg_conn_params: Dict[str, Any], **kvargs: Any) -> None:
         self._pg_conn_params = pg_conn_params
         self._command_args = kvargs
@@ -149,24 +214,45 @@ class Usage(Report):
     def get_args(self) -> Dict[str, Any]:
         return self._command_args
 
-    def read_sql(self) -> str:
+    def read_sql(self) -> SqlInput:
         return read_sql_input(self.get_name(), **self.get_args())
 
-    def execute_sql(self) -> pd.DataFrame:
-        return execute_sql(
-            sql=self.read_sql(),
+    def execute_sql(self) -> ResultSet:
+        sql, params = self.read_sql()
+        return fetch_result_set(
+            sql=sql,
+            params=params,
             **self._pg_conn_params,
         )
 
-    def print(self, data: pd.DataFrame) -> None:
+    def print(self, data: ReportData) -> None:
         help_panel = Panel(self.get_help(), title="Help", height=len(self.get_help().splitlines()) + 1)
         input_panel = Panel(Pretty(self.get_args()), title="Input", height=len(self.get_args()) + 3)
 
         # layout["Info"]["input"].size=200
         print(help_panel)
         print(input_panel)
-        print(tabulate(data, headers="keys", tablefmt=self._command_args["format"]))  # pyright: ignore
+        print_table(self.format_data(data), self._command_args["format"])
+
+    def fetch(self) -> Dict[str, ReportData]:
+        return {self.get_name(): self.execute_sql()}
+
+    def iter_batches(self) -> Iterator[Tuple[str, ReportData]]:
+        sql, params = self.read_sql()
+        for batch in iter_result_set(sql=sql, params=params, **self._pg_conn_params):
+            yield self.get_name(), batch
+
+    def fetch_snapshot(self, snapshot: Snapshot) -> Dict[str, ReportData]:
+        schema = self._command_args["schema"]
+        data = snapshot.table("pg_buffercache_usage")
+        if schema != "_all":
+            data = data[data["sch_name"] == schema]
+        data = data.assign(
+            rel_type=data["relkind"].map(RELATION_KINDS),  # pyright: ignore
+            used_buffers_pct=(data["used_buffers"] / data["buffer_count"] * 100).round(2),
+        )
+        columns = [*(["sch_name"] if schema == "_all" else []), "rel_name", "rel_type", "buffer_count", "used_buffers", "used_buffers_pct"]
+        return {self.get_name(): top_rows(data[columns], "used_buffers_pct")}
 
-    def run(self) -> None:
-        data = self.execute_sql()
-        self.print(data=data)
+    def show(self, results: Dict[str, ReportData]) -> None:
+        self.print(data=results[self.get_name()])
@@ -0,0 +1,52 @@
+"""Bundle module"""
+
+from typing import Annotated, Union
+
+import typer
+
+from pg_stats_tools.pg.cli import get_pg_output, get_pg_snapshot, pg_params
+from pg_stats_tools.pg.stats.bundle.reports import ReportBundle
+
+BUNDLE_HELP = """Run several reports concurrently from a bundle file (YAML or TOML)
+
+        Bundle file example (YAML):
+
+            workers: 3
+            timeout: 60            # default per report timeout, in seconds
+            reports:
+              - report: SQLStatsBySQLType
+                args: {count: 5, sql_types: [SELECT, UPDATE]}
+              - report: IndexesUsage
+                args: {schema: _all}
+              - report: Usage
+                timeout: 10
+
+        Reports share the database connections of the run (see --db-pool-size). Results are shown in bundle order.
+        """
+
+bundle_app = typer.Typer()
+
+
+@bundle_app.command(name="bundle", help=BUNDLE_HELP)
+def bundle(
+    bundle_file: Annotated[str, typer.Argument(help="Path to the bundle file (.yml, .yaml or .toml)")],
+    workers: Annotated[
+        Union[int, None],
+        typer.Option(help="Number of reports run concurrently. Overrides the bundle file value"),
+    ] = None,
+    timeout: Annotated[
+        Union[float, None],
+        typer.Option(help="Default per report timeout in seconds. Overrides the bundle file value"),
+    ] = None,
+    output_dir: Annotated[
+        Union[str, None],
+        typer.Option(help="Export results as CSV files to this directory instead of printing them"),
+    ] = None,
+) -> None:
+    if get_pg_output() is not None:
+        raise typer.BadParameter("bundle results are exported with --output-dir, --output can not be used", param_hint="--output")
+    try:
+        report_bundle = ReportBundle.from_file(bundle_file, workers=workers, timeout=timeout)
+    except (OSError, ValueError, KeyError) as e:
+        raise typer.BadParameter(str(e), param_hint="bundle_file") from e
+    report_bundle.run(pg_conn_params=pg_params, output_dir=output_dir, snapshot=get_pg_snapshot())
@@ -0,0 +1,146 @@
+"""Report bundles: several reports run concurrently from one bundle file"""
+
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Dict, List, Type, Union
+
+import yaml
+from rich import print
+from rich.panel import Panel
+
+from pg_stats_tools import spans
+from pg_stats_tools.pg.stats.buffers.reports import IndexCacheHits, TableCacheHits, Usage
+from pg_stats_tools.pg.stats.indexes.reports import IndexesUsage, IndexesUsageHints
+from pg_stats_tools.pg.stats.reports import Report
+from pg_stats_tools.pg.stats.sql.reports import ActiveLongRunningSQL, SQLStatsBySQLType, SQLStatsSimplifiedBySQLType, SQLTimeStatsBySQLType, ToolFootprint
+from pg_stats_tools.pg.stats.sql.types import SQLTypes
+from pg_stats_tools.psql import time_budget
+from pg_stats_tools.result import ReportData
+from pg_stats_tools.snapshot import Snapshot
+
+REPORTS: Dict[str, Type[Report]] = {
+    report_cls.__name__: report_cls
+    for report_cls in [
+        SQLTimeStatsBySQLType,
+        SQLStatsBySQLType,
+        SQLStatsSimplifiedBySQLType,
+        ActiveLongRunningSQL,
+        IndexesUsageHints,
+        IndexesUsage,
+        TableCacheHits,
+        IndexCacheHits,
+        Usage,
+        ToolFootprint,
+    ]
+}
+
+
+class BundleTimeoutError(Exception):
+    """A bundle report did not finish in its timeout"""
+
+
+def read_bundle_file(path: str) -> Dict[str, Any]:
+    """Read a bundle definition from a YAML (.yml, .yaml) or TOML (.toml) file"""
+    if path.endswith(".toml"):
+        try:
+            import tomllib
+        except ImportError as e:  # python < 3.11
+            raise ValueError("TOML bundle files require python >= 3.11. Use a YAML bundle file instead") from e
+        with open(path, "rb") as toml_file:
+            return tomllib.load(toml_file)
+    with open(path, "r") as yaml_file:
+        data = yaml.safe_load(yaml_file)
+    return data if isinstance(data, dict) else {}  # pyright: ignore[reportUnknownVariableType]
+
+
+class BundleEntry:
+    """A report of the bundle and the settings used to run it"""
+
+    def __init__(self, index: int, report_name: str, args: Dict[str, Any], timeout: Union[float, None]) -> None:
+        if report_name not in REPORTS:
+            raise ValueError(f"Unknown report {report_name}. Available reports: {', '.join(REPORTS)}")
+        self.index = index
+        self.report_name = report_name
+        self.args = args
+        self.timeout = timeout
+        self.started: Union[float, None] = None
+
+    def build(self, pg_conn_params: Dict[str, Any]) -> Report:
+        report_cls = REPORTS[self.report_name]
+        args = {**report_cls.default_args, **self.args}
+        if isinstance(args.get("sql_types"), list):
+            args["sql_types"] = {SQLTypes[sql_type].name: SQLTypes[sql_type].value for sql_type in args["sql_types"]}
+        return report_cls(pg_conn_params=dict(pg_conn_params), **args)  # type: ignore[call-arg]
+
+
+class ReportBundle:
+    """
+    Runs the fetch phase of every report on a bounded worker pool, sharing the session connections,
+    and shows or exports the results in bundle order as soon as they are available.
+    """
+
+    def __init__(self, entries: List[BundleEntry], workers: int = 4) -> None:
+        self._entries = entries
+        self._workers = max(workers, 1)
+
+    @classmethod
+    def from_file(cls, path: str, workers: Union[int, None] = None, timeout: Union[float, None] = None) -> "ReportBundle":
+        data = read_bundle_file(path)
+        default_timeout = timeout if timeout is not None else data.get("timeout")
+        entries = [
+            BundleEntry(
+                index=index,
+                report_name=item["report"],
+                args=item.get("args", {}) or {},
+                timeout=item.get("timeout", default_timeout),
+            )
+            for index, item in enumerate(data.get("reports", []))
+        ]
+        return cls(entries=entries, workers=workers or data.get("workers", 4))
+
+    def _fetch(self, entry: BundleEntry, report: Report, snapshot: Union[Snapshot, None]) -> Dict[str, ReportData]:
+        entry.started = time.monotonic()
+        # The timeout is the budget of the whole report: each of its statements runs with the time left as statement_timeout,
+        # so the server cancels the one running when the report times out
+        with time_budget(entry.timeout), spans.span("fetch", report=entry.report_name):
+            return report.fetch() if snapshot is None else report.fetch_snapshot(snapshot)
+
+    def _wait(self, entry: BundleEntry, future: "Future[Dict[str, ReportData]]") -> Dict[str, ReportData]:
+        # The timeout counts from the moment the report starts running, not from the moment it is queued
+        while True:
+            try:
+                return future.result(timeout=0.1)
+            except FutureTimeoutError as e:
+                if entry.timeout and entry.started is not None and time.monotonic() - entry.started > entry.timeout:
+                    raise BundleTimeoutError(f"Report {entry.report_name} timed out after {entry.timeout}s") from e
+
+    def export(self, entry: BundleEntry, report: Report, results: Dict[str, ReportData], output_dir: str) -> None:
+        os.makedirs(output_dir, exist_ok=True)
+        for section, data in results.items():
+            name = report.get_name() if section == report.get_name() else f"{report.get_name()}_{section}"
+            data.to_csv(os.path.join(output_dir, f"{entry.index:02d}_{name}.csv"), index=False)
+
+    def run(self, pg_conn_params: Dict[str, Any], output_dir: Union[str, None] = None, snapshot: Union[Snapshot, None] = None) -> None:
+        reports = [entry.build(pg_conn_params) for entry in self._entries]
+        executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="bundle")
+        futures = [executor.submit(self._fetch, entry, report, snapshot) for entry, report in zip(self._entries, reports)]
+        try:
+            for entry, report, future in zip(self._entries, reports, futures):
+                try:
+                    results = self._wait(entry, future)
+                except Exception as e:
+                    # Database errors embed the whole sql text, the reason is on the last line
+                    reason = (str(e).strip().splitlines() or [""])[-1]
+                    print(Panel(f"{type(e).__name__}: {reason}", title=f"[red]{entry.report_name} failed[/red]"))
+                    continue
+                if output_dir:
+                    self.export(entry, report, results, output_dir)
+                else:
+                    with spans.span("show", report=entry.report_name):
+                        report.show(results)
+        finally:
+            # Timed out reports are abandoned: their running statement is cancelled by the server (statement_timeout of the
+            # time left), a later statement fails before it starts. Threads still converting rows finish in the background
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -1,6 +1,17 @@
 import typer
 
+from pg_stats_tools.lazy import LazySubcommand, lazy_group
+
 stats = typer.Typer(
     help="""Performance reports based on pg_stat_statements
-    """
+    """,
+    cls=lazy_group(
+        {
+            "sql": LazySubcommand("pg_stats_tools.pg.stats.sql.cli:sql", "Performance reports for SQL statements based on pg_stat_statements"),
+            "indexes": LazySubcommand("pg_stats_tools.pg.stats.indexes.cli:indexes", "Index based reports"),
+            "buffers": LazySubcommand("pg_stats_tools.pg.stats.buffers.cli:buffers", "Buffer based reports"),
+            "bundle": LazySubcommand("pg_stats_tools.pg.stats.bundle.cli:bundle_app", "Run several reports concurrently from a bundle file (YAML or TOML)"),
+            "fleet": LazySubcommand("pg_stats_tools.pg.stats.fleet.cli:fleet_app", "Run one report across many instances concurrently"),
+        }
+    ),
 )
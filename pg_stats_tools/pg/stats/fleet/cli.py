@@ -0,0 +1,94 @@
+"""Fleet module"""
+
+from typing import Annotated, Dict, List, Union
+
+import typer
+import yaml
+
+from pg_stats_tools.pg.cli import get_pg_output, get_pg_snapshot, pg_params
+from pg_stats_tools.pg.stats.bundle.reports import REPORTS
+from pg_stats_tools.pg.stats.fleet.reports import Fleet, FleetInstance, discover_rds_instances, read_inventory
+
+FLEET_HELP = """Run one report across many instances concurrently and merge the results in one table, with an instance column
+
+        Instances come from an inventory file (YAML or TOML) and/or from RDS instances having the given tags.
+        Inventory file example (YAML):
+
+            defaults:              # connection params of every instance, override those of the pg command
+              db_user: monitoring
+              db_name: postgres
+            instances:
+              - name: orders
+                db_host: orders.abc.eu-west-1.rds.amazonaws.com
+              - db_host: billing.abc.eu-west-1.rds.amazonaws.com
+                db_name: billing
+
+        Each instance has its own tunnel and connections. An instance that fails or does not answer in the timeout
+        is listed as failed, the others are still shown.
+        """
+
+fleet_app = typer.Typer()
+
+
+def parse_tags(tags: List[str]) -> Dict[str, str]:
+    parsed: Dict[str, str] = {}
+    for tag in tags:
+        key, sep, value = tag.partition("=")
+        if not sep or not key:
+            raise typer.BadParameter(f"Invalid tag {tag}. Expected format: key=value", param_hint="--rds-tag")
+        parsed[key] = value
+    return parsed
+
+
+@fleet_app.command(name="fleet", help=FLEET_HELP)
+def fleet(
+    report: Annotated[str, typer.Argument(help=f"Report to run: {', '.join(REPORTS)}")],
+    inventory: Annotated[
+        Union[str, None],
+        typer.Option(help="Path to the inventory file (.yml, .yaml or .toml)"),
+    ] = None,
+    rds_tag: Annotated[
+        Union[List[str], None],
+        typer.Option(help="Add the available RDS Postgres instances having this tag (key=value). Repeatable"),
+    ] = None,
+    aws_profile: Annotated[str, typer.Option(help="AWS profile used to discover RDS instances", envvar="AWS_PROFILE")] = "default",
+    aws_region: Annotated[str, typer.Option(help="AWS region used to discover RDS instances", envvar="AWS_REGION")] = "eu-west-1",
+    args: Annotated[
+        str,
+        typer.Option(help="Report args as a YAML mapping, e.g. '{schema: _all}'"),
+    ] = "{}",
+    workers: Annotated[
+        int,
+        typer.Option(help="Number of instances queried concurrently"),
+    ] = 8,
+    timeout: Annotated[
+        Union[float, None],
+        typer.Option(help="Per instance timeout in seconds, connection included"),
+    ] = 60,
+    output_dir: Annotated[
+        Union[str, None],
+        typer.Option(help="Export merged results as CSV files to this directory instead of printing them"),
+    ] = None,
+) -> None:
+    if get_pg_snapshot() is not None:
+        raise typer.BadParameter("fleet mode queries every instance, it can not be used with --snapshot", param_hint="--snapshot")
+    if get_pg_output() is not None:
+        raise typer.BadParameter("fleet results are exported with --output-dir, --output can not be used", param_hint="--output")
+    if report not in REPORTS:
+        raise typer.BadParameter(f"Unknown report {report}. Available reports: {', '.join(REPORTS)}", param_hint="report")
+    report_args = yaml.safe_load(args) or {}
+    if not isinstance(report_args, dict):
+        raise typer.BadParameter("Report args must be a YAML mapping", param_hint="--args")
+    instances: List[FleetInstance] = []
+    if inventory:
+        try:
+            instances.extend(read_inventory(inventory))
+        except (OSError, ValueError, KeyError) as e:
+            raise typer.BadParameter(str(e), param_hint="--inventory") from e
+    if rds_tag:
+        from pg_stats_tools.aws import AWSClient
+
+        instances.extend(discover_rds_instances(AWSClient(aws_profile=aws_profile, aws_region=aws_region), parse_tags(rds_tag)))
+    if not instances:
+        raise typer.BadParameter("No instances. Use --inventory and/or --rds-tag", param_hint="--inventory")
+    Fleet(report, report_args, instances, workers=workers, timeout=timeout).run(pg_conn_params=pg_params, output_dir=output_dir)
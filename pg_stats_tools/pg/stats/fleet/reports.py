@@ -0,0 +1,115 @@
+"""Fleet mode: one report run across many instances"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, List, NamedTuple, Tuple, Union
+
+import pandas as pd
+from rich import print
+from rich.panel import Panel
+
+from pg_stats_tools.pg.stats.bundle.reports import BundleEntry, ReportBundle, read_bundle_file
+from pg_stats_tools.result import ReportData, as_frame
+from pg_stats_tools.snapshot import Snapshot
+
+if TYPE_CHECKING:
+    from pg_stats_tools.aws import RDSAwsCClient
+
+# Column added in front of every merged table
+FLEET_INSTANCE_COLUMN = "instance"
+
+
+class FleetInstance(NamedTuple):
+    """Name shown in the instance column and the connection params overriding those of the run"""
+
+    name: str
+    conn_params: Dict[str, Any]
+
+
+def read_inventory(path: str) -> List[FleetInstance]:
+    """
+    Instances of an inventory file (YAML or TOML): connection params shared by every instance under defaults,
+    and one entry per instance under instances, named by name or by its db_host
+    """
+    data = read_bundle_file(path)
+    defaults: Dict[str, Any] = data.get("defaults", {}) or {}
+    instances: List[FleetInstance] = []
+    for item in data.get("instances", []):
+        conn_params = {key: value for key, value in item.items() if key != "name"}
+        name = item.get("name") or conn_params.get("db_host")
+        if not name:
+            raise ValueError(f"Inventory instance without name or db_host: {item}")
+        instances.append(FleetInstance(str(name), {**defaults, **conn_params}))
+    return instances
+
+
+def discover_rds_instances(client: "RDSAwsCClient", tags: Dict[str, str]) -> List[FleetInstance]:
+    """Postgres instances having every tag, named by their identifier"""
+    return [
+        FleetInstance(db_instance["DBInstanceIdentifier"], {"db_host": db_instance["Endpoint"]["Address"], "db_port": db_instance["Endpoint"]["Port"]})
+        for db_instance in client.rds_find_db_instances(tags)
+    ]
+
+
+def merge_fleet_results(results: List[Tuple[str, Dict[str, ReportData]]]) -> Dict[str, pd.DataFrame]:
+    """One table per report section with the rows of every instance, in instance order"""
+    frames: Dict[str, List[pd.DataFrame]] = {}
+    for name, tables in results:
+        for section, data in tables.items():
+            frame = as_frame(data).copy()
+            frame.insert(0, FLEET_INSTANCE_COLUMN, name)
+            frames.setdefault(section, []).append(frame)
+    return {section: pd.concat(section_frames, ignore_index=True) for section, section_frames in frames.items()}
+
+
+class Fleet(ReportBundle):
+    """
+    Runs the fetch phase of one report on every instance, on a bounded worker pool. Each instance has its own session
+    (tunnel and connections) and timeout, a slow or unreachable instance is reported as failed without holding the others.
+    """
+
+    def __init__(self, report_name: str, args: Dict[str, Any], instances: List[FleetInstance], workers: int = 8, timeout: Union[float, None] = None) -> None:
+        super().__init__([BundleEntry(index, report_name, args, timeout) for index in range(len(instances))], workers=workers)
+        self._instances = instances
+        self._timeout = timeout
+        self.durations: Dict[str, float] = {}
+
+    def fetch_all(self, pg_conn_params: Dict[str, Any]) -> Tuple[List[Tuple[str, Dict[str, ReportData]]], Dict[str, str]]:
+        """Results of the instances that answered, in instance order, and the failure reason of the others"""
+        connect_timeout = {"db_connect_timeout": max(int(self._timeout), 1)} if self._timeout else {}
+        reports = [entry.build({**pg_conn_params, **connect_timeout, **instance.conn_params}) for entry, instance in zip(self._entries, self._instances)]
+        results: List[Tuple[str, Dict[str, ReportData]]] = []
+        failures: Dict[str, str] = {}
+        executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="fleet")
+        futures = [executor.submit(self._fetch, entry, report, None) for entry, report in zip(self._entries, reports)]
+        try:
+            for entry, instance, future in zip(self._entries, self._instances, futures):
+                try:
+                    results.append((instance.name, self._wait(entry, future)))
+                except Exception as e:
+                    # Database errors embed the whole sql text, the reason is on the last line
+                    failures[instance.name] = f"{type(e).__name__}: {(str(e).strip().splitlines() or [''])[-1]}"
+                if entry.started is not None:
+                    self.durations[instance.name] = time.monotonic() - entry.started
+        finally:
+            # Timed out instances are abandoned, their running statement is cancelled by the time budget of the report (see ReportBundle._fetch)
+            executor.shutdown(wait=False, cancel_futures=True)
+        return results, failures
+
+    def run(self, pg_conn_params: Dict[str, Any], output_dir: Union[str, None] = None, snapshot: Union[Snapshot, None] = None) -> None:
+        if snapshot is not None:
+            raise ValueError("Fleet reports query every instance, they can not be rendered from a snapshot")
+        results, failures = self.fetch_all(pg_conn_params)
+        merged = merge_fleet_results(results)
+        report = self._entries[0].build(pg_conn_params) if self._entries else None
+        if report is not None and merged:
+            if output_dir:
+                os.makedirs(output_dir, exist_ok=True)
+                for section, data in merged.items():
+                    name = report.get_name() if section == report.get_name() else f"{report.get_name()}_{section}"
+                    data.to_csv(os.path.join(output_dir, f"fleet_{name}.csv"), index=False)
+            else:
+                report.show(dict(merged))
+        if failures:
+            print(Panel("\n".join(f"{name}: {reason}" for name, reason in failures.items()), title=f"[red]{len(failures)} of {len(self._instances)} instances failed[/red]"))
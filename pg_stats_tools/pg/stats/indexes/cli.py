@@ -5,7 +5,7 @@ from typing import Annotated, Any, Dict
 import typer
 
 from pg_stats_tools.format import TableFormatOption
-from pg_stats_tools.pg.cli import pg_params
+from pg_stats_tools.pg.cli import get_pg_output, get_pg_snapshot, pg_params
 from pg_stats_tools.pg.stats.indexes.reports import IndexesUsage, IndexesUsageHints
 
 indexes = typer.Typer(
@@ -28,7 +28,7 @@ def index_usage_hints(
     # frame: Union[FrameType, None] = inspect.currentframe()
     # f_name = frame.f_code.co_name if frame else "unknown_function"
     command_args: Dict[str, Any] = {"format": format.value, "schema": schema}
-    IndexesUsageHints(pg_conn_params=pg_params, **command_args).run()
+    IndexesUsageHints(pg_conn_params=pg_params, **command_args).run(snapshot=get_pg_snapshot(), output=get_pg_output())
 
 
 @indexes.command(help=IndexesUsage.get_help())
@@ -45,4 +45,4 @@ def index_usage(
     # frame: Union[FrameType, None] = inspect.currentframe()
     # f_name = frame.f_code.co_name if frame else "unknown_function"
     command_args: Dict[str, Any] = {"format": format.value, "schema": schema}
-    IndexesUsage(pg_conn_params=pg_params, **command_args).run()
+    IndexesUsage(pg_conn_params=pg_params, **command_args).run(snapshot=get_pg_snapshot(), output=get_pg_output())
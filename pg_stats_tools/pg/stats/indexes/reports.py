@@ -1,16 +1,50 @@
 """SQL Reports module"""
 
-from typing import Any, Dict
+from typing import Any, Dict, Iterator, Tuple
 
+import numpy as np
 import pandas as pd
 from rich import print
 from rich.panel import Panel
 from rich.pretty import Pretty
-from tabulate import tabulate
 
-from pg_stats_tools.input_read import read_sql_input
-from pg_stats_tools.psql import execute_sql
+from pg_stats_tools.format import format_size_pretty
+from pg_stats_tools.input_read import SqlInput, read_sql_input
+from pg_stats_tools.psql import fetch_result_set, iter_result_set
+from pg_stats_tools.render import print_table
+from pg_stats_tools.result import ReportData, ResultSet
 from pg_stats_tools.pg.stats.reports import Report
+from pg_stats_tools.snapshot import Snapshot
+
+INDEX_TYPES = ["BTREE", "HASH", "GIST", "SPGIST", "GIN", "BRIN", "BLOOM"]
+
+
+def snapshot_index_ratios(snapshot: Snapshot, schema: str) -> pd.DataFrame:
+    """Non unique indexes with the scan and write ratios of their tables, as the index_ratios CTE of the reports"""
+    tables = snapshot.table("pg_stat_user_tables")
+    indexes = snapshot.table("pg_stat_user_indexes")
+    if schema != "_all":
+        tables = tables[tables["schemaname"] == schema]
+        indexes = indexes[indexes["schemaname"] == schema]
+    tables = pd.DataFrame(
+        {
+            "relid": tables["relid"],
+            "all_scans": tables["idx_scan"] + tables["seq_scan"],
+            "writes": tables["n_tup_ins"] + tables["n_tup_upd"] + tables["n_tup_del"],
+            "table_bytes": tables["table_bytes"],
+        }
+    )
+    indexes = indexes[~indexes["indisunique"].astype(bool)]
+    indexdef = indexes["indexdef"].fillna("")
+    idx_type = np.select([indexdef.str.contains(f"USING {t}", case=False, regex=False) for t in INDEX_TYPES], INDEX_TYPES, default="OTHER")
+    data = indexes.assign(tablename=indexes["relname"], indexname=indexes["indexrelname"], idx_type=idx_type).merge(tables, on="relid")
+    all_scans = data["all_scans"].astype(float)
+    writes = data["writes"].astype(float)
+    data["idx_scan_pct"] = (data["idx_scan"] / all_scans.where(all_scans != 0) * 100).fillna(0.0).round(2)
+    data["scans_per_write"] = data["idx_scan"] / writes.where(writes != 0)
+    data["index_size"] = format_size_pretty(data["index_bytes"])
+    data["table_size"] = format_size_pretty(data["table_bytes"])
+    return data
 
 
 class IndexesUsageHints(Report):
@@ -18,6 +52,8 @@ class IndexesUsageHints(Report):
     Standard SQL Report
     """
 
+    default_args: Dict[str, Any] = {"format": "github", "schema": "public"}
+
     def __init__(self, pg_conn_params: Dict[str, Any], **kvargs: Any) -> None:
         self._pg_conn_params = pg_conn_params
         self._command_args = kvargs
@@ -42,27 +78,62 @@ class IndexesUsageHints(Report):
     def get_args(self) -> Dict[str, Any]:
         return self._command_args
 
-    def read_sql(self) -> str:
+    def read_sql(self) -> SqlInput:
         return read_sql_input(self.get_name(), **self.get_args())
 
-    def execute_sql(self) -> pd.DataFrame:
-        return execute_sql(
-            sql=self.read_sql(),
+    def execute_sql(self) -> ResultSet:
+        sql, params = self.read_sql()
+        return fetch_result_set(
+            sql=sql,
+            params=params,
             **self._pg_conn_params,
         )
 
-    def print(self, data: pd.DataFrame) -> None:
+    def print(self, data: ReportData) -> None:
         help_panel = Panel(self.get_help(), title="Help", height=len(self.get_help().splitlines()))
         input_panel = Panel(Pretty(self.get_args()), title="Input", height=len(self.get_args()) + 3)
 
         # layout["Info"]["input"].size=200
         print(help_panel)
         print(input_panel)
-        print(tabulate(data, headers="keys", tablefmt=self._command_args["format"]))  # pyright: ignore
+        print_table(self.format_data(data), self._command_args["format"])
+
+    def fetch(self) -> Dict[str, ReportData]:
+        return {self.get_name(): self.execute_sql()}
 
-    def run(self) -> None:
-        data = self.execute_sql()
-        self.print(data=data)
+    def iter_batches(self) -> Iterator[Tuple[str, ReportData]]:
+        sql, params = self.read_sql()
+        for batch in iter_result_set(sql=sql, params=params, **self._pg_conn_params):
+            yield self.get_name(), batch
+
+    def fetch_snapshot(self, snapshot: Snapshot) -> Dict[str, ReportData]:
+        data = snapshot_index_ratios(snapshot, self._command_args["schema"])
+        data = data.assign(
+            index_scan_pct=data["idx_scan_pct"],
+            scans_per_write=data["scans_per_write"].fillna(data["idx_scan"].astype(float)).round(2),
+        )
+        is_btree = data["idx_type"] == "BTREE"
+        large = data["index_bytes"] > 100000000
+        total_writes = data.drop_duplicates("relid")["writes"].sum()
+        groups = [
+            ("Never Used Indexes", (data["idx_scan"] == 0) & is_btree),
+            (
+                "Low Scans, High Writes",
+                (data["scans_per_write"] <= 1) & (data["index_scan_pct"] < 10) & (data["idx_scan"] > 0) & (data["writes"] > 100) & is_btree,
+            ),
+            (
+                "Seldom Used Large Indexes",
+                (data["index_scan_pct"] < 5) & (data["scans_per_write"] > 1) & (data["idx_scan"] > 0) & is_btree & large,
+            ),
+            ("High-Write Large Non-Btree", (data["writes"] / (total_writes + 1) > 0.02) & ~is_btree & large),
+        ]
+        hints = pd.concat([data[mask].assign(reason=reason, grp=grp) for grp, (reason, mask) in enumerate(groups, start=1)])
+        hints = hints.sort_values(["grp", "index_bytes"], ascending=[True, False], kind="stable").reset_index(drop=True)
+        columns = ["reason", "tablename", "indexname", "index_scan_pct", "scans_per_write", "index_size", "table_size"]
+        return {self.get_name(): hints[columns]}
+
+    def show(self, results: Dict[str, ReportData]) -> None:
+        self.print(data=results[self.get_name()])
 
 
 class IndexesUsage(Report):
@@ -70,6 +141,8 @@ class IndexesUsage(Report):
     Standard SQL Report
     """
 
+    default_args: Dict[str, Any] = {"format": "github", "schema": "public"}
+
     def __init__(self, pg_conn_params: Dict[str, Any], **kvargs: Any) -> None:
         self._pg_conn_params = pg_conn_params
         self._command_args = kvargs
@@ -94,24 +167,39 @@ class IndexesUsage(Report):
     def get_args(self) -> Dict[str, Any]:
         return self._command_args
 
-    def read_sql(self) -> str:
+    def read_sql(self) -> SqlInput:
         return read_sql_input(self.get_name(), **self.get_args())
 
-    def execute_sql(self) -> pd.DataFrame:
-        return execute_sql(
-            sql=self.read_sql(),
+    def execute_sql(self) -> ResultSet:
+        sql, params = self.read_sql()
+        return fetch_result_set(
+            sql=sql,
+            params=params,
             **self._pg_conn_params,
         )
 
-    def print(self, data: pd.DataFrame) -> None:
+    def print(self, data: ReportData) -> None:
         help_panel = Panel(self.get_help(), title="Help", height=len(self.get_help().splitlines()))
         input_panel = Panel(Pretty(self.get_args()), title="Input", height=len(self.get_args()) + 3)
 
         # layout["Info"]["input"].size=200
         print(help_panel)
         print(input_panel)
-        print(tabulate(data, headers="keys", tablefmt=self._command_args["format"]))  # pyright: ignore
+        print_table(self.format_data(data), self._command_args["format"])
+
+    def fetch(self) -> Dict[str, ReportData]:
+        return {self.get_name(): self.execute_sql()}
+
+    def iter_batches(self) -> Iterator[Tuple[str, ReportData]]:
+        sql, params = self.read_sql()
+        for batch in iter_result_set(sql=sql, params=params, **self._pg_conn_params):
+            yield self.get_name(), batch
+
+    def fetch_snapshot(self, snapshot: Snapshot) -> Dict[str, ReportData]:
+        data = snapshot_index_ratios(snapshot, self._command_args["schema"])
+        data = data.assign(scans_per_write=data["scans_per_write"].fillna(-1).round(2), idx_size=data["index_size"], tbl_size=data["table_size"])
+        columns = ["tablename", "indexname", "idx_scan", "all_scans", "idx_scan_pct", "writes", "scans_per_write", "idx_size", "tbl_size", "idx_type"]
+        return {self.get_name(): data[columns].reset_index(drop=True)}
 
-    def run(self) -> None:
-        data = self.execute_sql()
-        self.print(data=data)
+    def show(self, results: Dict[str, ReportData]) -> None:
+        self.print(data=results[self.get_name()])
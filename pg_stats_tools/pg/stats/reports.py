@@ -2,6 +2,21 @@
 
 
 from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterator, List, Tuple, Union
+
+import pandas as pd
+
+from pg_stats_tools import spans
+from pg_stats_tools.format import ColumnFormat, format_columns
+from pg_stats_tools.output import ReportOutput
+from pg_stats_tools.result import ReportData, ResultSet, as_frame
+from pg_stats_tools.snapshot import Snapshot
+
+
+def top_rows(data: pd.DataFrame, field: str, count: Union[int, None] = None, ascending: bool = False) -> pd.DataFrame:
+    """Rows sorted as ORDER BY field [ASC|DESC] LIMIT count does in postgres (NULLs are the largest values)"""
+    data = data.sort_values(field, ascending=ascending, na_position="last" if ascending else "first", kind="stable")
+    return (data if count is None else data.head(count)).reset_index(drop=True)
 
 
 class Report(ABC):
@@ -9,6 +24,13 @@ class Report(ABC):
     Interface for all reports
     """
 
+    # Args used when a report is built outside the cli (e.g. from a bundle file) and an arg is not given
+    default_args: Dict[str, Any] = {"format": "github"}
+    # Raw numeric columns rendered client side before printing
+    column_formats: Dict[str, ColumnFormat] = {}
+    # Columns whose value changes on every run (e.g. elapsed times). Watch mode ignores them to find changed rows
+    volatile_columns: List[str] = []
+
     # @property
     # @abstractmethod
     # def product(self) -> None:
@@ -19,5 +41,52 @@ class Report(ABC):
         pass
 
     @abstractmethod
-    def run(self) -> None:
+    def get_name(self) -> str:
+        pass
+
+    @abstractmethod
+    def fetch(self) -> Dict[str, ReportData]:
+        """
+        Execute report queries. Returns one table per report section, in display order.
+        Tables are ResultSets when they are only printed, DataFrames when the report computes on them
+        """
         pass
+
+    def fetch_snapshot(self, snapshot: Snapshot) -> Dict[str, ReportData]:
+        """Same tables as fetch, computed from a snapshot instead of querying the database"""
+        raise NotImplementedError(f"{type(self).__name__} can not be rendered from a snapshot")
+
+    @abstractmethod
+    def show(self, results: Dict[str, ReportData]) -> None:
+        """Print fetched results"""
+        pass
+
+    def format_data(self, data: ReportData) -> ReportData:
+        if isinstance(data, ResultSet) and not any(column in data.columns for column in self.column_formats):
+            return data
+        return format_columns(as_frame(data), self.column_formats)
+
+    def iter_batches(self) -> Iterator[Tuple[str, ReportData]]:
+        """
+        Fetched tables as (section, table) pairs, in display order.
+        Reports reading their rows from a server side cursor override it to yield each table batch by batch
+        """
+        yield from self.fetch().items()
+
+    def write(self, output: ReportOutput, snapshot: Union[Snapshot, None] = None) -> None:
+        """Write the raw (unformatted) tables to output, without panels"""
+        batches = self.iter_batches() if snapshot is None else iter(self.fetch_snapshot(snapshot).items())
+        with output.open() as writer:
+            for section, data in batches:
+                writer.write(section, data)
+
+    def run(self, snapshot: Union[Snapshot, None] = None, output: Union[ReportOutput, None] = None) -> None:
+        with spans.span("report", report=self.get_name()):
+            if output is not None:
+                with spans.span("write"):
+                    self.write(output, snapshot)
+                return
+            with spans.span("fetch"):
+                results = self.fetch() if snapshot is None else self.fetch_snapshot(snapshot)
+            with spans.span("show"):
+                self.show(results)
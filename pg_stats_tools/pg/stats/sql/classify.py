@@ -0,0 +1,128 @@
+"""
+Statement type classification by leading keyword.
+
+The keyword is the first word of the statement once leading comments and parentheses are skipped.
+For WITH statements it is the keyword of the main statement that follows the CTEs.
+The same classification runs server side (one regex extraction per statement) or client side
+(a single pass tokenizer, memoized per statement).
+"""
+
+import functools
+import re
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+# SQL type -> leading keyword, as SQLTypes (pg_stats_tools.pg.stats.sql.types)
+SQL_TYPE_KEYWORDS: Dict[str, str] = {
+    "SELECT": "SELECT",
+    "FETCH": "FETCH",
+    "INSERT": "INSERT",
+    "UPDATE": "UPDATE",
+    "DELETE": "DELETE",
+    "CREATE": "CREATE",
+    "DROP": "DROP",
+    "ALTER": "ALTER",
+    "TRUNCATE": "TRUNCATE",
+    "GRANT": "GRANT",
+    "REVOKE": "REVOKE",
+    "MOVE": "MOVE",
+    "COMMIT": "COMMIT",
+    "ROLLBACK": "ROLLBACK",
+    "SAVEPOINT": "SAVEPOINT",
+    "TRANSACTION": "BEGIN",
+}
+KEYWORD_SQL_TYPES: Dict[str, str] = {keyword: sql_type for sql_type, keyword in SQL_TYPE_KEYWORDS.items()}
+OTHER_SQL_TYPE = "OTHER"
+
+# Statements starting with these keywords are classified as the statement they are a synonym of
+KEYWORD_SYNONYMS: Dict[str, str] = {"START": "BEGIN", "END": "COMMIT", "ABORT": "ROLLBACK", "TABLE": "SELECT", "VALUES": "SELECT"}
+# Keywords a WITH statement can continue with after its CTEs
+MAIN_KEYWORDS: List[str] = ["SELECT", "INSERT", "UPDATE", "DELETE", "MERGE", "VALUES", "TABLE"]
+
+LEADING_WORD_PATTERN = r"^(?:\s+|--[^\n]*(?:\n|$)|/\*(?:[^*]|\*+[^*/])*\*+/|\()*([A-Za-z]+)"
+# Approximation of the main keyword of a WITH statement for the server side: the first keyword after a closing
+# parenthesis. Exact unless a CTE body itself has that sequence (e.g. INSERT INTO t (a) SELECT ...)
+WITH_MAIN_PATTERN = r"\)\s*(" + "|".join(MAIN_KEYWORDS) + r")\M"
+
+_LEADING_WORD = re.compile(LEADING_WORD_PATTERN)
+_TOKEN = re.compile(
+    r"""--[^\n]*|/\*.*?\*/|'(?:[^']|'')*'?|"(?:[^"]|"")*"?|(\$[A-Za-z0-9_]*\$).*?(?:\1|$)|([()])|([A-Za-z_][A-Za-z0-9_$]*)""",
+    re.DOTALL,
+)
+
+
+def _with_main_keyword(query: str, start: int) -> str:
+    """Keyword of the main statement of a WITH statement: the first known keyword at depth 0 after a closing parenthesis"""
+    depth = 0
+    after_paren = False
+    for token in _TOKEN.finditer(query, start):
+        paren, word = token.group(2), token.group(3)
+        if paren == "(":
+            depth += 1
+        elif paren == ")":
+            depth -= 1
+            after_paren = depth == 0
+        elif word is not None and depth == 0:
+            keyword = word.upper()
+            if after_paren and keyword in MAIN_KEYWORDS:
+                return keyword
+            after_paren = False
+    # Text truncated inside the CTEs
+    return "WITH"
+
+
+@functools.lru_cache(maxsize=65536)
+def leading_keyword(query: str) -> str:
+    """Upper case leading keyword of a statement, synonyms resolved. Empty when the text has no keyword"""
+    match = _LEADING_WORD.match(query)
+    if match is None:
+        return ""
+    keyword = match.group(1).upper()
+    if keyword == "WITH":
+        keyword = _with_main_keyword(query, match.end())
+    return KEYWORD_SYNONYMS.get(keyword, keyword)
+
+
+def query_keywords(queries: "pd.Series[str]") -> np.ndarray:
+    """Leading keyword of every query. Each distinct text is classified once"""
+    codes, uniques = pd.factorize(queries.fillna(""))
+    return np.array([leading_keyword(query) for query in uniques], dtype=object)[codes] if len(uniques) else np.array([], dtype=object)
+
+
+def statement_keywords(statements: pd.DataFrame) -> np.ndarray:
+    """Leading keyword of every pg_stat_statements row, classified once per (dbid, queryid) unless the rows have it already"""
+    if "leading_keyword" in statements.columns:
+        return statements["leading_keyword"].fillna("").to_numpy(dtype=object)
+    if "queryid" not in statements.columns or "dbid" not in statements.columns:
+        return query_keywords(statements["query"])
+    codes, uniques = pd.factorize(pd.MultiIndex.from_frame(statements[["dbid", "queryid"]].fillna(0)))
+    first = pd.Series(np.arange(len(codes))).groupby(codes).first().to_numpy()
+    keywords = query_keywords(statements["query"].iloc[first].reset_index(drop=True))
+    return keywords[codes] if len(uniques) else keywords
+
+
+def keyword_sql_types(keywords: np.ndarray) -> np.ndarray:
+    """SQL type (SQLTypes names, OTHER otherwise) of leading keywords"""
+    return pd.Series(keywords, dtype=object).map(KEYWORD_SQL_TYPES).fillna(OTHER_SQL_TYPE).to_numpy()
+
+
+def leading_keyword_join(query_column: str) -> str:
+    """
+    LATERAL join adding the leading_keyword column, the server side equivalent of leading_keyword.
+    The leading word is extracted with one regex, the WITH case needs a second one
+    """
+    synonyms = " ".join(f"WHEN '{word}' THEN '{keyword}'" for word, keyword in KEYWORD_SYNONYMS.items())
+    return (
+        "CROSS JOIN LATERAL (SELECT CASE lead.word "
+        f"WHEN 'WITH' THEN coalesce(upper(substring({query_column} from '(?i){WITH_MAIN_PATTERN}')), 'WITH') {synonyms} "
+        "ELSE coalesce(lead.word, '') END AS leading_keyword "
+        f"FROM (SELECT upper(substring({query_column} from '(?i){LEADING_WORD_PATTERN}')) AS word) AS lead) AS classified"
+    )
+
+
+def sql_type_case(keyword_column: str = "classified.leading_keyword") -> str:
+    """SQL expression mapping a leading keyword column to its SQL type"""
+    whens = " ".join(f"WHEN '{keyword}' THEN '{sql_type}'" for keyword, sql_type in KEYWORD_SQL_TYPES.items())
+    return f"CASE {keyword_column} {whens} ELSE '{OTHER_SQL_TYPE}' END"
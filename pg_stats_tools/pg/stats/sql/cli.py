@@ -1,16 +1,17 @@
 """SQL module"""
 
 
-from enum import Enum
 from typing import Annotated, Any, Dict, List, Union
 from datetime import datetime, timedelta
 
 import typer
 
-from pg_stats_tools.time_fn import parse_timestamp
+from pg_stats_tools.time_fn import parse_interval, parse_timestamp
 from pg_stats_tools.format import TableFormatOption
-from pg_stats_tools.pg.cli import pg_params
-from pg_stats_tools.pg.stats.sql.reports import SQLStatsBySQLType, SQLTimeStatsBySQLType, ActiveLongRunningSQL, SQLStatsSimplifiedBySQLType
+from pg_stats_tools.pg.cli import get_pg_output, get_pg_snapshot, pg_params, watch_conn_params
+from pg_stats_tools.pg.stats.sql.reports import SQLStatsBySQLType, SQLTimeStatsBySQLType, ActiveLongRunningSQL, SQLStatsSimplifiedBySQLType, ToolFootprint
+from pg_stats_tools.pg.stats.sql.types import ActiveSQLStatsFields, SortDir, SQLSimplifiedStatsFields, SQLStatsFields, SqlTimeStatsFields, SQLTypes
+from pg_stats_tools.pg.stats.watch import watch_report
 
 sql = typer.Typer(
     help="""Performance reports for SQL statements based on pg_stat_statements
@@ -18,95 +19,6 @@ sql = typer.Typer(
 )
 
 
-class SqlTimeStatsFields(str, Enum):
-    avg_time_ms = "avg_time_ms"
-    num_calls = "num_calls"
-    total_time_ms = "total_time_ms"
-    max_time_ms = "max_time_ms"
-
-
-class SQLStatsFields(str, Enum):
-    calls = "calls"
-    total_time = "total_time"
-    min_time = "min_time"
-    max_time = "max_time"
-    mean_time = "mean_time"
-    stddev_time = "stddev_time"
-    rows = "rows"
-    shared_blks_hit = "shared_blks_hit"
-    shared_blks_read = "shared_blks_read"
-    shared_blks_dirtied = "shared_blks_dirtied"
-    shared_blks_written = "shared_blks_written"
-    local_blks_hit = "local_blks_hit"
-    local_blks_read = "local_blks_read"
-    local_blks_dirtied = "local_blks_dirtied"
-    local_blks_written = "local_blks_written"
-    temp_blks_read = "temp_blks_read"
-    temp_blks_written = "temp_blks_written"
-    blk_read_time = "blk_read_time"
-    blk_write_time = "blk_write_time"
-
-
-# https://documentation.red-gate.com/sm13/postgresql-top-queries-199098901.html
-class SQLSimplifiedStatsFields(str, Enum):
-    calls = "calls"
-    rows = "rows"
-    arows = "arows"
-    time = "time"
-    atime = "atime"
-    iotime = "iotime"
-    aiotime = "aiotime"
-    blk_r = "blk_r"
-    ablk_r = "ablk_r"
-    buff_blk_r = "buff_blk_r"
-    abuff_blk_r = "abuff_blk_r"
-    buff_blk_r_pct = "buff_blk_r_pct"
-    blk_w = "blk_w"
-    ablk_w = "ablk_w"
-
-
-class ActiveSQLStatsFields(str, Enum):
-    application_name = "application_name"
-    client_addr = "client_addr"
-    client_hostname = "client_hostname"
-    client_port = "client_port"
-    backend_start = "backend_start"
-    xact_start = "xact_start"
-    query_start = "query_start"
-    state_change = "state_change"
-    wait_event_type = "wait_event_type"
-    wait_event = "wait_event"
-    state = "state"
-    backend_xid = "backend_xid"
-    backend_xmin = "backend_xmin"
-    query = "query"
-    backend_type = "backend_type"
-
-
-class SQLTypes(str, Enum):
-    SELECT = "SELECT"
-    INSERT = "INSERT"
-    UPDATE = "UPDATE"
-    DELETE = "DELETE"
-    FETCH = "FETCH"
-    CREATE = "CREATE"
-    DROP = "DROP"
-    ALTER = "ALTER"
-    TRUNCATE = "TRUNCATE"
-    GRANT = "GRANT"
-    REVOKE = "REVOKE"
-    MOVE = "MOVE"
-    COMMIT = "COMMIT"
-    ROLLBACK = "ROLLBACK"
-    SAVEPOINT = "SAVEPOINT"
-    TRANSACTION = "BEGIN"
-
-
-class SortDir(str, Enum):
-    ASC = "ASC"
-    DESC = "DESC"
-
-
 @sql.command(help=SQLTimeStatsBySQLType.get_help())
 def sql_time_stats_by_type(
     order_by: Annotated[
@@ -124,6 +36,10 @@ def sql_time_stats_by_type(
         str,
         typer.Option(help="Database name"),
     ] = "_all",
+    interval: Annotated[
+        Union[str, None],
+        typer.Option(help="Sample pg_stat_statements twice, this far apart (e.g. 60s, 5m), and rank on per second rates of the interval"),
+    ] = None,
 ) -> None:
     # frame: Union[FrameType, None] = inspect.currentframe()
     # f_name = frame.f_code.co_name if frame else "unknown_function"
@@ -132,9 +48,10 @@ def sql_time_stats_by_type(
         "order_by": order_by.value,
         "format": format.value,
         "dbid": dbid,
+        "interval": parse_interval(interval) if interval else None,
     }
 
-    SQLTimeStatsBySQLType(pg_conn_params=pg_params, **command_args).run()
+    SQLTimeStatsBySQLType(pg_conn_params=pg_params, **command_args).run(snapshot=get_pg_snapshot(), output=get_pg_output())
 
 
 @sql.command(help=SQLStatsBySQLType.get_help())
@@ -166,6 +83,20 @@ def top_sql_stats_by_type(
         Union[List[SQLTypes], None],
         typer.Option(help="SQL Types"),
     ] = None,
+    single_query: Annotated[
+        bool,
+        typer.Option(help="Classify and rank all SQL types in a single query instead of one query per SQL type"),
+    ] = False,
+    interval: Annotated[
+        Union[str, None],
+        typer.Option(help="Sample pg_stat_statements twice, this far apart (e.g. 60s, 5m), and rank on per second rates of the interval"),
+    ] = None,
+    text_cache: Annotated[
+        bool,
+        typer.Option(
+            help="Fetch the statistics of all statements without query texts, rank them locally and resolve the texts shown through the local query text cache"
+        ),
+    ] = False,
 ) -> None:
     # frame: Union[FrameType, None] = inspect.currentframe()
     # f_name = frame.f_code.co_name if frame else "unknown_function"
@@ -178,10 +109,13 @@ def top_sql_stats_by_type(
         "format": format.value,
         "dbname": dbname,
         "count": count,
+        "single_query": single_query,
+        "interval": parse_interval(interval) if interval else None,
+        "text_cache": text_cache,
     }
     sql_types = {sql_type.name: sql_type.value for sql_type in sql_type}
     fetch_fields = [field.name for field in fetch_field if field != top_stat_field]
-    SQLStatsBySQLType(pg_conn_params=pg_params, sql_types=sql_types, fetch_fields=fetch_fields, **command_args).run()
+    SQLStatsBySQLType(pg_conn_params=pg_params, sql_types=sql_types, fetch_fields=fetch_fields, **command_args).run(snapshot=get_pg_snapshot(), output=get_pg_output())
 
 
 @sql.command(help=SQLStatsSimplifiedBySQLType.get_help())
@@ -213,12 +147,35 @@ def top_sql_stats_simplified_by_type(
         List[SQLTypes],
         typer.Option(help="SQL Types"),
     ] = [SQLTypes.SELECT, SQLTypes.INSERT, SQLTypes.UPDATE, SQLTypes.DELETE],
+    single_query: Annotated[
+        bool,
+        typer.Option(help="Classify and rank all SQL types in a single query instead of one query per SQL type"),
+    ] = False,
+    interval: Annotated[
+        Union[str, None],
+        typer.Option(help="Sample pg_stat_statements twice, this far apart (e.g. 60s, 5m), and rank on per second rates of the interval"),
+    ] = None,
+    text_cache: Annotated[
+        bool,
+        typer.Option(
+            help="Fetch the statistics of all statements without query texts, rank them locally and resolve the texts shown through the local query text cache"
+        ),
+    ] = False,
 ) -> None:
     # frame: Union[FrameType, None] = inspect.currentframe()
     # f_name = frame.f_code.co_name if frame else "unknown_function"
-    command_args: Dict[str, Any] = {"top_stat_field": top_stat_field.value, "sort": sort.value, "format": format.value, "dbname": dbname, "count": count}
+    command_args: Dict[str, Any] = {
+        "top_stat_field": top_stat_field.value,
+        "sort": sort.value,
+        "format": format.value,
+        "dbname": dbname,
+        "count": count,
+        "single_query": single_query,
+        "interval": parse_interval(interval) if interval else None,
+        "text_cache": text_cache,
+    }
     sql_types = {sql_type.name: sql_type.value for sql_type in sql_type}
-    SQLStatsSimplifiedBySQLType(pg_conn_params=pg_params, sql_types=sql_types, **command_args).run()
+    SQLStatsSimplifiedBySQLType(pg_conn_params=pg_params, sql_types=sql_types, **command_args).run(snapshot=get_pg_snapshot(), output=get_pg_output())
 
 
 @sql.command(help=ActiveLongRunningSQL.get_help())
@@ -243,6 +200,14 @@ def active_sql_long_running(
         List[SQLTypes],
         typer.Option(help="SQL Types"),
     ] = [SQLTypes.SELECT, SQLTypes.INSERT, SQLTypes.UPDATE, SQLTypes.DELETE],
+    single_query: Annotated[
+        bool,
+        typer.Option(help="Classify and rank all SQL types in a single query instead of one query per SQL type"),
+    ] = False,
+    watch: Annotated[
+        Union[float, None],
+        typer.Option(help="Re-run the report every WATCH seconds on one open connection and redraw it in place, until Ctrl+C"),
+    ] = None,
 ) -> None:
     # frame: Union[FrameType, None] = inspect.currentframe()
     # f_name = frame.f_code.co_name if frame else "unknown_function"
@@ -258,7 +223,27 @@ def active_sql_long_running(
         "format": format.value,
         "dbname": dbname,
         "count": count,
+        "single_query": single_query,
     }
     sql_types = {sql_type.name: sql_type.value for sql_type in sql_type}
     fetch_fields = [field.name for field in fetch_field]
-    ActiveLongRunningSQL(pg_conn_params=pg_params, sql_types=sql_types, fetch_fields=fetch_fields, **command_args).run()
+    if watch:
+        report = ActiveLongRunningSQL(pg_conn_params=watch_conn_params(), sql_types=sql_types, fetch_fields=fetch_fields, **command_args)
+        watch_report(report, watch)
+        return
+    ActiveLongRunningSQL(pg_conn_params=pg_params, sql_types=sql_types, fetch_fields=fetch_fields, **command_args).run(snapshot=get_pg_snapshot(), output=get_pg_output())
+
+
+@sql.command(help=ToolFootprint.get_help())
+def tool_footprint(
+    format: Annotated[
+        TableFormatOption,
+        typer.Option(help="Output table format", case_sensitive=True),
+    ] = TableFormatOption.psql,
+    count: Annotated[
+        int,
+        typer.Option(help="Number of statements listed"),
+    ] = 20,
+) -> None:
+    command_args: Dict[str, Any] = {"format": format.value, "count": count}
+    ToolFootprint(pg_conn_params=pg_params, **command_args).run(snapshot=get_pg_snapshot(), output=get_pg_output())
@@ -0,0 +1,97 @@
+"""Interval (rate) mode for pg_stat_statements reports"""
+
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+from rich import print
+
+from pg_stats_tools.pg.stats.sql.texts import fetch_statements, with_statement_keywords
+
+# Statements are the same entry in both samples when these match
+STATEMENT_KEYS: List[str] = ["userid", "dbid", "queryid"]
+
+# Cumulative counters turned into per second rates
+STATEMENT_COUNTERS: List[str] = [
+    "calls",
+    "total_time",
+    "rows",
+    "shared_blks_hit",
+    "shared_blks_read",
+    "shared_blks_dirtied",
+    "shared_blks_written",
+    "local_blks_hit",
+    "local_blks_read",
+    "local_blks_dirtied",
+    "local_blks_written",
+    "temp_blks_read",
+    "temp_blks_written",
+    "blk_read_time",
+    "blk_write_time",
+]
+
+# Extremes of the whole statement life, they can not be computed for an interval
+STATEMENT_EXTREMES: List[str] = ["min_time", "max_time", "stddev_time"]
+
+
+def sample_statements(pg_conn_params: Dict[str, Any]) -> Tuple[pd.DataFrame, float]:
+    """pg_stat_statements counters and the (monotonic) time they were read at"""
+    start = time.monotonic()
+    data = fetch_statements(pg_conn_params)
+    return data, (start + time.monotonic()) / 2
+
+
+def diff_statements(first: pd.DataFrame, second: pd.DataFrame, seconds: float) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """
+    Per second rates of the statements executed between two samples.
+    Entries added between samples, or whose counters went backwards (evicted and added again, or reset),
+    count from zero. Entries only in the first sample were evicted and are dropped.
+    """
+    keys = [key for key in STATEMENT_KEYS + ["toplevel"] if key in second.columns and key in first.columns]
+    counters = [column for column in STATEMENT_COUNTERS if column in second.columns and column in first.columns]
+    previous = first[keys + counters].drop_duplicates(keys)
+    data = second.merge(previous, on=keys, how="left", suffixes=("", "_previous"), indicator=True)
+    current = data[counters].to_numpy(dtype=float)
+    before = data[[f"{column}_previous" for column in counters]].to_numpy(dtype=float)
+    is_new = (data["_merge"] == "left_only").to_numpy()
+    is_reset = ~is_new & (current[:, counters.index("calls")] < before[:, counters.index("calls")])
+    # A reset entry restarted from zero, so all its current counters happened during the interval
+    delta = np.where((is_new | is_reset)[:, None], current, current - before)
+    rates = data.drop(columns=[f"{column}_previous" for column in counters] + ["_merge"])
+    rates[counters] = delta / max(seconds, 1e-6)
+    calls = delta[:, counters.index("calls")]
+    if "mean_time" in rates.columns:
+        # ms per call in the interval, the ratio is the same with counters or rates
+        rates["mean_time"] = delta[:, counters.index("total_time")] / np.where(calls > 0, calls, np.nan)
+    for column in STATEMENT_EXTREMES:
+        if column in rates.columns:
+            rates[column] = np.nan
+    stats = {
+        "seconds": int(round(seconds)),
+        "statements": int((calls > 0).sum()),
+        "new": int(is_new.sum()),
+        "reset": int(is_reset.sum()),
+        "evicted": int(len(previous) - (~is_new).sum()),
+    }
+    return rates[calls > 0].reset_index(drop=True), stats
+
+
+def sample_statement_rates(pg_conn_params: Dict[str, Any], interval: float) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """
+    Two pg_stat_statements samples interval seconds apart, diffed into per second rates.
+    Leading keywords are resolved only for the statements executed in the interval
+    """
+    first, first_at = sample_statements(pg_conn_params)
+    time.sleep(max(interval - (time.monotonic() - first_at), 0))
+    second, second_at = sample_statements(pg_conn_params)
+    rates, stats = diff_statements(first, second, second_at - first_at)
+    return with_statement_keywords(pg_conn_params, rates), stats
+
+
+def print_interval_stats(stats: Dict[str, int]) -> None:
+    if stats:
+        print(
+            f"Per second rates over {stats['seconds']}s: {stats['statements']} statements executed, "
+            f"{stats['new']} new, {stats['reset']} reset and {stats['evicted']} evicted between samples"
+        )
@@ -1,16 +1,44 @@
 """SQL Reports module"""
 
-from typing import Any, Dict, List
+import re
+from typing import Any, Dict, Iterator, List, Tuple
 
+import numpy as np
 import pandas as pd
 from rich import print
 from rich.panel import Panel
 from rich.pretty import Pretty
-from tabulate import tabulate
 
-from pg_stats_tools.input_read import read_sql_input
-from pg_stats_tools.psql import execute_sql
-from pg_stats_tools.pg.stats.reports import Report
+from pg_stats_tools.format import ColumnFormat
+from pg_stats_tools.guard import STATEMENT_TAG
+from pg_stats_tools.input_read import SqlInput, read_sql_input
+from pg_stats_tools.psql import execute_sql, fetch_result_set, iter_result_set
+from pg_stats_tools.render import print_table
+from pg_stats_tools.result import ReportData, ResultSet
+from pg_stats_tools.pg.stats.reports import Report, top_rows
+from pg_stats_tools.pg.stats.sql.classify import keyword_sql_types, leading_keyword_join, query_keywords, sql_type_case, statement_keywords
+from pg_stats_tools.pg.stats.sql.interval import print_interval_stats, sample_statement_rates
+from pg_stats_tools.pg.stats.sql.texts import fetch_statements, with_query_texts, with_statement_keywords
+from pg_stats_tools.snapshot import Snapshot
+
+DEFAULT_SQL_TYPES: Dict[str, str] = {"SELECT": "SELECT", "INSERT": "INSERT", "UPDATE": "UPDATE", "DELETE": "DELETE"}
+
+
+def named_statements(statements: pd.DataFrame, dbname: str = "_all") -> pd.DataFrame:
+    """pg_stat_statements rows with user and database names as the report queries return them"""
+    if dbname != "_all":
+        statements = statements[statements["datname"] == dbname]
+    return statements.assign(user=statements["usename"], database=statements["datname"])
+
+
+def split_by_sql_type(data: pd.DataFrame, sql_types: Dict[str, str]) -> Dict[str, ReportData]:
+    """Split the result of a single query report into one table per sql type, keyed and ordered as sql_types"""
+    grouped = {sql_type: group for sql_type, group in data.groupby("sql_type", sort=False)}  # pyright: ignore
+    empty = data.iloc[0:0]
+    return {
+        k: grouped.get(v, empty).drop(columns=["sql_type", "sql_type_rank"]).reset_index(drop=True)  # pyright: ignore
+        for k, v in sql_types.items()
+    }
 
 
 class SQLTimeStatsBySQLType(Report):
@@ -18,6 +46,11 @@ class SQLTimeStatsBySQLType(Report):
     Standard SQL Report
     """
 
+    # Statement counts of the last interval sample, shown with the results
+    _interval_stats: Dict[str, int] = {}
+
+    default_args: Dict[str, Any] = {"order_by": "avg_time_ms", "format": "psql", "dbid": "_all"}
+
     def __init__(self, pg_conn_params: Dict[str, Any], **kvargs: Any) -> None:
         self._pg_conn_params = pg_conn_params
         self._command_args = kvargs
@@ -40,27 +73,65 @@ class SQLTimeStatsBySQLType(Report):
     def get_args(self) -> Dict[str, Any]:
         return self._command_args
 
-    def read_sql(self) -> str:
-        return read_sql_input(self.get_name(), **self.get_args())
+    def read_sql(self) -> SqlInput:
+        return read_sql_input(
+            self.get_name(),
+            leading_keyword_join=leading_keyword_join("pg_stat_statements.query"),
+            sql_type_case=sql_type_case(),
+            **self.get_args(),
+        )
 
-    def execute_sql(self) -> pd.DataFrame:
-        return execute_sql(
-            sql=self.read_sql(),
+    def execute_sql(self) -> ResultSet:
+        sql, params = self.read_sql()
+        return fetch_result_set(
+            sql=sql,
+            params=params,
             **self._pg_conn_params,
         )
 
-    def print(self, data: pd.DataFrame) -> None:
+    def print(self, data: ReportData) -> None:
         help_panel = Panel(self.get_help(), title="Help", height=len(self.get_help().splitlines()))
         input_panel = Panel(Pretty(self.get_args()), title="Input", height=len(self.get_args()) + 3)
 
         # layout["Info"]["input"].size=200
         print(help_panel)
         print(input_panel)
-        print(tabulate(data, headers="keys", tablefmt=self._command_args["format"]))  # pyright: ignore
-
-    def run(self) -> None:
-        data = self.execute_sql()
-        self.print(data=data)
+        print_table(self.format_data(data), self._command_args["format"])
+
+    def fetch(self) -> Dict[str, ReportData]:
+        if self._command_args.get("interval"):
+            statements, self._interval_stats = sample_statement_rates(self._pg_conn_params, self._command_args["interval"])
+            return self.from_statements(statements)
+        return {self.get_name(): self.execute_sql()}
+
+    def fetch_snapshot(self, snapshot: Snapshot) -> Dict[str, ReportData]:
+        return self.from_statements(snapshot.table("pg_stat_statements"))
+
+    def from_statements(self, statements: pd.DataFrame) -> Dict[str, ReportData]:
+        dbid = self._command_args["dbid"]
+        if dbid != "_all":
+            statements = statements[statements["dbid"] == int(dbid)]
+        sql_type = keyword_sql_types(statement_keywords(statements))
+        group_by = ["sql_type"] if dbid == "_all" else ["sql_type", "database"]
+        data = (
+            statements.assign(sql_type=sql_type, database=statements["datname"])
+            .groupby(group_by, as_index=False)  # pyright: ignore
+            .agg(num_calls=("total_time", "size"), total_time_ms=("total_time", "sum"), max_time_ms=("total_time", "max"), min_time_ms=("total_time", "min"))
+        )
+        if self._command_args.get("interval"):
+            # Rates are small values, integer rounding would hide them
+            data["avg_time_ms"] = (data["total_time_ms"] / data["num_calls"]).round(2)
+            data[["total_time_ms", "max_time_ms", "min_time_ms"]] = data[["total_time_ms", "max_time_ms", "min_time_ms"]].round(2)
+        else:
+            data["avg_time_ms"] = (data["total_time_ms"] / data["num_calls"]).round().astype(int)
+            data["total_time_ms"] = data["total_time_ms"].round(0)
+            data["max_time_ms"] = data["max_time_ms"].round(0)
+        columns = [*group_by, "num_calls", "total_time_ms", "avg_time_ms", "max_time_ms", "min_time_ms"]
+        return {self.get_name(): top_rows(data[columns], self._command_args["order_by"])}
+
+    def show(self, results: Dict[str, ReportData]) -> None:
+        self.print(data=results[self.get_name()])
+        print_interval_stats(self._interval_stats)
 
 
 class SQLStatsBySQLType(Report):
@@ -68,11 +139,28 @@ class SQLStatsBySQLType(Report):
     Standard SQL Report
     """
 
+    # Statement counts of the last interval sample, shown with the results
+    _interval_stats: Dict[str, int] = {}
+
+    # Query text column classified by the report queries
+    query_column = "pg_stat_statements.query"
+
+    default_args: Dict[str, Any] = {
+        "top_stat_field": "mean_time",
+        "format": "github",
+        "dbname": "_all",
+        "count": 10,
+        "single_query": False,
+        "text_cache": False,
+        "sql_types": DEFAULT_SQL_TYPES,
+        "fetch_fields": ["rows", "calls", "total_time", "mean_time"],
+    }
+
     def __init__(self, pg_conn_params: Dict[str, Any], sql_types: Dict[str, str], fetch_fields: List[str], **kvargs: Any) -> None:
         self._pg_conn_params = pg_conn_params
         self._command_args = kvargs
         self._sql_types = sql_types
-        self._fetch_fields = fetch_fields
+        self._fetch_fields = [field for field in fetch_fields if field != kvargs.get("top_stat_field")]
 
     @classmethod
     def get_help(cls) -> str:
@@ -109,12 +197,37 @@ class SQLStatsBySQLType(Report):
     def get_args(self) -> Dict[str, Any]:
         return self._command_args
 
-    def read_sql(self, sql_type: str, fetch_fields: List[str]) -> str:
-        return read_sql_input(self.get_name(), sql_type=sql_type, fetch_fields=fetch_fields, **self.get_args())
+    def read_sql(self, sql_type: str, fetch_fields: List[str]) -> SqlInput:
+        return read_sql_input(
+            self.get_name(),
+            sql_type=sql_type,
+            fetch_fields=fetch_fields,
+            leading_keyword_join=leading_keyword_join(self.query_column),
+            **self.get_args(),
+        )
 
-    def execute_sql(self, sql_type: str) -> pd.DataFrame:
+    def execute_sql(self, sql_type: str) -> ResultSet:
+        sql, params = self.read_sql(sql_type=sql_type, fetch_fields=self._fetch_fields)
+        return fetch_result_set(
+            sql=sql,
+            params=params,
+            **self._pg_conn_params,
+        )
+
+    def read_single_query_sql(self, fetch_fields: List[str]) -> SqlInput:
+        return read_sql_input(
+            f"{self.get_name()}_single_query",
+            sql_types=list(self._sql_types.values()),
+            fetch_fields=fetch_fields,
+            leading_keyword_join=leading_keyword_join(self.query_column),
+            **self.get_args(),
+        )
+
+    def execute_single_query_sql(self) -> pd.DataFrame:
+        sql, params = self.read_single_query_sql(fetch_fields=self._fetch_fields)
         return execute_sql(
-            sql=self.read_sql(sql_type=sql_type, fetch_fields=self._fetch_fields),
+            sql=sql,
+            params=params,
             **self._pg_conn_params,
         )
 
@@ -124,16 +237,54 @@ class SQLStatsBySQLType(Report):
         print(help_panel)
         print(input_panel)
 
-    def print_data(self, sql_type: str, data: pd.DataFrame) -> None:
+    def print_data(self, sql_type: str, data: ReportData) -> None:
         print("-" * 50)
         print(f"SQL Type: {sql_type}")
-        print(tabulate(data, headers="keys", tablefmt=self._command_args["format"]))  # pyright: ignore
-
-    def run(self) -> None:
-        self.print_header()
+        print_table(self.format_data(data), self._command_args["format"])
+
+    def fetch(self) -> Dict[str, ReportData]:
+        if self._command_args.get("interval"):
+            statements, self._interval_stats = sample_statement_rates(self._pg_conn_params, self._command_args["interval"])
+            return self.from_statements(statements)
+        if self._command_args.get("single_query"):
+            return split_by_sql_type(self.execute_single_query_sql(), self._sql_types)
+        if self._command_args.get("text_cache"):
+            return self.from_statements(with_statement_keywords(self._pg_conn_params, fetch_statements(self._pg_conn_params)))
+        return {k: self.execute_sql(sql_type=v) for k, v in self._sql_types.items()}
+
+    def iter_batches(self) -> Iterator[Tuple[str, ReportData]]:
+        if any(self._command_args.get(arg) for arg in ["interval", "single_query", "text_cache"]):
+            yield from self.fetch().items()
+            return
         for k, v in self._sql_types.items():
-            data = self.execute_sql(sql_type=v)
+            sql, params = self.read_sql(sql_type=v, fetch_fields=self._fetch_fields)
+            for batch in iter_result_set(sql=sql, params=params, **self._pg_conn_params):
+                yield k, batch
+
+    def fetch_snapshot(self, snapshot: Snapshot) -> Dict[str, ReportData]:
+        return self.from_statements(snapshot.table("pg_stat_statements"))
+
+    def from_statements(self, statements: pd.DataFrame) -> Dict[str, ReportData]:
+        dbname = self._command_args["dbname"]
+        top_stat_field = self._command_args["top_stat_field"]
+        statements = named_statements(statements, dbname)
+        keywords = statement_keywords(statements)
+        columns = ["user", *(["database"] if dbname == "_all" else []), "queryid", "query", top_stat_field, *self._fetch_fields]
+        tops = {k: top_rows(statements[keywords == v], top_stat_field, self._command_args["count"]) for k, v in self._sql_types.items()}
+        if "query" not in statements.columns and tops:
+            # Classified by their cached leading keyword: texts are resolved for the rows shown only, in one pass
+            texts = with_query_texts(self._pg_conn_params, pd.concat(tops.values(), ignore_index=True))["query"].to_numpy()
+            start = 0
+            for k, data in tops.items():
+                tops[k] = data.assign(query=texts[start : start + len(data)])
+                start += len(data)
+        return {k: data.assign(query=data["query"].fillna("").str.slice(0, 50))[columns] for k, data in tops.items()}
+
+    def show(self, results: Dict[str, ReportData]) -> None:
+        self.print_header()
+        for k, data in results.items():
             self.print_data(sql_type=k, data=data)
+        print_interval_stats(self._interval_stats)
 
 
 class SQLStatsSimplifiedBySQLType(Report):
@@ -141,6 +292,35 @@ class SQLStatsSimplifiedBySQLType(Report):
     Standard SQL Report
     """
 
+    # Statement counts of the last interval sample, shown with the results
+    _interval_stats: Dict[str, int] = {}
+
+    default_args: Dict[str, Any] = {
+        "top_stat_field": "atime",
+        "sort": "DESC",
+        "format": "github",
+        "dbname": "_all",
+        "count": 10,
+        "single_query": False,
+        "text_cache": False,
+        "sql_types": DEFAULT_SQL_TYPES,
+    }
+    column_formats: Dict[str, ColumnFormat] = {
+        "rows": ColumnFormat.number,
+        "arows": ColumnFormat.number,
+        "time": ColumnFormat.duration,
+        "atime": ColumnFormat.decimal,
+        "iotime": ColumnFormat.duration,
+        "aiotime": ColumnFormat.decimal,
+        "blk_r": ColumnFormat.number,
+        "ablk_r": ColumnFormat.number,
+        "buff_blk_r": ColumnFormat.number,
+        "abuff_blk_r": ColumnFormat.number,
+        "buff_blk_r_pct": ColumnFormat.decimal,
+        "blk_w": ColumnFormat.number,
+        "ablk_w": ColumnFormat.number,
+    }
+
     def __init__(self, pg_conn_params: Dict[str, Any], sql_types: Dict[str, str], **kvargs: Any) -> None:
         self._pg_conn_params = pg_conn_params
         self._command_args = kvargs
@@ -176,12 +356,30 @@ class SQLStatsSimplifiedBySQLType(Report):
     def get_args(self) -> Dict[str, Any]:
         return self._command_args
 
-    def read_sql(self, sql_type: str) -> str:
-        return read_sql_input(self.get_name(), sql_type=sql_type, **self.get_args())
+    def read_sql(self, sql_type: str) -> SqlInput:
+        return read_sql_input(self.get_name(), sql_type=sql_type, leading_keyword_join=leading_keyword_join("pgss.query"), **self.get_args())
 
     def execute_sql(self, sql_type: str) -> pd.DataFrame:
+        sql, params = self.read_sql(sql_type=sql_type)
+        return execute_sql(
+            sql=sql,
+            params=params,
+            **self._pg_conn_params,
+        )
+
+    def read_single_query_sql(self) -> SqlInput:
+        return read_sql_input(
+            f"{self.get_name()}_single_query",
+            sql_types=list(self._sql_types.values()),
+            leading_keyword_join=leading_keyword_join("pgss.query"),
+            **self.get_args(),
+        )
+
+    def execute_single_query_sql(self) -> pd.DataFrame:
+        sql, params = self.read_single_query_sql()
         return execute_sql(
-            sql=self.read_sql(sql_type=sql_type),
+            sql=sql,
+            params=params,
             **self._pg_conn_params,
         )
 
@@ -195,16 +393,71 @@ class SQLStatsSimplifiedBySQLType(Report):
         print(help_panel)
         print(input_panel)
 
-    def print_data(self, sql_type: str, data: pd.DataFrame) -> None:
+    def print_data(self, sql_type: str, data: ReportData) -> None:
         print("-" * 50)
         print(f"SQL Type: {sql_type}")
-        print(tabulate(data, headers="keys", tablefmt=self._command_args["format"]))  # pyright: ignore
-
-    def run(self) -> None:
-        self.print_header()
+        print_table(self.format_data(data), self._command_args["format"])
+
+    def fetch(self) -> Dict[str, ReportData]:
+        if self._command_args.get("interval"):
+            statements, self._interval_stats = sample_statement_rates(self._pg_conn_params, self._command_args["interval"])
+            return self.from_statements(statements)
+        if self._command_args.get("single_query"):
+            return split_by_sql_type(self.execute_single_query_sql(), self._sql_types)
+        if self._command_args.get("text_cache"):
+            return self.from_statements(with_statement_keywords(self._pg_conn_params, fetch_statements(self._pg_conn_params)))
+        return {k: self.execute_sql(sql_type=v) for k, v in self._sql_types.items()}
+
+    def fetch_snapshot(self, snapshot: Snapshot) -> Dict[str, ReportData]:
+        return self.from_statements(snapshot.table("pg_stat_statements"))
+
+    def from_statements(self, statements: pd.DataFrame) -> Dict[str, ReportData]:
+        dbname = self._command_args["dbname"]
+        statements = named_statements(statements, dbname)
+        calls = statements["calls"].where(statements["calls"] != 0)
+        iotime = statements["blk_read_time"] + statements["blk_write_time"]
+        blk_r = statements["shared_blks_read"] + statements["local_blks_read"] + statements["temp_blks_read"]
+        buff_blk_r = statements["shared_blks_hit"] + statements["local_blks_hit"]
+        blk_w = statements["shared_blks_written"] + statements["local_blks_written"] + statements["temp_blks_written"]
+        data = pd.DataFrame(
+            {
+                "user": statements["user"],
+                "database": statements["database"],
+                "queryid": statements["queryid"],
+                "calls": statements["calls"],
+                "rows": statements["rows"],
+                "arows": statements["rows"] / calls,
+                "time": statements["total_time"],
+                "atime": statements["total_time"] / calls,
+                "iotime": iotime,
+                "aiotime": iotime / calls,
+                "blk_r": blk_r,
+                "ablk_r": blk_r / calls,
+                "buff_blk_r": buff_blk_r,
+                "abuff_blk_r": buff_blk_r / calls,
+                "buff_blk_r_pct": np.where((buff_blk_r + blk_r) == 0, -1.0, buff_blk_r / (buff_blk_r + blk_r).where((buff_blk_r + blk_r) != 0) * 100),
+                "blk_w": blk_w,
+                "ablk_w": blk_w / calls,
+            }
+        )
+        if dbname != "_all":
+            data = data.drop(columns=["database"])
+        keywords = statement_keywords(statements)
+        results: Dict[str, pd.DataFrame] = {}
         for k, v in self._sql_types.items():
-            data = self.execute_sql(sql_type=v)
+            results[k] = top_rows(
+                data[keywords == v],
+                self._command_args["top_stat_field"],
+                self._command_args["count"],
+                ascending=self._command_args["sort"] == "ASC",
+            )
+        return results
+
+    def show(self, results: Dict[str, ReportData]) -> None:
+        self.print_header()
+        for k, data in results.items():
             self.print_data(sql_type=k, data=data)
+        print_interval_stats(self._interval_stats)
 
 
 class ActiveLongRunningSQL(Report):
@@ -212,6 +465,19 @@ class ActiveLongRunningSQL(Report):
     Standard SQL Report
     """
 
+    # Query text column classified by the report queries
+    query_column = "pg_stat_activity.query"
+    volatile_columns: List[str] = ["time_running"]
+
+    default_args: Dict[str, Any] = {
+        "format": "github",
+        "dbname": "_all",
+        "count": 10,
+        "single_query": False,
+        "sql_types": DEFAULT_SQL_TYPES,
+        "fetch_fields": ["application_name", "client_addr", "client_hostname", "wait_event", "state"],
+    }
+
     def __init__(self, pg_conn_params: Dict[str, Any], sql_types: Dict[str, str], fetch_fields: List[str], **kvargs: Any) -> None:
         self._pg_conn_params = pg_conn_params
         self._command_args = kvargs
@@ -285,12 +551,37 @@ class ActiveLongRunningSQL(Report):
     def get_args(self) -> Dict[str, Any]:
         return self._command_args
 
-    def read_sql(self, sql_type: str, fetch_fields: List[str]) -> str:
-        return read_sql_input(self.get_name(), sql_type=sql_type, fetch_fields=fetch_fields, **self.get_args())
+    def read_sql(self, sql_type: str, fetch_fields: List[str]) -> SqlInput:
+        return read_sql_input(
+            self.get_name(),
+            sql_type=sql_type,
+            fetch_fields=fetch_fields,
+            leading_keyword_join=leading_keyword_join(self.query_column),
+            **self.get_args(),
+        )
 
-    def execute_sql(self, sql_type: str) -> pd.DataFrame:
+    def execute_sql(self, sql_type: str) -> ResultSet:
+        sql, params = self.read_sql(sql_type=sql_type, fetch_fields=self._fetch_fields)
+        return fetch_result_set(
+            sql=sql,
+            params=params,
+            **self._pg_conn_params,
+        )
+
+    def read_single_query_sql(self, fetch_fields: List[str]) -> SqlInput:
+        return read_sql_input(
+            f"{self.get_name()}_single_query",
+            sql_types=list(self._sql_types.values()),
+            fetch_fields=fetch_fields,
+            leading_keyword_join=leading_keyword_join(self.query_column),
+            **self.get_args(),
+        )
+
+    def execute_single_query_sql(self) -> pd.DataFrame:
+        sql, params = self.read_single_query_sql(fetch_fields=self._fetch_fields)
         return execute_sql(
-            sql=self.read_sql(sql_type=sql_type, fetch_fields=self._fetch_fields),
+            sql=sql,
+            params=params,
             **self._pg_conn_params,
         )
 
@@ -300,13 +591,141 @@ class ActiveLongRunningSQL(Report):
         print(help_panel)
         print(input_panel)
 
-    def print_data(self, sql_type: str, data: pd.DataFrame) -> None:
+    def print_data(self, sql_type: str, data: ReportData) -> None:
         print("-" * 50)
         print(f"SQL Type: {sql_type}")
-        print(tabulate(data, headers="keys", tablefmt=self._command_args["format"]))  # pyright: ignore
+        print_table(self.format_data(data), self._command_args["format"])
 
-    def run(self) -> None:
-        self.print_header()
+    def fetch(self) -> Dict[str, ReportData]:
+        if self._command_args.get("single_query"):
+            return split_by_sql_type(self.execute_single_query_sql(), self._sql_types)
+        return {k: self.execute_sql(sql_type=v) for k, v in self._sql_types.items()}
+
+    def iter_batches(self) -> Iterator[Tuple[str, ReportData]]:
+        if self._command_args.get("single_query"):
+            yield from self.fetch().items()
+            return
         for k, v in self._sql_types.items():
-            data = self.execute_sql(sql_type=v)
+            sql, params = self.read_sql(sql_type=v, fetch_fields=self._fetch_fields)
+            for batch in iter_result_set(sql=sql, params=params, **self._pg_conn_params):
+                yield k, batch
+
+    def fetch_snapshot(self, snapshot: Snapshot) -> Dict[str, ReportData]:
+        dbname = self._command_args["dbname"]
+        activity = snapshot.table("pg_stat_activity")
+        activity = activity[~activity["is_snapshot_backend"].astype(bool) & activity["state"].notna() & (activity["state"] != "idle")]
+        if dbname != "_all":
+            activity = activity[activity["datname"] == dbname]
+        activity = activity.assign(
+            username=activity["usename"],
+            database=activity["datname"],
+            time_running=activity["captured_at"] - activity["query_start"],
+        )
+        keywords = query_keywords(activity["query"])
+        results: Dict[str, pd.DataFrame] = {}
+        for k, v in self._sql_types.items():
+            data = top_rows(activity[keywords == v], "time_running", self._command_args["count"])
+            data = data.assign(query=data["query"].str.slice(0, 15))
+            results[k] = data[["username", "database", "query", "time_running", *self._fetch_fields]]
+        return results
+
+    def show(self, results: Dict[str, ReportData]) -> None:
+        self.print_header()
+        for k, data in results.items():
             self.print_data(sql_type=k, data=data)
+
+
+def statement_excerpt(query: str, length: int = 80) -> str:
+    """Statement of the tool on one line, without its tag nor the PREPARE or DECLARE CURSOR wrapping it, cut to length"""
+    text = " ".join(query.replace(STATEMENT_TAG, " ").split())
+    text = re.sub(r"^(PREPARE \S+ AS|DECLARE \S+ .*?CURSOR .*?FOR) ", "", text, flags=re.IGNORECASE)
+    return text if len(text) <= length else text[: length - 1] + "…"
+
+
+def footprint_entries(entries: pd.DataFrame) -> pd.DataFrame:
+    """One row per pg_stat_statements entry (read as json) with the columns of every server version"""
+    rows: List[Dict[str, Any]] = []
+    for database, entry in entries[["database", "entry"]].itertuples(index=False, name=None):
+        total_time = entry.get("total_exec_time", entry.get("total_time", 0.0)) + entry.get("total_plan_time", 0.0)
+        rows.append(
+            {
+                "database": database,
+                "statement": statement_excerpt(entry.get("query") or ""),
+                "calls": entry["calls"],
+                "total_time_ms": round(total_time, 2),
+                "mean_time_ms": round(total_time / entry["calls"], 2) if entry["calls"] else 0.0,
+                "rows": entry["rows"],
+                "shared_blks_hit": entry["shared_blks_hit"],
+                "shared_blks_read": entry["shared_blks_read"],
+                "temp_blks_written": entry["temp_blks_written"],
+            }
+        )
+    columns = ["database", "statement", "calls", "total_time_ms", "mean_time_ms", "rows", "shared_blks_hit", "shared_blks_read", "temp_blks_written"]
+    return pd.DataFrame(rows, columns=columns)
+
+
+class ToolFootprint(Report):
+    """
+    Load pg_stats_tools itself put on the server
+    """
+
+    default_args: Dict[str, Any] = {"format": "psql", "count": 20}
+
+    def __init__(self, pg_conn_params: Dict[str, Any], **kvargs: Any) -> None:
+        self._pg_conn_params = pg_conn_params
+        self._command_args = {**self.default_args, **kvargs}
+
+    @classmethod
+    def get_help(cls) -> str:
+        return """Footprint of pg_stats_tools on the server: its own pg_stat_statements entries (statements tagged with its leading comment),
+        cumulative since pg_stat_statements was last reset
+        Columns:
+            - entries: Number of distinct statements of the tool
+            - calls: Number of times they were executed
+            - total_time_ms: Planning and execution time, in milliseconds
+            - shared_blks_hit, shared_blks_read: Shared buffers found in cache and read from disk
+            - temp_blks_written: Temporary blocks written (work_mem exceeded)
+        The statements section lists the most expensive statements by total_time_ms
+        """
+
+    def get_name(self) -> str:
+        return "tool_footprint"
+
+    def get_args(self) -> Dict[str, Any]:
+        return self._command_args
+
+    def fetch(self) -> Dict[str, ReportData]:
+        # _ is a LIKE wildcard
+        sql, params = read_sql_input(self.get_name(), tag_pattern="%" + STATEMENT_TAG.replace("_", "\\_") + "%")
+        return self._from_entries(execute_sql(sql=sql, params=params, **self._pg_conn_params))
+
+    def fetch_snapshot(self, snapshot: Snapshot) -> Dict[str, ReportData]:
+        # Same filter as the LIKE of the report query, on the captured pg_stat_statements rows
+        statements = snapshot.table("pg_stat_statements")
+        statements = statements[statements["query"].fillna("").str.contains(STATEMENT_TAG, regex=False)]
+        entries = pd.DataFrame({"database": statements["datname"].to_numpy(), "entry": statements.to_dict("records")})
+        return self._from_entries(entries)
+
+    def _from_entries(self, entries: pd.DataFrame) -> Dict[str, ReportData]:
+        statements = footprint_entries(entries)
+        totals = pd.DataFrame(
+            [
+                {
+                    "entries": len(statements),
+                    "calls": int(statements["calls"].sum()),
+                    "total_time_ms": round(float(statements["total_time_ms"].sum()), 2),
+                    "shared_blks_hit": int(statements["shared_blks_hit"].sum()),
+                    "shared_blks_read": int(statements["shared_blks_read"].sum()),
+                    "temp_blks_written": int(statements["temp_blks_written"].sum()),
+                }
+            ]
+        )
+        return {self.get_name(): totals, "statements": top_rows(statements, "total_time_ms", int(self._command_args["count"]))}
+
+    def show(self, results: Dict[str, ReportData]) -> None:
+        help_panel = Panel(self.get_help(), title="Help", height=len(self.get_help().splitlines()) + 1)
+        input_panel = Panel(Pretty(self.get_args()), title="Input", height=len(self.get_args()) + 3)
+        print(help_panel)
+        print(input_panel)
+        for data in results.values():
+            print_table(self.format_data(data), self._command_args["format"])
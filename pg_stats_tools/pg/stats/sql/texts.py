@@ -0,0 +1,147 @@
+"""Query texts and leading keywords of pg_stat_statements entries, kept in a local cache between runs"""
+
+import os
+import sqlite3
+import time
+from contextlib import closing
+from typing import Any, Dict, Iterable, List, Set, Tuple, Union
+
+import pandas as pd
+
+from pg_stats_tools.cache import cache_dir
+from pg_stats_tools.input_read import read_sql_input
+from pg_stats_tools.pg.stats.sql.classify import leading_keyword, leading_keyword_join
+from pg_stats_tools.psql import execute_sql
+
+# Texts are only used to show a short excerpt, statements are classified by the leading keyword extracted server side
+QUERY_TEXT_LENGTH = 1024
+QUERY_TEXT_CACHE_ENTRIES = 100_000
+
+StatementKey = Tuple[int, int]
+
+
+class QueryTextCache:
+    """
+    Persistent (dbid, queryid) -> leading keyword and query text map of each server, stored in a sqlite file.
+    Keywords are kept for every statement classified, texts only for the statements shown.
+    Least recently used entries are evicted once max_entries is reached.
+    """
+
+    def __init__(self, path: Union[str, None] = None, max_entries: int = QUERY_TEXT_CACHE_ENTRIES) -> None:
+        self.path = path or os.path.join(cache_dir(), "query_texts.sqlite")
+        self.max_entries = max_entries
+        with closing(sqlite3.connect(self.path, timeout=30)) as db, db:
+            # Texts only cache of earlier versions
+            db.execute("DROP TABLE IF EXISTS query_texts")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS statement_texts ("
+                "server TEXT, dbid INTEGER, queryid INTEGER, keyword TEXT, query TEXT, last_used REAL, PRIMARY KEY (server, dbid, queryid))"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS statement_texts_last_used ON statement_texts (last_used)")
+
+    def _get(self, server: str, keys: Iterable[StatementKey], column: str) -> Dict[StatementKey, str]:
+        """Cached values of column for keys, joined with a temporary table of the keys. Found entries become the most recently used"""
+        with closing(sqlite3.connect(self.path, timeout=30)) as db, db:
+            db.execute("CREATE TEMP TABLE wanted (dbid INTEGER, queryid INTEGER, PRIMARY KEY (dbid, queryid))")
+            db.executemany("INSERT OR IGNORE INTO wanted (dbid, queryid) VALUES (?, ?)", keys)
+            rows = db.execute(
+                f"SELECT dbid, queryid, {column} FROM statement_texts JOIN wanted USING (dbid, queryid) WHERE server = ? AND {column} IS NOT NULL", (server,)
+            ).fetchall()
+            db.execute(
+                "UPDATE statement_texts SET last_used = ? WHERE server = ? AND (dbid, queryid) IN (SELECT dbid, queryid FROM wanted)", (time.time(), server)
+            )
+        return {(dbid, queryid): value for dbid, queryid, value in rows}
+
+    def get(self, server: str, keys: Iterable[StatementKey]) -> Dict[StatementKey, str]:
+        """Cached texts of keys"""
+        return self._get(server, keys, "query")
+
+    def get_keywords(self, server: str, keys: Iterable[StatementKey]) -> Dict[StatementKey, str]:
+        """Cached leading keywords of keys"""
+        return self._get(server, keys, "keyword")
+
+    def put(self, server: str, texts: Dict[StatementKey, str]) -> None:
+        """Cache texts. Statements without a cached keyword get the one of their text"""
+        self._put(
+            server,
+            "INSERT INTO statement_texts (server, dbid, queryid, keyword, query, last_used) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (server, dbid, queryid) DO UPDATE SET "
+            "keyword = coalesce(statement_texts.keyword, excluded.keyword), query = excluded.query, last_used = excluded.last_used",
+            [(dbid, queryid, leading_keyword(query), query) for (dbid, queryid), query in texts.items()],
+        )
+
+    def put_keywords(self, server: str, keywords: Dict[StatementKey, str]) -> None:
+        self._put(
+            server,
+            "INSERT INTO statement_texts (server, dbid, queryid, keyword, query, last_used) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (server, dbid, queryid) DO UPDATE SET keyword = excluded.keyword, last_used = excluded.last_used",
+            [(dbid, queryid, keyword, None) for (dbid, queryid), keyword in keywords.items()],
+        )
+
+    def _put(self, server: str, sql: str, rows: List[Tuple[int, int, str, Union[str, None]]]) -> None:
+        now = time.time()
+        with closing(sqlite3.connect(self.path, timeout=30)) as db, db:
+            db.executemany(sql, [(server, dbid, queryid, keyword, query, now) for dbid, queryid, keyword, query in rows])
+            (count,) = db.execute("SELECT count(*) FROM statement_texts").fetchone()
+            if count > self.max_entries:
+                db.execute(
+                    "DELETE FROM statement_texts WHERE rowid IN (SELECT rowid FROM statement_texts ORDER BY last_used LIMIT ?)", (count - self.max_entries,)
+                )
+
+
+def fetch_statements(pg_conn_params: Dict[str, Any]) -> pd.DataFrame:
+    """pg_stat_statements counters, without query texts"""
+    sql, params = read_sql_input("pg_stat_statements_stats")
+    return execute_sql(sql=sql, params=params, **pg_conn_params).drop(columns=["query"], errors="ignore")
+
+
+def _statement_keys(statements: pd.DataFrame) -> List[StatementKey]:
+    return list(statements[["dbid", "queryid"]].fillna(0).astype("int64").itertuples(index=False, name=None))
+
+
+def _fetched_values(fetched: pd.DataFrame, column: str, keys: Set[StatementKey]) -> Dict[StatementKey, str]:
+    """column of the fetched rows of keys, by (dbid, queryid)"""
+    rows = fetched.assign(dbid=fetched["dbid"].astype("int64"), queryid=fetched["queryid"].astype("int64"))[["dbid", "queryid", column]]
+    return {(dbid, queryid): value for dbid, queryid, value in rows.itertuples(index=False, name=None) if (dbid, queryid) in keys and value is not None}
+
+
+def _server(pg_conn_params: Dict[str, Any]) -> str:
+    return f"{pg_conn_params.get('db_host')}:{pg_conn_params.get('db_port')}"
+
+
+def with_statement_keywords(pg_conn_params: Dict[str, Any], statements: pd.DataFrame, cache: Union[QueryTextCache, None] = None) -> pd.DataFrame:
+    """
+    Statements with the leading keyword of their query (leading_keyword column), to classify them without their text.
+    Keywords come from the local cache, only the ones missing from it are extracted server side, so no text is transferred
+    """
+    cache = cache or QueryTextCache()
+    server = _server(pg_conn_params)
+    keys = _statement_keys(statements)
+    keywords = cache.get_keywords(server, keys)
+    missing = {key for key in keys if key not in keywords}
+    if missing:
+        sql, params = read_sql_input(
+            "pg_stat_statements_keywords", leading_keyword_join=leading_keyword_join("pgss.query"), queryids=sorted({queryid for _, queryid in missing})
+        )
+        new_keywords = _fetched_values(execute_sql(sql=sql, params=params, **pg_conn_params), "leading_keyword", missing)
+        cache.put_keywords(server, new_keywords)
+        keywords.update(new_keywords)
+    return statements.assign(leading_keyword=[keywords.get(key, "") for key in keys])
+
+
+def with_query_texts(pg_conn_params: Dict[str, Any], statements: pd.DataFrame, cache: Union[QueryTextCache, None] = None) -> pd.DataFrame:
+    """
+    Statements with their query text. Texts come from the local cache, only the ones missing from it
+    are read from the server, so repeated runs transfer (almost) no text. Reports resolve texts for the rows they show only
+    """
+    cache = cache or QueryTextCache()
+    server = _server(pg_conn_params)
+    keys = _statement_keys(statements)
+    texts = cache.get(server, keys)
+    missing = {key for key in keys if key not in texts}
+    if missing:
+        sql, params = read_sql_input("pg_stat_statements_texts", text_length=QUERY_TEXT_LENGTH, queryids=sorted({queryid for _, queryid in missing}))
+        new_texts = _fetched_values(execute_sql(sql=sql, params=params, **pg_conn_params), "query", missing)
+        cache.put(server, new_texts)
+        texts.update(new_texts)
+    return statements.assign(query=[texts.get(key) for key in keys])
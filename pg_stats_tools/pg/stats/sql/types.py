@@ -0,0 +1,92 @@
+"""Fields and SQL types of the SQL statement reports, as their command options take them"""
+
+from enum import Enum
+
+
+class SqlTimeStatsFields(str, Enum):
+    avg_time_ms = "avg_time_ms"
+    num_calls = "num_calls"
+    total_time_ms = "total_time_ms"
+    max_time_ms = "max_time_ms"
+
+
+class SQLStatsFields(str, Enum):
+    calls = "calls"
+    total_time = "total_time"
+    min_time = "min_time"
+    max_time = "max_time"
+    mean_time = "mean_time"
+    stddev_time = "stddev_time"
+    rows = "rows"
+    shared_blks_hit = "shared_blks_hit"
+    shared_blks_read = "shared_blks_read"
+    shared_blks_dirtied = "shared_blks_dirtied"
+    shared_blks_written = "shared_blks_written"
+    local_blks_hit = "local_blks_hit"
+    local_blks_read = "local_blks_read"
+    local_blks_dirtied = "local_blks_dirtied"
+    local_blks_written = "local_blks_written"
+    temp_blks_read = "temp_blks_read"
+    temp_blks_written = "temp_blks_written"
+    blk_read_time = "blk_read_time"
+    blk_write_time = "blk_write_time"
+
+
+# https://documentation.red-gate.com/sm13/postgresql-top-queries-199098901.html
+class SQLSimplifiedStatsFields(str, Enum):
+    calls = "calls"
+    rows = "rows"
+    arows = "arows"
+    time = "time"
+    atime = "atime"
+    iotime = "iotime"
+    aiotime = "aiotime"
+    blk_r = "blk_r"
+    ablk_r = "ablk_r"
+    buff_blk_r = "buff_blk_r"
+    abuff_blk_r = "abuff_blk_r"
+    buff_blk_r_pct = "buff_blk_r_pct"
+    blk_w = "blk_w"
+    ablk_w = "ablk_w"
+
+
+class ActiveSQLStatsFields(str, Enum):
+    application_name = "application_name"
+    client_addr = "client_addr"
+    client_hostname = "client_hostname"
+    client_port = "client_port"
+    backend_start = "backend_start"
+    xact_start = "xact_start"
+    query_start = "query_start"
+    state_change = "state_change"
+    wait_event_type = "wait_event_type"
+    wait_event = "wait_event"
+    state = "state"
+    backend_xid = "backend_xid"
+    backend_xmin = "backend_xmin"
+    query = "query"
+    backend_type = "backend_type"
+
+
+class SQLTypes(str, Enum):
+    SELECT = "SELECT"
+    INSERT = "INSERT"
+    UPDATE = "UPDATE"
+    DELETE = "DELETE"
+    FETCH = "FETCH"
+    CREATE = "CREATE"
+    DROP = "DROP"
+    ALTER = "ALTER"
+    TRUNCATE = "TRUNCATE"
+    GRANT = "GRANT"
+    REVOKE = "REVOKE"
+    MOVE = "MOVE"
+    COMMIT = "COMMIT"
+    ROLLBACK = "ROLLBACK"
+    SAVEPOINT = "SAVEPOINT"
+    TRANSACTION = "BEGIN"
+
+
+class SortDir(str, Enum):
+    ASC = "ASC"
+    DESC = "DESC"
@@ -0,0 +1,82 @@
+"""Watch mode: re-run a report at a fixed interval and redraw it in place"""
+
+import time
+from typing import Any, Dict, List, Set, Tuple
+
+import pandas as pd
+from rich.console import Group, RenderableType
+from rich.live import Live
+from rich.table import Table
+from rich.text import Text
+
+from pg_stats_tools.pg.stats.reports import Report
+from pg_stats_tools.result import as_frame
+
+RowKey = Tuple[Any, ...]
+
+
+class SamplerStats:
+    """Cost of the watch sampler itself: how long each sample kept a database connection busy"""
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self.samples = 0
+        self.last_seconds = 0.0
+        self.total_seconds = 0.0
+        self.started = time.monotonic()
+
+    def add(self, seconds: float) -> None:
+        self.samples += 1
+        self.last_seconds = seconds
+        self.total_seconds += seconds
+
+    def describe(self) -> str:
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        average = self.total_seconds / max(self.samples, 1)
+        return (
+            f"Sampler: {self.samples} samples every {self.interval:g}s, last {self.last_seconds * 1000:.1f} ms, "
+            f"avg {average * 1000:.1f} ms, busy {self.total_seconds / elapsed * 100:.2f}% of the time"
+        )
+
+
+def row_keys(data: pd.DataFrame, volatile_columns: List[str]) -> List[RowKey]:
+    """Rows as tuples, without the columns that change on every sample"""
+    columns = [column for column in data.columns if column not in volatile_columns]
+    return [tuple(row) for row in data[columns].itertuples(index=False, name=None)]
+
+
+def render_section(title: str, data: pd.DataFrame, keys: List[RowKey], previous: Set[RowKey]) -> Table:
+    """Table of one report section. Rows that are new or changed since the previous sample are highlighted"""
+    table = Table(title=title, title_justify="left")
+    for column in data.columns:
+        table.add_column(str(column))
+    for key, row in zip(keys, data.astype(str).itertuples(index=False, name=None)):
+        table.add_row(*row, style=None if key in previous else "bold yellow")
+    return table
+
+
+def watch_report(report: Report, interval: float) -> None:
+    """
+    Fetch and redraw report every interval seconds until interrupted (Ctrl+C).
+    Reports re-executing the same statements should be built with prepare in their connection params,
+    so each sample only sends parameter values over the connection kept open by the session
+    """
+    stats = SamplerStats(interval)
+    previous: Dict[str, Set[RowKey]] = {}
+    try:
+        with Live(Text("Waiting for the first sample..."), auto_refresh=False) as live:
+            while True:
+                start = time.monotonic()
+                results = report.fetch()
+                stats.add(time.monotonic() - start)
+                sections: List[RenderableType] = []
+                for title, data in results.items():
+                    data = as_frame(report.format_data(data))
+                    keys = row_keys(data, report.volatile_columns)
+                    sections.append(render_section(title, data, keys, previous.get(title, set(keys))))
+                    previous[title] = set(keys)
+                sections.append(Text(stats.describe(), style="dim"))
+                live.update(Group(*sections), refresh=True)
+                time.sleep(max(interval - (time.monotonic() - start), 0))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,167 @@
+"""Performance Insights metric time series"""
+
+import math
+import shutil
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, NamedTuple, Sequence, Tuple, Union
+
+import numpy as np
+import numpy.typing as npt
+
+# Largest MaxResults accepted by GetResourceMetrics
+PI_MAX_RESULTS = 25
+# Datapoints per series fetched by each time window of a sharded pull (one hour at one second resolution)
+PI_WINDOW_POINTS = 3600
+# PeriodInSeconds values accepted by GetResourceMetrics
+PI_PERIODS = (1, 60, 300, 3600, 86400)
+# Dimensions returned by a GroupBy without Limit
+PI_GROUP_BY_LIMIT = 10
+
+
+class MetricKey(NamedTuple):
+    """Metric name and dimensions of one series of a GetResourceMetrics response"""
+
+    metric: str
+    dimensions: Tuple[Tuple[str, str], ...] = ()
+
+    def __str__(self) -> str:
+        if not self.dimensions:
+            return self.metric
+        return f"{self.metric}{{{','.join(f'{name}={value}' for name, value in self.dimensions)}}}"
+
+
+def metric_key(key: Any) -> MetricKey:
+    """MetricKey of a response Key ({"Metric": ..., "Dimensions": {...}})"""
+    return MetricKey(key["Metric"], tuple(sorted(key.get("Dimensions", {}).items())))
+
+
+def expected_points(start_time: datetime, end_time: datetime, period_in_seconds: int) -> int:
+    """Datapoints of one series in [start_time, end_time), plus one for the period alignment"""
+    return max(math.ceil((end_time - start_time).total_seconds() / period_in_seconds), 0) + 1
+
+
+def time_windows(start_time: datetime, end_time: datetime, period_in_seconds: int, window_points: int = PI_WINDOW_POINTS) -> List[Tuple[datetime, datetime]]:
+    """[start, end) windows covering the range, in order. Inner boundaries are multiples of the period so PI alignment does not overlap them"""
+    window = window_points * period_in_seconds
+    first_boundary = (math.floor(start_time.timestamp() / window) + 1) * window
+    boundaries = [start_time]
+    boundary = start_time + timedelta(seconds=first_boundary - start_time.timestamp())
+    while boundary < end_time:
+        boundaries.append(boundary)
+        boundary += timedelta(seconds=window)
+    boundaries.append(end_time)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+class PeriodPlan(NamedTuple):
+    """Period chosen for a time range and the GetResourceMetrics calls it needs"""
+
+    period_in_seconds: int
+    points: int
+    windows: int
+    pages_per_window: int
+
+    @property
+    def calls(self) -> int:
+        return self.windows * self.pages_per_window
+
+    def describe(self) -> str:
+        return f"{self.points} points per series every {self.period_in_seconds}s, {self.calls} GetResourceMetrics calls at most"
+
+
+def response_items(metric_queries: Sequence[Any]) -> int:
+    """Series returned by the queries: one per metric, plus one per dimension group when grouped"""
+    return sum(1 + (query["GroupBy"].get("Limit", PI_GROUP_BY_LIMIT) if query.get("GroupBy") else 0) for query in metric_queries)
+
+
+def plan_period(
+    start_time: datetime,
+    end_time: datetime,
+    metric_queries: Sequence[Any] = (),
+    max_points: Union[int, None] = None,
+    max_results: int = PI_MAX_RESULTS,
+    window_points: int = PI_WINDOW_POINTS,
+) -> PeriodPlan:
+    """
+    Finest period giving at most max_points points per series (the terminal width by default).
+    Coarser periods need fewer calls but would not add resolution the output can show.
+    Calls are an upper bound, cached ranges are not fetched again
+    """
+    max_points = max_points or shutil.get_terminal_size().columns
+    period = next(
+        (period for period in PI_PERIODS if expected_points(start_time, end_time, period) - 1 <= max_points),
+        PI_PERIODS[-1],
+    )
+    windows = len(time_windows(start_time, end_time, period, window_points))
+    pages_per_window = max(math.ceil(response_items(metric_queries) / max_results), 1)
+    return PeriodPlan(period, expected_points(start_time, end_time, period) - 1, windows, pages_per_window)
+
+
+class MetricSeries:
+    """
+    Timestamps and values of one metric, appended page by page into preallocated arrays.
+    Missing values are NaN. Arrays only grow (doubling) when the response has more points than expected
+    """
+
+    def __init__(self, key: MetricKey, capacity: int) -> None:
+        self.key = key
+        self._timestamps: npt.NDArray[np.datetime64] = np.empty(max(capacity, 1), dtype="datetime64[s]")
+        self._values: npt.NDArray[np.float64] = np.empty(max(capacity, 1), dtype=np.float64)
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _reserve(self, size: int) -> None:
+        if size <= len(self._values):
+            return
+        capacity = max(size, 2 * len(self._values))
+        self._timestamps = np.resize(self._timestamps, capacity)
+        self._values = np.resize(self._values, capacity)
+
+    def append(self, data_points: List[Any]) -> None:
+        """Copy the DataPoints ({"Timestamp": datetime, "Value": float}) of a response page"""
+        size = len(data_points)
+        self._reserve(self.count + size)
+        end = self.count + size
+        self._timestamps[self.count : end] = np.fromiter(
+            (int(point["Timestamp"].timestamp()) for point in data_points), dtype=np.int64, count=size
+        ).astype("datetime64[s]")
+        self._values[self.count : end] = np.fromiter((point.get("Value", math.nan) for point in data_points), dtype=np.float64, count=size)
+        self.count = end
+
+    def extend(self, other: "MetricSeries") -> None:
+        """Append the points of other that are later than the last point, windows aligned by PI can repeat a boundary point"""
+        self.extend_arrays(other.timestamps, other.values)
+
+    def extend_arrays(self, timestamps: npt.NDArray[np.datetime64], values: npt.NDArray[np.float64]) -> None:
+        if self.count:
+            later = timestamps > self._timestamps[self.count - 1]
+            timestamps, values = timestamps[later], values[later]
+        size = len(values)
+        self._reserve(self.count + size)
+        self._timestamps[self.count : self.count + size] = timestamps
+        self._values[self.count : self.count + size] = values
+        self.count += size
+
+    @property
+    def timestamps(self) -> npt.NDArray[np.datetime64]:
+        return self._timestamps[: self.count]
+
+    @property
+    def values(self) -> npt.NDArray[np.float64]:
+        return self._values[: self.count]
+
+
+MetricsSeries = Dict[MetricKey, MetricSeries]
+
+
+def merge_series(parts: List[MetricsSeries], capacity: int) -> MetricsSeries:
+    """Series of consecutive time windows, concatenated in window order"""
+    merged: MetricsSeries = {}
+    for part in parts:
+        for key, series in part.items():
+            if key not in merged:
+                merged[key] = MetricSeries(key, capacity)
+            merged[key].extend(series)
+    return merged
@@ -0,0 +1,188 @@
+"""Performance Insights datapoints, kept in a local cache between runs"""
+
+import json
+import math
+import os
+import sqlite3
+import time
+from contextlib import closing
+from datetime import datetime, timezone
+from typing import Any, List, Literal, Tuple, Union
+
+import numpy as np
+
+from pg_stats_tools.pi import MetricKey, MetricSeries, MetricsSeries
+
+# Recent datapoints can still change (late samples, partial periods), they are fetched again on every request
+PI_OPEN_TAIL_SECONDS = 300
+PI_DEFAULT_RETENTION_DAYS = 7
+
+Interval = Tuple[float, float]
+
+
+def uncovered(start: float, end: float, segments: List[Interval]) -> List[Interval]:
+    """Parts of [start, end) not covered by segments"""
+    gaps: List[Interval] = []
+    cursor = start
+    for segment_start, segment_end in sorted(segments):
+        if segment_start >= end:
+            break
+        if segment_end <= cursor:
+            continue
+        if segment_start > cursor:
+            gaps.append((cursor, segment_start))
+        cursor = segment_end
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+def merge_segments(segments: List[Interval]) -> List[Interval]:
+    """Union of overlapping or adjacent segments"""
+    merged: List[Interval] = []
+    for segment_start, segment_end in sorted(segments):
+        if merged and segment_start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], segment_end))
+        else:
+            merged.append((segment_start, segment_end))
+    return merged
+
+
+def queries_key(metric_queries: List[Any]) -> str:
+    """Metrics, group by and filters of the queries, as they identify the returned series"""
+    return json.dumps(metric_queries, sort_keys=True, default=str)
+
+
+def _utc(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc)
+
+
+def stamp_bounds(start: float, end: float, period_in_seconds: int, period_alignment: Literal["END_TIME", "START_TIME"]) -> Interval:
+    """[low, high) timestamps of the points of the periods covering [start, end): stamped at the start or the end of their period"""
+    low, high = math.floor(start / period_in_seconds) * period_in_seconds, end
+    return (low + period_in_seconds, high + period_in_seconds) if period_alignment == "END_TIME" else (low, high)
+
+
+class PIMetricsCache:
+    """
+    Persistent datapoints of (resource id, metric queries, period, period alignment), stored in a sqlite file
+    with the time segments already fetched, so a request only fetches the gaps.
+    Segments are ranges of periods, the same with both alignments, only the timestamps of the points depend on it
+    """
+
+    def __init__(self, path: Union[str, None] = None) -> None:
+        if path is None:
+            from pg_stats_tools.cache import cache_dir
+
+            path = os.path.join(cache_dir(), "pi_metrics.sqlite")
+        self.path = path
+        with closing(sqlite3.connect(self.path, timeout=30)) as db, db:
+            columns = [row[1] for row in db.execute("PRAGMA table_info(segments)")]
+            if columns and "alignment" not in columns:
+                # Cache of earlier versions, points of both alignments were kept under one key
+                db.execute("DROP TABLE segments")
+                db.execute("DROP TABLE IF EXISTS points")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS segments (resource_id TEXT, queries TEXT, period INTEGER, alignment TEXT, segment_start REAL, segment_end REAL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS segments_key ON segments (resource_id, queries, period, alignment)")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS points ("
+                "resource_id TEXT, queries TEXT, period INTEGER, alignment TEXT, metric TEXT, dimensions TEXT, ts INTEGER, value REAL, "
+                "PRIMARY KEY (resource_id, queries, period, alignment, metric, dimensions, ts)) WITHOUT ROWID"
+            )
+
+    def gaps(
+        self,
+        resource_id: str,
+        metric_queries: List[Any],
+        period_in_seconds: int,
+        start_time: datetime,
+        end_time: datetime,
+        retention_days: int = PI_DEFAULT_RETENTION_DAYS,
+        now: Union[float, None] = None,
+        period_alignment: Literal["END_TIME", "START_TIME"] = "END_TIME",
+    ) -> List[Tuple[datetime, datetime]]:
+        """
+        Time ranges of [start_time, end_time) to fetch from PI: not fetched yet, or still open.
+        Ranges are aligned to the period and do not start before the retention window
+        """
+        now = time.time() if now is None else now
+        retention_start = math.ceil((now - retention_days * 86400) / period_in_seconds + 1) * period_in_seconds
+        with closing(sqlite3.connect(self.path, timeout=30)) as db:
+            segments = db.execute(
+                "SELECT segment_start, segment_end FROM segments WHERE resource_id = ? AND queries = ? AND period = ? AND alignment = ?",
+                (resource_id, queries_key(metric_queries), period_in_seconds, period_alignment),
+            ).fetchall()
+        gaps: List[Tuple[datetime, datetime]] = []
+        for gap_start, gap_end in uncovered(start_time.timestamp(), end_time.timestamp(), segments):
+            gap_start = max(math.floor(gap_start / period_in_seconds) * period_in_seconds, retention_start)
+            gap_end = math.ceil(gap_end / period_in_seconds) * period_in_seconds
+            if gap_start < gap_end:
+                gaps.append((_utc(gap_start), _utc(gap_end)))
+        return gaps
+
+    def put(
+        self,
+        resource_id: str,
+        metric_queries: List[Any],
+        period_in_seconds: int,
+        start_time: datetime,
+        end_time: datetime,
+        series: MetricsSeries,
+        now: Union[float, None] = None,
+        period_alignment: Literal["END_TIME", "START_TIME"] = "END_TIME",
+    ) -> None:
+        """Store the series fetched for [start_time, end_time). The open tail is stored but not marked as fetched"""
+        now = time.time() if now is None else now
+        key = (resource_id, queries_key(metric_queries), period_in_seconds, period_alignment)
+        closed_end = min(end_time.timestamp(), math.floor((now - max(PI_OPEN_TAIL_SECONDS, period_in_seconds)) / period_in_seconds) * period_in_seconds)
+        with closing(sqlite3.connect(self.path, timeout=30)) as db, db:
+            for metric_series in series.values():
+                metric, dimensions = metric_series.key.metric, json.dumps(metric_series.key.dimensions)
+                db.executemany(
+                    "INSERT OR REPLACE INTO points VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        (*key, metric, dimensions, ts, None if math.isnan(value) else value)
+                        for ts, value in zip(metric_series.timestamps.astype(np.int64).tolist(), metric_series.values.tolist())
+                    ),
+                )
+            if closed_end > start_time.timestamp():
+                segments = db.execute(
+                    "SELECT segment_start, segment_end FROM segments WHERE resource_id = ? AND queries = ? AND period = ? AND alignment = ?", key
+                ).fetchall()
+                db.execute("DELETE FROM segments WHERE resource_id = ? AND queries = ? AND period = ? AND alignment = ?", key)
+                db.executemany(
+                    "INSERT INTO segments VALUES (?, ?, ?, ?, ?, ?)",
+                    ((*key, *segment) for segment in merge_segments([*segments, (start_time.timestamp(), closed_end)])),
+                )
+
+    def get(
+        self,
+        resource_id: str,
+        metric_queries: List[Any],
+        period_in_seconds: int,
+        start_time: datetime,
+        end_time: datetime,
+        period_alignment: Literal["END_TIME", "START_TIME"] = "END_TIME",
+    ) -> MetricsSeries:
+        """Cached series of the periods of [start_time, end_time), as PI returns them with the alignment"""
+        key = (resource_id, queries_key(metric_queries), period_in_seconds, period_alignment)
+        bounds = stamp_bounds(start_time.timestamp(), end_time.timestamp(), period_in_seconds, period_alignment)
+        result: MetricsSeries = {}
+        with closing(sqlite3.connect(self.path, timeout=30)) as db:
+            series_keys = db.execute(
+                "SELECT DISTINCT metric, dimensions FROM points WHERE resource_id = ? AND queries = ? AND period = ? AND alignment = ?", key
+            ).fetchall()
+            for metric, dimensions in series_keys:
+                rows = db.execute(
+                    "SELECT ts, value FROM points WHERE resource_id = ? AND queries = ? AND period = ? AND alignment = ? AND metric = ? AND dimensions = ? "
+                    "AND ts >= ? AND ts < ? ORDER BY ts",
+                    (*key, metric, dimensions, *bounds),
+                ).fetchall()
+                metric_key = MetricKey(metric, tuple((name, value) for name, value in json.loads(dimensions)))
+                points = np.array(rows, dtype=np.float64).reshape(-1, 2)
+                metric_series = MetricSeries(metric_key, len(points))
+                metric_series.extend_arrays(points[:, 0].astype(np.int64).astype("datetime64[s]"), points[:, 1])
+                result[metric_key] = metric_series
+        return result
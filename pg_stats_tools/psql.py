@@ -1,9 +1,308 @@
 """postgres sql exection module"""
-from typing import Union
+import hashlib
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Mapping, Sequence, Set, Tuple, Union
 
 import pandas as pd
-import psycopg2
 import sshtunnel
+from psycopg2.extensions import connection as PgConnection
+from psycopg2.extensions import cursor as PgCursor
+from psycopg2.pool import ThreadedConnectionPool
+from rich.console import Console
+
+from pg_stats_tools import spans
+from pg_stats_tools.guard import (
+    DEFAULT_APPLICATION_NAME,
+    DEFAULT_LOCK_TIMEOUT_MS,
+    DEFAULT_STATEMENT_TIMEOUT_MS,
+    DEFAULT_WORK_MEM,
+    DOWNGRADE_SETTINGS,
+    CostAction,
+    QueryCostError,
+    plan_cost,
+    session_options,
+    tag_statement,
+)
+from pg_stats_tools.result import FETCH_BATCH_ROWS, ResultSet
+
+
+class PgSession:
+    """
+    Keeps one SSH tunnel and a small pool of database connections open for a whole cli invocation.
+    Tunnel and pool are opened lazily, on first borrow.
+    Connections are named application_name and limited by db_statement_timeout, db_lock_timeout (ms) and db_work_mem.
+    With max_cost, statements are EXPLAINed first and those planned above it are refused or downgraded (over_cost)
+    """
+
+    def __init__(
+        self,
+        db_user: str,
+        db_name: str,
+        db_pass: str,
+        db_host: str,
+        ssh_tunnel: bool = False,
+        ssh_host: Union[str, None] = None,
+        ssh_port: int = 22,
+        ssh_key_path: Union[str, None] = None,
+        ssh_key_pass: Union[str, None] = None,
+        ssh_user: Union[str, None] = None,
+        ssh_pass: Union[str, None] = None,
+        db_port: int = 5432,
+        db_pool_size: int = 4,
+        db_connect_timeout: Union[int, None] = None,
+        application_name: str = DEFAULT_APPLICATION_NAME,
+        db_statement_timeout: Union[int, None] = DEFAULT_STATEMENT_TIMEOUT_MS,
+        db_lock_timeout: Union[int, None] = DEFAULT_LOCK_TIMEOUT_MS,
+        db_work_mem: Union[str, None] = DEFAULT_WORK_MEM,
+        max_cost: Union[float, None] = None,
+        over_cost: CostAction = CostAction.refuse,
+    ) -> None:
+        self._db_user = db_user
+        self._db_name = db_name
+        self._db_pass = db_pass
+        self._db_host = db_host
+        self._db_port = db_port
+        self._db_pool_size = max(db_pool_size, 1)
+        self._db_connect_timeout = db_connect_timeout
+        self._application_name = application_name
+        self._options = session_options(db_statement_timeout, db_lock_timeout, db_work_mem)
+        self._max_cost = max_cost
+        self._over_cost = CostAction(over_cost)
+        self._ssh_tunnel = ssh_tunnel
+        self._ssh_host = ssh_host
+        self._ssh_port = ssh_port
+        self._ssh_key_path = ssh_key_path
+        self._ssh_key_pass = ssh_key_pass
+        self._ssh_user = ssh_user
+        self._ssh_pass = ssh_pass
+        self._tunnel: Any = None
+        self._pool: Union[ThreadedConnectionPool, None] = None
+        self._lock = threading.Lock()
+        # Borrowers wait for a free connection instead of failing when the pool is exhausted
+        self._slots = threading.BoundedSemaphore(self._db_pool_size)
+        # Names of the statements prepared in each connection, by backend pid
+        self._prepared: Dict[int, Set[str]] = {}
+        self.timings: Dict[str, List[float]] = {}
+
+    def record(self, phase: str, start: float) -> None:
+        self.timings.setdefault(phase, []).append(time.monotonic() - start)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time the block as a phase of the session, and as a span when profiling"""
+        start = time.monotonic()
+        with spans.span(name):
+            yield
+        self.record(name, start)
+
+    def _open(self) -> ThreadedConnectionPool:
+        with self._lock:
+            if self._pool is None:
+                host, port = self._db_host, self._db_port
+                if self._ssh_tunnel:
+                    with self.phase("ssh_tunnel"):
+                        self._tunnel = sshtunnel.open_tunnel(  # pyright: ignore[reportUnknownMemberType]
+                            (self._ssh_host, self._ssh_port),
+                            ssh_username=self._ssh_user,
+                            ssh_pkey=self._ssh_key_path,
+                            ssh_private_key_password=None if self._ssh_key_pass in [None, ""] else self._ssh_key_pass,
+                            ssh_password=None if self._ssh_pass in [None, ""] else self._ssh_pass,
+                            remote_bind_address=(self._db_host, self._db_port),
+                        )
+                        self._tunnel.start()
+                    host, port = "127.0.0.1", int(self._tunnel.local_bind_port)  # pyright: ignore
+                # Without a timeout, connecting to an unreachable host waits for the OS TCP timeout
+                settings: Dict[str, Any] = {"connect_timeout": self._db_connect_timeout} if self._db_connect_timeout else {}
+                if self._options:
+                    settings["options"] = self._options
+                with self.phase("db_connect"):
+                    self._pool = ThreadedConnectionPool(
+                        1,
+                        self._db_pool_size,
+                        host=host,
+                        port=port,
+                        database=self._db_name,
+                        user=self._db_user,
+                        password=self._db_pass,
+                        application_name=self._application_name,
+                        **settings,
+                    )
+            return self._pool
+
+    @contextmanager
+    def connection(self) -> Iterator[PgConnection]:
+        """Borrow a connection from the pool. The borrow is wrapped in a transaction"""
+        pool = self._open()
+        start = time.monotonic()
+        self._slots.acquire()
+        try:
+            conn: PgConnection = pool.getconn()
+            self.record("db_borrow", start)
+            spans.record("db_borrow", start)
+            try:
+                with conn:
+                    yield conn
+            finally:
+                pool.putconn(conn, close=bool(conn.closed))
+        finally:
+            self._slots.release()
+
+    def prepare(self, conn: PgConnection, sql: str, params: Mapping[str, Any]) -> Tuple[str, List[Any]]:
+        """
+        PREPARE sql in conn unless it was already prepared there.
+        Returns the EXECUTE statement and its parameter values
+        """
+        name, prepared_sql, values = prepared_statement(sql, params)
+        prepared = self._prepared.setdefault(conn.info.backend_pid, set())
+        if name not in prepared:
+            with self.phase("prepare"), conn.cursor() as cursor:
+                cursor.execute(f"PREPARE {name} AS {prepared_sql}")
+            prepared.add(name)
+        return f"EXECUTE {name}" + (f"({', '.join(['%s'] * len(values))})" if values else ""), values
+
+    def check_cost(self, conn: PgConnection, sql: str, params: Union[Sequence[Any], Mapping[str, Any], None]) -> None:
+        """
+        EXPLAIN the statement when the session has a max_cost. Above it, the statement is refused (QueryCostError),
+        or the settings of the transaction are downgraded so it runs without parallel workers and with little memory
+        """
+        if self._max_cost is None:
+            return
+        with self.phase("explain"), conn.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params or None)
+            plan = cursor.fetchone()[0]
+        cost = plan_cost(json.loads(plan) if isinstance(plan, str) else plan)
+        if cost <= self._max_cost:
+            return
+        if self._over_cost == CostAction.refuse:
+            raise QueryCostError(f"Statement planned at cost {cost:.0f}, above the maximum of {self._max_cost:.0f} (see --max-cost and --over-cost)")
+        with conn.cursor() as cursor:
+            for name, value in DOWNGRADE_SETTINGS.items():
+                cursor.execute("SELECT set_config(%s, %s, true)", (name, value))
+        Console(stderr=True).print(f"[yellow]Statement planned at cost {cost:.0f}, above the maximum of {self._max_cost:.0f}: running it downgraded[/yellow]")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
+                self._prepared.clear()
+            if self._tunnel is not None:
+                self._tunnel.stop()
+                self._tunnel = None
+
+
+class SpannedCursor(PgCursor):
+    """Cursor timing its execute and fetchall as spans, which tells the query from the DataFrame conversion of pd.read_sql_query"""
+
+    def execute(self, query: Any, vars: Any = None) -> None:
+        with spans.span("execute"):
+            super().execute(query, vars)
+
+    def fetchall(self) -> List[Tuple[Any, ...]]:
+        with spans.span("fetch_rows"):
+            return super().fetchall()
+
+
+# Deadline (time.monotonic) of the statements of the current thread, set by time_budget
+_budget = threading.local()
+
+
+@contextmanager
+def time_budget(seconds: Union[float, None]) -> Iterator[None]:
+    """
+    Statements executed by this thread in the block share a budget of seconds: each runs with a statement_timeout of
+    the time left, so the server cancels whatever is still running when the budget is spent. None sets no budget
+    """
+    previous: Union[float, None] = getattr(_budget, "deadline", None)
+    if seconds:
+        _budget.deadline = min(previous or float("inf"), time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _budget.deadline = previous
+
+
+def _budget_timeout(statement_timeout: Union[int, None]) -> Union[int, None]:
+    """statement_timeout (ms) of the next statement, lowered to the time left of the budget of the thread"""
+    deadline: Union[float, None] = getattr(_budget, "deadline", None)
+    if deadline is None:
+        return statement_timeout
+    left = int((deadline - time.monotonic()) * 1000)
+    if left <= 0:
+        raise TimeoutError("Time budget spent before the statement started")
+    return min(statement_timeout, left) if statement_timeout else left
+
+
+def _statement(
+    session: PgSession,
+    conn: PgConnection,
+    sql: str,
+    params: Union[Sequence[Any], Mapping[str, Any], None],
+    prepare: bool,
+    statement_timeout: Union[int, None],
+) -> Tuple[str, Union[Sequence[Any], Mapping[str, Any], None]]:
+    """
+    Set the statement timeout of the transaction (at most the time left of the time_budget), and the statement to
+    execute: sql itself (tagged as a statement of the tool) or the EXECUTE of its prepared form. The statement passes
+    the cost check of the session first
+    """
+    statement_timeout = _budget_timeout(statement_timeout)
+    if statement_timeout:
+        with conn.cursor() as cursor:
+            cursor.execute("SET LOCAL statement_timeout = %s", (int(statement_timeout),))
+    sql = tag_statement(sql)
+    if prepare:
+        sql, params = session.prepare(conn, sql, params or {})  # pyright: ignore[reportGeneralTypeIssues]
+    session.check_cost(conn, sql, params)
+    return sql, params
+
+
+_PLACEHOLDER = re.compile(r"%\((\w+)\)s")
+
+
+def prepared_statement(sql: str, params: Mapping[str, Any]) -> Tuple[str, str, List[Any]]:
+    """
+    Server side form of a statement with %(name)s placeholders: statement name (derived from the text),
+    text with $n placeholders and the values in $n order
+    """
+    names: List[str] = []
+
+    def placeholder(match: "re.Match[str]") -> str:
+        if match.group(1) not in names:
+            names.append(match.group(1))
+        return f"${names.index(match.group(1)) + 1}"
+
+    prepared_sql = _PLACEHOLDER.sub(placeholder, sql).replace("%%", "%")
+    name = "pg_stats_tools_" + hashlib.sha1(sql.encode()).hexdigest()[:16]
+    return name, prepared_sql, [params[key] for key in names]
+
+
+_sessions: Dict[Tuple[Any, ...], PgSession] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(**pg_conn_params: Any) -> PgSession:
+    """Session shared by every query issued with the same connection parameters"""
+    key = tuple(sorted(pg_conn_params.items()))
+    with _sessions_lock:
+        if key not in _sessions:
+            _sessions[key] = PgSession(**pg_conn_params)
+        return _sessions[key]
+
+
+def get_sessions() -> List[PgSession]:
+    return list(_sessions.values())
+
+
+def close_sessions() -> None:
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
 
 
 def execute_sql(
@@ -20,26 +319,115 @@ def execute_sql(
     ssh_user: Union[str, None] = None,
     ssh_pass: Union[str, None] = None,
     db_port: int = 5432,
+    db_pool_size: int = 4,
+    db_connect_timeout: Union[int, None] = None,
+    application_name: Union[str, None] = None,
+    db_statement_timeout: Union[int, None] = None,
+    db_lock_timeout: Union[int, None] = None,
+    db_work_mem: Union[str, None] = None,
+    max_cost: Union[float, None] = None,
+    over_cost: Union[CostAction, None] = None,
+    statement_timeout: Union[int, None] = None,
+    params: Union[Sequence[Any], Mapping[str, Any], None] = None,
+    prepare: bool = False,
 ) -> pd.DataFrame:
+    """
+    Execute sql in a connection borrowed from the session. statement_timeout (ms) applies to this execution only.
+    params are passed to the driver as bind parameters (%(name)s placeholders).
+    With prepare, sql is prepared once per connection and later executions only send the parameter values
+    """
+    session = get_session(
+        db_user=db_user,
+        db_name=db_name,
+        db_pass=db_pass,
+        db_host=db_host,
+        ssh_tunnel=ssh_tunnel,
+        ssh_host=ssh_host,
+        ssh_port=ssh_port,
+        ssh_key_path=ssh_key_path,
+        ssh_key_pass=ssh_key_pass,
+        ssh_user=ssh_user,
+        ssh_pass=ssh_pass,
+        db_port=db_port,
+        db_pool_size=db_pool_size,
+        # Only part of the session key when set, as in the connection params fetch_result_set receives
+        **({"db_connect_timeout": db_connect_timeout} if db_connect_timeout else {}),
+        **{
+            name: value
+            for name, value in {
+                "application_name": application_name,
+                "db_statement_timeout": db_statement_timeout,
+                "db_lock_timeout": db_lock_timeout,
+                "db_work_mem": db_work_mem,
+                "max_cost": max_cost,
+                "over_cost": over_cost,
+            }.items()
+            if value is not None
+        },
+    )
     data: pd.DataFrame
-    if ssh_tunnel:
-        with sshtunnel.open_tunnel(  # pyright: ignore[reportUnknownMemberType]
-            (ssh_host, ssh_port),
-            ssh_username=ssh_user,
-            ssh_pkey=ssh_key_path,
-            ssh_private_key_password=None if ssh_key_pass in [None, ""] else ssh_key_pass,
-            ssh_password=None if ssh_pass in [None, ""] else ssh_pass,
-            remote_bind_address=(db_host, db_port),
-            # local_bind_address=("0.0.0.0", 10022),
-            # debug_level=1,
-        ) as tunnel:
-            # tunnel.start()
-            local_port: int = int(tunnel.local_bind_port)  # pyright: ignore
-
-            with psycopg2.connect(host="127.0.0.1", port=local_port, database=db_name, user=db_user, password=db_pass) as conn:
-                data = pd.read_sql_query(sql, conn)  # pyright: ignore[reportUnknownMemberType]
-            return data
-    else:
-        with psycopg2.connect(host=db_host, port=db_port, database=db_name, user=db_user, password=db_pass) as conn:
-            data = pd.read_sql_query(sql, conn)  # pyright: ignore[reportUnknownMemberType]
-        return data
+    with session.connection() as conn:
+        sql, params = _statement(session, conn, sql, params, prepare, statement_timeout)
+        cursor_factory = conn.cursor_factory
+        if spans.enabled():
+            conn.cursor_factory = SpannedCursor
+        try:
+            with session.phase("query"):
+                data = pd.read_sql_query(sql, conn, params=params or None)  # pyright: ignore[reportUnknownMemberType]
+        finally:
+            conn.cursor_factory = cursor_factory
+    return data
+
+
+def fetch_result_set(
+    sql: str,
+    params: Union[Sequence[Any], Mapping[str, Any], None] = None,
+    prepare: bool = False,
+    statement_timeout: Union[int, None] = None,
+    **pg_conn_params: Any,
+) -> ResultSet:
+    """
+    Execute sql as execute_sql does, reading the rows into a ResultSet instead of a DataFrame.
+    Rows are streamed from a server side cursor in batches, unless the statement is prepared
+    """
+    session = get_session(**pg_conn_params)
+    with session.connection() as conn:
+        sql, params = _statement(session, conn, sql, params, prepare, statement_timeout)
+        with session.phase("query"), conn.cursor() if prepare else conn.cursor(name="pg_stats_tools_result_set") as cursor:
+            cursor.itersize = FETCH_BATCH_ROWS
+            with spans.span("execute"):
+                cursor.execute(sql, params or None)
+            with spans.span("fetch_rows"):
+                result = ResultSet.from_cursor(cursor)
+    return result
+
+
+def iter_result_set(
+    sql: str,
+    params: Union[Sequence[Any], Mapping[str, Any], None] = None,
+    prepare: bool = False,
+    statement_timeout: Union[int, None] = None,
+    batch_rows: int = FETCH_BATCH_ROWS,
+    **pg_conn_params: Any,
+) -> Iterator[ResultSet]:
+    """
+    Execute sql as fetch_result_set does, yielding one ResultSet per batch of rows instead of reading them all.
+    The connection stays borrowed until the last batch is consumed, the query timing includes the time spent on each batch.
+    Spans can not stay open across a yield, the execution and every batch fetch are spans of their own
+    """
+    session = get_session(**pg_conn_params)
+    with session.connection() as conn:
+        sql, params = _statement(session, conn, sql, params, prepare, statement_timeout)
+        start = time.monotonic()
+        with conn.cursor() if prepare else conn.cursor(name="pg_stats_tools_result_set") as cursor:
+            cursor.itersize = batch_rows
+            with spans.span("execute"):
+                cursor.execute(sql, params or None)
+            batches = ResultSet.batches_from_cursor(cursor, batch_rows)
+            while True:
+                with spans.span("fetch_rows"):
+                    batch = next(batches, None)
+                if batch is None:
+                    break
+                yield batch
+        session.record("query", start)
@@ -0,0 +1,190 @@
+"""Incremental table rendering
+
+Small tables are rendered by tabulate as they are. Larger ones are laid out from a sample of their first rows and
+rendered chunk by chunk, so the first screenful is printed before the rest of the table is formatted. Cells wider
+than the widest one of the sample are cut.
+"""
+
+import inspect
+import math
+import numbers
+import shutil
+import sys
+from itertools import chain, islice
+from typing import Any, Dict, Iterator, List, NamedTuple, Sequence, Tuple, Union
+
+from pg_stats_tools import spans
+from pg_stats_tools.result import ReportData, ResultSet
+
+# Tables up to this many rows are rendered at once. Larger ones are laid out from this many first rows
+RENDER_SAMPLE_ROWS = 1000
+# Rows rendered at a time after the first screenful
+RENDER_CHUNK_ROWS = 500
+# Padding tabulate adds to headers. Numeric columns are at least this wider than their header to stay right aligned
+TABULATE_MIN_PADDING = 2
+# Rendering settings of the run: rows per page (--page-size) and whether tables go through the pager (--pager)
+render_options: Dict[str, Any] = {"page_size": None, "pager": False}
+
+
+class ColumnLayout(NamedTuple):
+    width: int
+    numeric: bool
+    # Digits after the decimal point of numeric columns, numbers are aligned on their point
+    decimals: int
+
+
+class TableFrame(NamedTuple):
+    """Lines of a table format around its rows: before the first row, between two rows and after the last one"""
+
+    head: List[str]
+    separator: List[str]
+    foot: List[str]
+
+
+def cell_text(value: Any) -> str:
+    """Text of a cell as tabulate renders it: NULL and NaN are empty, floats use the g format. Rows are kept on one line"""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    if isinstance(value, float):
+        return format(value, "g")
+    return str(value).replace("\n", " ")
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, numbers.Number) and not isinstance(value, bool)
+
+
+def _decimals(text: str) -> int:
+    point = text.rfind(".")
+    return len(text) - point - 1 if point >= 0 else 0
+
+
+def sample_layout(columns: Sequence[str], rows: Sequence[Sequence[Any]]) -> List[ColumnLayout]:
+    layout: List[ColumnLayout] = []
+    for i in range(len(columns)):
+        values = [row[i] for row in rows]
+        texts = [cell_text(value) for value in values]
+        present = [value for value, text in zip(values, texts) if text]
+        numeric = bool(present) and all(_is_number(value) for value in present)
+        decimals = max((_decimals(text) for text in texts if text), default=0) if numeric else 0
+        if numeric:
+            width = max([len(columns[i]) + TABULATE_MIN_PADDING, *(len(text) + decimals - _decimals(text) for text in texts)])
+        else:
+            width = max(map(len, texts), default=0)
+        layout.append(ColumnLayout(max(width, 1), numeric, decimals))
+    return layout
+
+
+def fit(value: Any, column: ColumnLayout) -> str:
+    """Cell text padded to the width of its column, or cut to it"""
+    text = cell_text(value)
+    if column.numeric and text:
+        text += " " * (column.decimals - _decimals(text))
+    if len(text) > column.width:
+        return text[: column.width - 1] + "…"
+    return text.rjust(column.width) if column.numeric else text.ljust(column.width)
+
+
+def _tabulate_padded(rows: List[List[str]], headers: Sequence[str], tablefmt: str) -> List[str]:
+    """Lines of rows rendered by tabulate keeping the padding of their cells (a keyword since tabulate 0.10, a module setting before)"""
+    import tabulate
+
+    if "preserve_whitespace" in inspect.signature(tabulate.tabulate).parameters:
+        return tabulate.tabulate(rows, headers=headers, tablefmt=tablefmt, disable_numparse=True, preserve_whitespace=True).splitlines()
+    preserve_whitespace = tabulate.PRESERVE_WHITESPACE
+    tabulate.PRESERVE_WHITESPACE = True
+    try:
+        return tabulate.tabulate(rows, headers=headers, tablefmt=tablefmt, disable_numparse=True).splitlines()
+    finally:
+        tabulate.PRESERVE_WHITESPACE = preserve_whitespace
+
+
+def table_frame(headers: Sequence[str], layout: Sequence[ColumnLayout], tablefmt: str) -> TableFrame:
+    """Frame of tables of tablefmt with these columns, found by rendering tables of one and two rows that differ in every cell"""
+    row_a = ["a" * column.width for column in layout]
+    row_b = ["b" * column.width for column in layout]
+    one_a = _tabulate_padded([row_a], headers, tablefmt)
+    one_b = _tabulate_padded([row_b], headers, tablefmt)
+    two = _tabulate_padded([row_a, row_b], headers, tablefmt)
+    head = 0
+    while one_a[head] == one_b[head]:
+        head += 1
+    foot = len(one_a) - head - 1
+    return TableFrame(one_a[:head], two[head + 1 : len(two) - foot - 1], one_a[len(one_a) - foot :])
+
+
+def table_rows(data: ReportData) -> Tuple[List[str], int, Iterator[Sequence[Any]]]:
+    """Headers, row count and rows of data as tabulate shows them: DataFrames with their index first"""
+    if isinstance(data, ResultSet):
+        return data.columns, len(data), data.rows()
+    return ["", *map(str, data.columns)], len(data), data.itertuples(index=True, name=None)
+
+
+def render_table(data: ReportData, tablefmt: str, page_size: Union[int, None] = None, first_rows: Union[int, None] = None) -> Iterator[str]:
+    """
+    Table of data in tablefmt, as blocks of lines to print one after the other.
+    Without page_size, the first block holds the header and the first_rows rows (a screenful by default) and the next
+    blocks hold the following rows. With page_size, every block is a whole table of page_size rows
+    """
+    import tabulate
+
+    headers, count, rows = table_rows(data)
+    if count == 0 or (page_size is None and count <= RENDER_SAMPLE_ROWS):
+        yield tabulate.tabulate(data, headers="keys", tablefmt=tablefmt)  # pyright: ignore
+        return
+    sample = list(islice(rows, RENDER_SAMPLE_ROWS))
+    layout = sample_layout(headers, sample)
+    frame = table_frame(headers, layout, tablefmt)
+    rows = chain(sample, rows)
+    if page_size is not None:
+        while True:
+            page = [[fit(value, column) for value, column in zip(row, layout)] for row in islice(rows, page_size)]
+            if not page:
+                return
+            yield "\n".join(_tabulate_padded(page, headers, tablefmt))
+    size = first_rows or max(shutil.get_terminal_size().lines - len(frame.head) - 1, 1)
+    before = frame.head
+    while True:
+        chunk = [[fit(value, column) for value, column in zip(row, layout)] for row in islice(rows, size)]
+        if not chunk:
+            break
+        rendered = _tabulate_padded(chunk, headers, tablefmt)
+        yield "\n".join([*before, *rendered[len(frame.head) : len(rendered) - len(frame.foot)]])
+        before = frame.separator
+        size = RENDER_CHUNK_ROWS
+    if frame.foot:
+        yield "\n".join(frame.foot)
+
+
+def _spanned(blocks: Iterator[str]) -> Iterator[str]:
+    """Blocks of a table, the rendering of each one timed as a span"""
+    while True:
+        with spans.span("render"):
+            block = next(blocks, None)
+        if block is None:
+            return
+        yield block
+
+
+def print_table(data: ReportData, tablefmt: str) -> None:
+    """
+    Print the table of data as it is rendered, with the settings of the run.
+    Pages wait for a key between them on a terminal (q stops), the pager receives the table as it is rendered
+    """
+    import click
+    from rich import print
+
+    page_size = render_options["page_size"]
+    blocks = _spanned(render_table(data, tablefmt, page_size=page_size))
+    if render_options["pager"]:
+        click.echo_via_pager(f"{block}\n" for block in blocks)
+        return
+    interactive = page_size is not None and sys.stdin.isatty() and sys.stdout.isatty()
+    for i, block in enumerate(blocks):
+        if interactive and i:
+            click.echo("-- more (any key, q to stop) --", nl=False)
+            key = click.getchar()
+            click.echo("\r" + " " * 32 + "\r", nl=False)
+            if key in ("q", "Q"):
+                return
+        print(block)
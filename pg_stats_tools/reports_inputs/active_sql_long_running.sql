@@ -8,15 +8,16 @@ SELECT
     , {{fetch_field}}
     {% endfor %}
 FROM pg_stat_activity
+{{leading_keyword_join}}
 -- JOIN pg_catalog.pg_stat_statements.queryid ON pg_catalog.pg_stat_statements.query = pg_stat_activity.query and  pg_catalog.pg_stat_statements.backend_start = pg_stat_activity.backend_start
 WHERE
     pg_stat_activity.pid != pg_backend_pid()
     AND state != 'idle'
     {% if dbname !="_all" %}
-    AND database = {{dbname}}
+    AND datname = {{ bind("dbname") }}
     {% endif %}
-    AND query ~* '.*{{sql_type}}.*'
+    AND classified.leading_keyword = {{ bind("sql_type") }}
 
 
 ORDER BY time_running DESC
-LIMIT {{count}};
\ No newline at end of file
+LIMIT {{ bind("count") }};
\ No newline at end of file
@@ -0,0 +1,32 @@
+-- Executed once for all sql_types. Sessions are classified by the leading keyword of their query
+WITH typed AS (
+    SELECT
+        sql_types.sql_type AS sql_type,
+        usename AS username,
+        datname AS database,
+        LEFT(query, 15) AS query,
+        age(clock_timestamp(), query_start) as time_running
+        {% for fetch_field in fetch_fields %}
+        , {{fetch_field}}
+        {% endfor %}
+    FROM pg_stat_activity
+    {{leading_keyword_join}}
+    JOIN unnest({{ bind("sql_types") }}::text[]) AS sql_types(sql_type)
+        ON classified.leading_keyword = sql_types.sql_type
+    WHERE
+        pg_stat_activity.pid != pg_backend_pid()
+        AND state != 'idle'
+        {% if dbname !="_all" %}
+        AND datname = {{ bind("dbname") }}
+        {% endif %}
+),
+ranked AS (
+    SELECT
+        *,
+        row_number() OVER (PARTITION BY sql_type ORDER BY time_running DESC) AS sql_type_rank
+    FROM typed
+)
+SELECT *
+FROM ranked
+WHERE sql_type_rank <= {{ bind("count") }}
+ORDER BY sql_type, sql_type_rank;
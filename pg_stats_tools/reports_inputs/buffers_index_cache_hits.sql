@@ -8,6 +8,6 @@ SELECT
         ELSE round(SUM(idx_blks_hit)::NUMERIC/(SUM(idx_blks_hit) + SUM(idx_blks_read)) * 100,2)
 	END AS idx_cache_hit_ratio_pct
 FROM pg_statio_all_indexes
-{% if schema !="_all" %} WHERE schemaname='{{schema}}' {% endif %}
+{% if schema !="_all" %} WHERE schemaname={{ bind("schema") }} {% endif %}
 GROUP BY relname,indexrelname{% if schema =="_all" %},schemaname{% endif %}
 ORDER BY idx_cache_hit_ratio_pct DESC
@@ -8,6 +8,6 @@ SELECT
          END)
     ,2) as table_cache_hit_ratio_pct
 FROM  pg_statio_all_tables
-{% if schema !="_all" %} WHERE schemaname='{{schema}}' {% endif %}
+{% if schema !="_all" %} WHERE schemaname={{ bind("schema") }} {% endif %}
 GROUP BY relname {% if schema =="_all" %} ,schemaname {% endif %}
 ORDER BY table_cache_hit_ratio_pct DESC
\ No newline at end of file
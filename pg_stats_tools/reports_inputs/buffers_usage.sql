@@ -15,11 +15,11 @@ SELECT
      END AS rel_type,
 	 count(*) AS buffer_count,
 	 SUM(CASE WHEN usagecount > 0 THEN 1 ELSE 0 END) AS used_buffers,
-	 SUM(CASE WHEN usagecount > 0 THEN 1 ELSE 0 END)/count(*)*100 as used_buffers_pct
+	 round(SUM(CASE WHEN usagecount > 0 THEN 1 ELSE 0 END)::NUMERIC/count(*)*100, 2) as used_buffers_pct
 FROM pg_buffercache b
 LEFT JOIN pg_class c ON b.relfilenode = pg_relation_filenode(c.oid)
 	AND b.reldatabase IN (0, (SELECT oid FROM pg_database WHERE datname = current_database()))
 LEFT JOIN pg_namespace n ON n.oid = c.relnamespace
-{% if schema !="_all" %} WHERE n.nspname='{{schema}}' {% endif %}
-GROUP BY sch_name, c.relname,c.relkind{% if schema =="_all" %},n.nspname{% endif %}
+{% if schema !="_all" %} WHERE n.nspname={{ bind("schema") }} {% endif %}
+GROUP BY c.relname,c.relkind{% if schema =="_all" %},n.nspname{% endif %}
 ORDER BY used_buffers_pct DESC
\ No newline at end of file
@@ -4,7 +4,7 @@ WITH table_scans as (
         ( tables.n_tup_ins + tables.n_tup_upd + tables.n_tup_del ) as writes,
                 pg_relation_size(relid) as table_size
         FROM pg_stat_user_tables as tables
-        {% if schema !="_all" %} WHERE  tables.schemaname='{{schema}}' {% endif %}
+        {% if schema !="_all" %} WHERE  tables.schemaname={{ bind("schema") }} {% endif %}
 ),
 all_writes as (
     SELECT sum(writes) as total_writes
@@ -34,7 +34,7 @@ indexes as (
                 AND idx_stat.relname = indexes.tablename
                 AND idx_stat.indexrelname = indexes.indexname
     WHERE pg_index.indisunique = FALSE
-    {% if schema !="_all" %} AND  idx_stat.schemaname='{{schema}}' {% endif %}
+    {% if schema !="_all" %} AND  idx_stat.schemaname={{ bind("schema") }} {% endif %}
 ),
 index_ratios AS (
 SELECT tablename, indexname,
@@ -0,0 +1,8 @@
+-- Leading keyword of the query text of the given statements, extracted server side so the text is not transferred
+SELECT DISTINCT
+    pgss.dbid,
+    pgss.queryid,
+    classified.leading_keyword
+FROM pg_stat_statements(true) AS pgss
+{{leading_keyword_join}}
+WHERE pgss.queryid = ANY({{ bind("queryids") }})
@@ -0,0 +1,7 @@
+-- Leading part of the query text of the given statements
+SELECT DISTINCT
+    dbid,
+    queryid,
+    LEFT(query, {{ bind("text_length") }}) AS query
+FROM pg_stat_statements(true)
+WHERE queryid = ANY({{ bind("queryids") }})
@@ -0,0 +1,12 @@
+-- pg_buffercache aggregated per relation, as used by buffers_usage
+SELECT
+    n.nspname AS sch_name,
+    c.relname AS rel_name,
+    c.relkind AS relkind,
+    count(*) AS buffer_count,
+    SUM(CASE WHEN usagecount > 0 THEN 1 ELSE 0 END) AS used_buffers
+FROM pg_buffercache b
+LEFT JOIN pg_class c ON b.relfilenode = pg_relation_filenode(c.oid)
+    AND b.reldatabase IN (0, (SELECT oid FROM pg_database WHERE datname = current_database()))
+LEFT JOIN pg_namespace n ON n.oid = c.relnamespace
+GROUP BY n.nspname, c.relname, c.relkind
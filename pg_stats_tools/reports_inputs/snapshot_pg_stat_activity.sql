@@ -0,0 +1,5 @@
+SELECT
+    activity.*,
+    activity.pid = pg_backend_pid() AS is_snapshot_backend,
+    clock_timestamp() AS captured_at
+FROM pg_stat_activity AS activity
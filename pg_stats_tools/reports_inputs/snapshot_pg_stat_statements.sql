@@ -0,0 +1,7 @@
+SELECT
+    pg_user.usename AS usename,
+    pg_database.datname AS datname,
+    pgss.*
+FROM pg_stat_statements AS pgss
+LEFT JOIN pg_catalog.pg_user ON pgss.userid = pg_catalog.pg_user.usesysid
+LEFT JOIN pg_database ON pgss.dbid = pg_database.oid
@@ -0,0 +1,7 @@
+SELECT
+    idx_stat.*,
+    pg_relation_size(idx_stat.indexrelid) AS index_bytes,
+    pg_index.indisunique AS indisunique,
+    pg_get_indexdef(idx_stat.indexrelid) AS indexdef
+FROM pg_stat_user_indexes AS idx_stat
+JOIN pg_index USING (indexrelid)
@@ -0,0 +1,4 @@
+SELECT
+    tables.*,
+    pg_relation_size(tables.relid) AS table_bytes
+FROM pg_stat_user_tables AS tables
@@ -0,0 +1 @@
+SELECT * FROM pg_statio_all_indexes
@@ -0,0 +1,5 @@
+SELECT
+    current_database() AS database,
+    current_setting('server_version') AS server_version,
+    pg_is_in_recovery() AS in_recovery,
+    clock_timestamp() AS captured_at
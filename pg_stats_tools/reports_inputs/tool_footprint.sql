@@ -0,0 +1,9 @@
+-- pg_stat_statements entries of pg_stats_tools, found by the comment its statements start with.
+-- Entries are read as json: column names changed across versions (total_time became total_exec_time in 13,
+-- blk_read_time became shared_blk_read_time in 17)
+SELECT
+    pg_database.datname AS database,
+    to_jsonb(pg_stat_statements) AS entry
+FROM pg_stat_statements(true)
+LEFT JOIN pg_database ON pg_database.oid = pg_stat_statements.dbid
+WHERE pg_stat_statements.query LIKE {{ bind("tag_pattern") }}
@@ -11,10 +11,11 @@ SELECT
 FROM pg_stat_statements
 JOIN pg_catalog.pg_user ON pg_stat_statements.userid = pg_catalog.pg_user.usesysid
 JOIN pg_stat_database ON pg_stat_statements.dbid = pg_stat_database.datid
+{{leading_keyword_join}}
 WHERE
-    query ~*  '^\s*{{sql_type}}'
+    classified.leading_keyword = {{ bind("sql_type") }}
 {% if dbname !="_all" %}
-    AND pg_stat_database.datname = {{database}}
+    AND pg_stat_database.datname = {{ bind("dbname") }}
 {% endif %}
 ORDER BY {{top_stat_field}} DESC
-LIMIT {{count}};
\ No newline at end of file
+LIMIT {{ bind("count") }};
\ No newline at end of file
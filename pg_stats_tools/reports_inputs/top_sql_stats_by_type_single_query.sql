@@ -0,0 +1,32 @@
+-- Executed once for all sql_types. Statements are classified by their leading keyword and ranked per sql_type
+WITH typed AS (
+    SELECT
+        sql_types.sql_type AS sql_type,
+        pg_user.usename AS user,
+        {% if dbname =="_all" %} pg_stat_database.datname AS database,{% endif %}
+        queryid,
+        LEFT(query, 50) AS query,
+        {{top_stat_field}}
+        {% for fetch_field in fetch_fields %}
+        , {{fetch_field}}
+        {% endfor %}
+    FROM pg_stat_statements
+    JOIN pg_catalog.pg_user ON pg_stat_statements.userid = pg_catalog.pg_user.usesysid
+    JOIN pg_stat_database ON pg_stat_statements.dbid = pg_stat_database.datid
+    {{leading_keyword_join}}
+    JOIN unnest({{ bind("sql_types") }}::text[]) AS sql_types(sql_type)
+        ON classified.leading_keyword = sql_types.sql_type
+    {% if dbname !="_all" %}
+    WHERE pg_stat_database.datname = {{ bind("dbname") }}
+    {% endif %}
+),
+ranked AS (
+    SELECT
+        *,
+        row_number() OVER (PARTITION BY sql_type ORDER BY {{top_stat_field}} DESC) AS sql_type_rank
+    FROM typed
+)
+SELECT *
+FROM ranked
+WHERE sql_type_rank <= {{ bind("count") }}
+ORDER BY sql_type, sql_type_rank;
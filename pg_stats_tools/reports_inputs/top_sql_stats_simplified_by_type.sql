@@ -1,96 +1,59 @@
-CREATE OR REPLACE FUNCTION add_decimals_if_present(input_number numeric, decimals int)
-RETURNS numeric AS $$
-BEGIN
-    IF input_number = trunc(input_number) THEN
-        RETURN trunc(input_number); -- No decimals, return as-is
-    ELSE
-        RETURN round(input_number::numeric, decimals::int); -- Round to specified number of decimals
-    END IF;
-END;
-$$ LANGUAGE plpgsql;
-
-CREATE OR REPLACE FUNCTION format_large_number(input_number numeric)
-RETURNS text AS $$
-DECLARE
-    units text[] := ARRAY['','k', 'M', 'G', 'T', 'P', 'E', 'Z', 'Y'];
-    result text;
-    unit_index int := 1;
-BEGIN
-    WHILE input_number >= 1000.0 AND unit_index < array_length(units, 1) LOOP
-        input_number := input_number / 1000.0;
-        unit_index := unit_index + 1;
-    END LOOP;
-
-    result := add_decimals_if_present(input_number::numeric, 2)::text || units[unit_index];
-    RETURN result;
-END;
-$$ LANGUAGE plpgsql;
-
-CREATE OR REPLACE FUNCTION format_duration(milliseconds float)
-RETURNS text AS $$
-DECLARE
-    units text[] := ARRAY['ms', 's', 'm', 'h', 'd'];
-    unit_names text[] := ARRAY['', 's', 'm', 'h', 'd'];
-    conversion_factors numeric[] := ARRAY[1000, 60, 60, 24];
-    result text;
-    unit_index int := 1;
-BEGIN
-    FOR i IN 1..array_length(conversion_factors, 1) LOOP
-        EXIT WHEN  milliseconds < conversion_factors[i] OR unit_index >= array_length(units, 1);
-        milliseconds := milliseconds / conversion_factors[i];
-        unit_index := unit_index + 1;
-    END LOOP;
-    result := ROUND(milliseconds::numeric,2) || ' ' || unit_names[unit_index];
-    RETURN result;
-END;
-$$ LANGUAGE plpgsql;
-
-
-
-WITH data as (
+-- Executed for each sql_type. Values are returned raw, they are formatted client side
+WITH base AS (
 	SELECT
 		pg_user.usename AS user,
         {% if dbname =="_all" %} pg_database.datname AS database,{% endif %}
-		queryid AS queryid,
-		calls AS calls,
-		rows AS rows,
-		total_time as time,
-		ROUND(total_time::numeric / calls::numeric, 2)  AS atime,
+		pgss.queryid AS queryid,
+		pgss.calls AS calls,
+		pgss.rows AS rows,
+		pgss.total_time AS time,
 		(pgss.blk_read_time + pgss.blk_write_time) AS iotime,
-		(shared_blks_read+local_blks_read+temp_blks_read) AS blk_read,
-		(shared_blks_hit+local_blks_hit) AS buff_blk_read,
-	    (shared_blks_written + local_blks_written + temp_blks_written)  AS blk_written
-
+		(pgss.shared_blks_read + pgss.local_blks_read + pgss.temp_blks_read) AS blk_r,
+		(pgss.shared_blks_hit + pgss.local_blks_hit) AS buff_blk_r,
+		(pgss.shared_blks_written + pgss.local_blks_written + pgss.temp_blks_written) AS blk_w
 	FROM pg_stat_statements as pgss
 	LEFT JOIN pg_catalog.pg_user ON pgss.userid = pg_catalog.pg_user.usesysid
-	LEFT JOIN pg_database ON pgss.dbid = 	pg_database.oid
+	LEFT JOIN pg_database ON pgss.dbid = pg_database.oid
+	{{leading_keyword_join}}
 	WHERE
-        query ~*  '^\s*{{sql_type}}'
+        classified.leading_keyword = {{ bind("sql_type") }}
         {% if dbname !="_all" %}
-            AND pg_database.datname = {{database}}
+            AND pg_database.datname = {{ bind("dbname") }}
         {% endif %}
-    ORDER BY {{top_stat_field}} {{sort}}
-    LIMIT {{count}}
+),
+data AS (
+	SELECT
+		base.*,
+		base.rows::float8 / NULLIF(base.calls, 0) AS arows,
+		base.time::float8 / NULLIF(base.calls, 0) AS atime,
+		base.iotime::float8 / NULLIF(base.calls, 0) AS aiotime,
+		base.blk_r::float8 / NULLIF(base.calls, 0) AS ablk_r,
+		base.buff_blk_r::float8 / NULLIF(base.calls, 0) AS abuff_blk_r,
+		CASE
+			WHEN (base.buff_blk_r + base.blk_r) = 0 THEN -1::float8
+			ELSE base.buff_blk_r::float8 / (base.buff_blk_r + base.blk_r) * 100
+		END AS buff_blk_r_pct,
+		base.blk_w::float8 / NULLIF(base.calls, 0) AS ablk_w
+	FROM base
 )
 SELECT
 	data.user AS user,
     {% if dbname =="_all" %} data.database AS database,{% endif %}
-    data.queryid AS queryid,
-    data.calls AS calls,
-    format_large_number(data.rows) AS rows,
-	format_large_number(add_decimals_if_present(data.rows::numeric / data.calls,2))  AS arows,
-    format_duration(data.time) as time,
-    data.atime AS atime,
-    format_duration(data.iotime) AS iotime,
-	add_decimals_if_present(data.iotime::numeric/data.calls::numeric,2) AS aiotime,
-    format_large_number(data.blk_read) AS blk_r,
-	 format_large_number(add_decimals_if_present(data.blk_read/data.calls,2)) AS ablk_r,
-    format_large_number(data.buff_blk_read) AS buff_blk_r,
-    format_large_number(add_decimals_if_present(data.buff_blk_read/calls,2)) AS abuff_blk_r,
-	CASE
-		WHEN (data.buff_blk_read + data.blk_read) = 0 THEN -1::NUMERIC
-		ELSE ROUND(data.buff_blk_read::numeric/(data.buff_blk_read + data.blk_read)*100,2)
-	END AS buff_blk_read_pct,
-	format_large_number(data.blk_written) AS blk_w,
-	format_large_number(add_decimals_if_present(data.blk_written/calls,2))  AS ablk_w
+	data.queryid AS queryid,
+	data.calls AS calls,
+	data.rows AS rows,
+	data.arows AS arows,
+	data.time AS time,
+	data.atime AS atime,
+	data.iotime AS iotime,
+	data.aiotime AS aiotime,
+	data.blk_r AS blk_r,
+	data.ablk_r AS ablk_r,
+	data.buff_blk_r AS buff_blk_r,
+	data.abuff_blk_r AS abuff_blk_r,
+	data.buff_blk_r_pct AS buff_blk_r_pct,
+	data.blk_w AS blk_w,
+	data.ablk_w AS ablk_w
 FROM data
+ORDER BY data.{{top_stat_field}} {{sort}}
+LIMIT {{ bind("count") }};
@@ -0,0 +1,69 @@
+-- Executed once for all sql_types. Statements are classified by their leading keyword and ranked per sql_type.
+-- Values are returned raw, they are formatted client side
+WITH base AS (
+	SELECT
+		sql_types.sql_type AS sql_type,
+		pg_user.usename AS user,
+        {% if dbname =="_all" %} pg_database.datname AS database,{% endif %}
+		pgss.queryid AS queryid,
+		pgss.calls AS calls,
+		pgss.rows AS rows,
+		pgss.total_time AS time,
+		(pgss.blk_read_time + pgss.blk_write_time) AS iotime,
+		(pgss.shared_blks_read + pgss.local_blks_read + pgss.temp_blks_read) AS blk_r,
+		(pgss.shared_blks_hit + pgss.local_blks_hit) AS buff_blk_r,
+		(pgss.shared_blks_written + pgss.local_blks_written + pgss.temp_blks_written) AS blk_w
+	FROM pg_stat_statements as pgss
+	LEFT JOIN pg_catalog.pg_user ON pgss.userid = pg_catalog.pg_user.usesysid
+	LEFT JOIN pg_database ON pgss.dbid = pg_database.oid
+	{{leading_keyword_join}}
+	JOIN unnest({{ bind("sql_types") }}::text[]) AS sql_types(sql_type)
+		ON classified.leading_keyword = sql_types.sql_type
+    {% if dbname !="_all" %}
+	WHERE pg_database.datname = {{ bind("dbname") }}
+    {% endif %}
+),
+data AS (
+	SELECT
+		base.*,
+		base.rows::float8 / NULLIF(base.calls, 0) AS arows,
+		base.time::float8 / NULLIF(base.calls, 0) AS atime,
+		base.iotime::float8 / NULLIF(base.calls, 0) AS aiotime,
+		base.blk_r::float8 / NULLIF(base.calls, 0) AS ablk_r,
+		base.buff_blk_r::float8 / NULLIF(base.calls, 0) AS abuff_blk_r,
+		CASE
+			WHEN (base.buff_blk_r + base.blk_r) = 0 THEN -1::float8
+			ELSE base.buff_blk_r::float8 / (base.buff_blk_r + base.blk_r) * 100
+		END AS buff_blk_r_pct,
+		base.blk_w::float8 / NULLIF(base.calls, 0) AS ablk_w
+	FROM base
+),
+ranked AS (
+	SELECT
+		data.*,
+		row_number() OVER (PARTITION BY data.sql_type ORDER BY data.{{top_stat_field}} {{sort}}) AS sql_type_rank
+	FROM data
+)
+SELECT
+	ranked.sql_type AS sql_type,
+	ranked.user AS user,
+    {% if dbname =="_all" %} ranked.database AS database,{% endif %}
+	ranked.queryid AS queryid,
+	ranked.calls AS calls,
+	ranked.rows AS rows,
+	ranked.arows AS arows,
+	ranked.time AS time,
+	ranked.atime AS atime,
+	ranked.iotime AS iotime,
+	ranked.aiotime AS aiotime,
+	ranked.blk_r AS blk_r,
+	ranked.ablk_r AS ablk_r,
+	ranked.buff_blk_r AS buff_blk_r,
+	ranked.abuff_blk_r AS abuff_blk_r,
+	ranked.buff_blk_r_pct AS buff_blk_r_pct,
+	ranked.blk_w AS blk_w,
+	ranked.ablk_w AS ablk_w,
+	ranked.sql_type_rank AS sql_type_rank
+FROM ranked
+WHERE ranked.sql_type_rank <= {{ bind("count") }}
+ORDER BY ranked.sql_type, ranked.sql_type_rank;
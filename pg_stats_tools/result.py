@@ -0,0 +1,112 @@
+"""Compact query results for reports that only fetch and print"""
+
+import csv
+import sys
+from array import array
+from decimal import Decimal
+from typing import TYPE_CHECKING, Any, Iterator, List, Sequence, Tuple, Union
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Rows read from the cursor at a time. Rows are copied into columns batch by batch
+FETCH_BATCH_ROWS = 10_000
+
+
+def _compact(values: List[Any]) -> Sequence[Any]:
+    """
+    Typed array for columns of ints or floats (numeric values become floats) without NULLs.
+    Other columns stay lists, their strings are interned so repeated values (users, databases, kinds) are stored once
+    """
+    kinds = {type(value) for value in values}
+    if kinds and kinds <= {int}:
+        try:
+            return array("q", values)
+        except OverflowError:
+            return values
+    if kinds and kinds <= {int, float, Decimal}:
+        return array("d", [float(value) for value in values])
+    return [sys.intern(value) if type(value) is str else value for value in values]
+
+
+def _type_codes(cursor: Any) -> Union[List[Union[int, None]], None]:
+    """Type OIDs of the columns of the cursor description, None when it does not have them"""
+    if not cursor.description:
+        return None
+    return [column[1] if len(column) > 1 else None for column in cursor.description]
+
+
+class ResultSet:
+    """
+    Column names and one compact column per name, with the PostgreSQL type OIDs of the columns when read from a cursor.
+    It can be printed with tabulate (headers="keys") as it is, to_pandas converts it when an analysis step needs it
+    """
+
+    def __init__(self, columns: List[str], data: List[Sequence[Any]], type_codes: Union[List[Union[int, None]], None] = None) -> None:
+        self.columns = columns
+        self.data = data
+        self.type_codes = type_codes
+
+    @classmethod
+    def from_cursor(cls, cursor: Any) -> "ResultSet":
+        rows = cursor.fetchmany(FETCH_BATCH_ROWS)
+        # Server side cursors only describe their columns after the first fetch
+        columns = [column[0] for column in cursor.description or []]
+        type_codes = _type_codes(cursor)
+        values: List[List[Any]] = [[] for _ in columns]
+        while rows:
+            for column, column_values in zip(values, zip(*rows)):
+                column.extend(column_values)
+            rows = cursor.fetchmany(FETCH_BATCH_ROWS)
+        return cls(columns, [_compact(column) for column in values], type_codes)
+
+    @classmethod
+    def batches_from_cursor(cls, cursor: Any, batch_rows: int = FETCH_BATCH_ROWS) -> Iterator["ResultSet"]:
+        """One ResultSet per batch of rows read from the cursor. A result without rows is one empty ResultSet, so its columns are known"""
+        rows = cursor.fetchmany(batch_rows)
+        columns = [column[0] for column in cursor.description or []]
+        type_codes = _type_codes(cursor)
+        if not rows:
+            yield cls(columns, [[] for _ in columns], type_codes)
+        while rows:
+            yield cls(columns, [_compact(list(column)) for column in zip(*rows)], type_codes)
+            rows = cursor.fetchmany(batch_rows)
+
+    def __len__(self) -> int:
+        return len(self.data[0]) if self.data else 0
+
+    def __getitem__(self, column: str) -> Sequence[Any]:
+        return self.data[self.columns.index(column)]
+
+    # keys and values make it a dict of columns for tabulate
+    def keys(self) -> List[str]:
+        return self.columns
+
+    def values(self) -> List[Sequence[Any]]:
+        return self.data
+
+    @property
+    def empty(self) -> bool:
+        return len(self) == 0
+
+    def rows(self) -> Iterator[Tuple[Any, ...]]:
+        return zip(*self.data)
+
+    def to_pandas(self) -> "pd.DataFrame":
+        import pandas as pd
+
+        return pd.DataFrame({column: pd.Series(values, dtype=object if isinstance(values, list) else None) for column, values in zip(self.columns, self.data)})
+
+    def to_csv(self, path: str, index: bool = False) -> None:
+        """Same output as DataFrame.to_csv(path, index=False). Rows have no index, index is accepted for compatibility"""
+        with open(path, "w", newline="") as csv_file:
+            writer = csv.writer(csv_file, lineterminator="\n")
+            writer.writerow(self.columns)
+            writer.writerows(self.rows())
+
+
+ReportData = Union["pd.DataFrame", ResultSet]
+
+
+def as_frame(data: ReportData) -> "pd.DataFrame":
+    return data.to_pandas() if isinstance(data, ResultSet) else data
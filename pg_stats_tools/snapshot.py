@@ -0,0 +1,112 @@
+"""Snapshot archive module
+
+A snapshot is one uncompressed tar file per capture holding one Arrow IPC file per captured table plus a
+metadata.json member. Tar members are stored contiguously, so tables are read from a memory map of the
+whole file without copying them into memory first.
+"""
+from __future__ import annotations
+
+import io
+import json
+import tarfile
+import time
+from datetime import datetime
+from decimal import Decimal
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple, Union
+
+import pandas as pd
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+SNAPSHOT_METADATA = "metadata.json"
+SNAPSHOT_TABLE_SUFFIX = ".arrow"
+
+
+def import_pyarrow(purpose: str = "read or write snapshots") -> Any:
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc  # noqa: F401
+    except ImportError as e:
+        raise ImportError(f"pyarrow is required to {purpose}. Install it with: pip install 'pg-stats-tools[arrow]'") from e
+    return pa
+
+
+def to_arrow(data: pd.DataFrame) -> "pa.Table":
+    pa = import_pyarrow()
+    data = data.copy()
+    for column in data.columns:
+        if data[column].dtype != object:
+            continue
+        sample = data[column].dropna()
+        if len(sample) and isinstance(sample.iloc[0], Decimal):
+            data[column] = data[column].astype(float)
+            continue
+        try:
+            pa.array(data[column], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            # Values arrow can not infer a type for (e.g. mixed or driver specific types) are archived as text
+            data[column] = data[column].map(lambda value: None if value is None else str(value))  # pyright: ignore
+    return pa.Table.from_pandas(data, preserve_index=False)
+
+
+def write_snapshot(path: str, tables: Dict[str, pd.DataFrame], metadata: Dict[str, Any], compression: Union[str, None] = "zstd") -> None:
+    """Write tables and metadata as one snapshot file"""
+    pa = import_pyarrow()
+    metadata = {**metadata, "tables": list(tables)}
+    with tarfile.open(path, "w") as tar:
+        for name, data in tables.items():
+            sink = pa.BufferOutputStream()
+            table = to_arrow(data)
+            with pa.ipc.new_file(sink, table.schema, options=pa.ipc.IpcWriteOptions(compression=compression)) as writer:
+                writer.write_table(table)
+            payload = sink.getvalue().to_pybytes()
+            info = tarfile.TarInfo(name=f"{name}{SNAPSHOT_TABLE_SUFFIX}")
+            info.size = len(payload)
+            info.mtime = int(time.time())
+            tar.addfile(info, io.BytesIO(payload))
+        payload = json.dumps(metadata, indent=2, default=str).encode()
+        info = tarfile.TarInfo(name=SNAPSHOT_METADATA)
+        info.size = len(payload)
+        info.mtime = int(time.time())
+        tar.addfile(info, io.BytesIO(payload))
+
+
+class Snapshot:
+    """Read only, memory mapped view of a snapshot file"""
+
+    def __init__(self, path: str) -> None:
+        pa = import_pyarrow()
+        self.path = path
+        self._offsets: Dict[str, Tuple[int, int]] = {}
+        with tarfile.open(path, "r:") as tar:
+            for member in tar.getmembers():
+                self._offsets[member.name] = (member.offset_data, member.size)
+            metadata_file = tar.extractfile(SNAPSHOT_METADATA)
+            self.metadata: Dict[str, Any] = json.load(metadata_file) if metadata_file else {}
+        self._buffer = pa.memory_map(path, "r").read_buffer()
+        self._cache: Dict[str, pd.DataFrame] = {}
+
+    @property
+    def captured_at(self) -> Union[datetime, None]:
+        captured_at = self.metadata.get("captured_at")
+        return datetime.fromisoformat(captured_at) if captured_at else None
+
+    def tables(self) -> List[str]:
+        return [name[: -len(SNAPSHOT_TABLE_SUFFIX)] for name in self._offsets if name.endswith(SNAPSHOT_TABLE_SUFFIX)]
+
+    def has_table(self, name: str) -> bool:
+        return f"{name}{SNAPSHOT_TABLE_SUFFIX}" in self._offsets
+
+    def arrow_table(self, name: str) -> "pa.Table":
+        pa = import_pyarrow()
+        if not self.has_table(name):
+            raise KeyError(f"Table {name} is not in snapshot {self.path}. Captured tables: {', '.join(self.tables())}")
+        offset, size = self._offsets[f"{name}{SNAPSHOT_TABLE_SUFFIX}"]
+        return pa.ipc.open_file(self._buffer.slice(offset, size)).read_all()
+
+    def table(self, name: str) -> pd.DataFrame:
+        """Captured table as a DataFrame. Tables are converted once and reused by every report"""
+        if name not in self._cache:
+            self._cache[name] = self.arrow_table(name).to_pandas()
+        return self._cache[name]
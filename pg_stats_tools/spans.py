@@ -0,0 +1,147 @@
+"""Phase timing spans
+
+Code paths worth attributing latency to (tunnel, login, template render, query, fetch, DataFrame conversion, table
+render) open a span around their work. Spans are only recorded once profiling is enabled (pg --profile), otherwise
+span() returns a shared context manager that does nothing. Spans nest per thread: the self time of a span is its time
+minus the time of the spans opened inside it.
+"""
+
+import json
+import os
+import threading
+import time
+from types import TracebackType
+from typing import Any, Dict, List, NamedTuple, Tuple, Type, Union
+
+_enabled = False
+_spans: List["Span"] = []
+_local = threading.local()
+# Trace timestamps are relative to the moment profiling was enabled
+_origin = 0.0
+
+
+class Span(NamedTuple):
+    name: str
+    # Seconds since profiling was enabled
+    start: float
+    duration: float
+    # Duration minus the duration of the spans nested in it
+    self_duration: float
+    thread: int
+    args: Dict[str, Any]
+
+
+class _OpenSpan:
+    __slots__ = ("name", "args", "start", "children")
+
+    def __init__(self, name: str, args: Dict[str, Any]) -> None:
+        self.name = name
+        self.args = args
+        self.start = 0.0
+        self.children = 0.0
+
+    def __enter__(self) -> "_OpenSpan":
+        _stack().append(self)
+        self.start = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type: Union[Type[BaseException], None], exc: Union[BaseException, None], traceback: Union[TracebackType, None]) -> None:
+        duration = time.monotonic() - self.start
+        stack = _stack()
+        stack.pop()
+        if stack:
+            stack[-1].children += duration
+        _spans.append(Span(self.name, self.start - _origin, duration, duration - self.children, threading.get_ident(), self.args))
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, exc_type: Union[Type[BaseException], None], exc: Union[BaseException, None], traceback: Union[TracebackType, None]) -> None:
+        return None
+
+
+_NO_SPAN = _NoSpan()
+
+
+def _stack() -> List[_OpenSpan]:
+    stack: Union[List[_OpenSpan], None] = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def enable() -> None:
+    """Start recording spans, from an empty profile"""
+    global _enabled, _origin
+    _spans.clear()
+    _origin = time.monotonic()
+    _enabled = True
+
+
+def disable() -> None:
+    global _enabled
+    _enabled = False
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def span(name: str, **args: Any) -> Union[_OpenSpan, _NoSpan]:
+    """Context manager timing its block as a span named name. args are kept in the trace file"""
+    return _OpenSpan(name, args) if _enabled else _NO_SPAN
+
+
+def record(name: str, start: float, **args: Any) -> None:
+    """Span from start (a time.monotonic value) to now, for phases whose start and end are not in one block"""
+    if not _enabled:
+        return
+    duration = time.monotonic() - start
+    stack = _stack()
+    if stack:
+        stack[-1].children += duration
+    _spans.append(Span(name, start - _origin, duration, duration, threading.get_ident(), args))
+
+
+def get_spans() -> List[Span]:
+    return list(_spans)
+
+
+def breakdown() -> List[Tuple[str, int, float, float, float]]:
+    """Rows (phase, count, total, self and max seconds) of the recorded spans, phases in the order they first ended"""
+    phases: Dict[str, List[Span]] = {}
+    for recorded in get_spans():
+        phases.setdefault(recorded.name, []).append(recorded)
+    return [
+        (
+            name,
+            len(recorded),
+            round(sum(s.duration for s in recorded), 4),
+            round(sum(s.self_duration for s in recorded), 4),
+            round(max(s.duration for s in recorded), 4),
+        )
+        for name, recorded in phases.items()
+    ]
+
+
+def print_breakdown() -> None:
+    """Print the phase breakdown to stderr, so it does not mix with report rows written to stdout"""
+    from rich.console import Console
+    from tabulate import tabulate
+
+    Console(stderr=True).print(tabulate(breakdown(), headers=["phase", "count", "total_s", "self_s", "max_s"], tablefmt="github"), highlight=False)
+
+
+def write_trace(path: str) -> None:
+    """Write the recorded spans as a Chrome trace (chrome://tracing, Perfetto): one complete event per span, times in µs"""
+    pid = os.getpid()
+    events = [
+        {"name": s.name, "ph": "X", "ts": round(s.start * 1e6, 1), "dur": round(s.duration * 1e6, 1), "pid": pid, "tid": s.thread, "args": s.args}
+        for s in get_spans()
+    ]
+    with open(path, "w") as trace_file:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, trace_file, default=str)
@@ -0,0 +1,67 @@
+"""Client side rate limiting of AWS API calls"""
+
+import random
+import threading
+import time
+from typing import Callable, TypeVar
+
+from botocore.exceptions import ClientError
+
+T = TypeVar("T")
+
+THROTTLING_ERROR_CODES = {"ThrottlingException", "Throttling", "TooManyRequestsException", "RequestLimitExceeded"}
+
+
+def is_throttling(error: Exception) -> bool:
+    return isinstance(error, ClientError) and error.response.get("Error", {}).get("Code") in THROTTLING_ERROR_CODES
+
+
+class AdaptiveRateLimiter:
+    """
+    Requests per second shared by the threads calling an API. The rate grows by increase after each successful call
+    up to max_rate and is multiplied by decrease when the API throttles (additive increase, multiplicative decrease)
+    """
+
+    def __init__(self, rate: float = 20.0, max_rate: float = 100.0, min_rate: float = 0.5, increase: float = 1.0, decrease: float = 0.5) -> None:
+        self.rate = rate
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.throttles = 0
+        self._lock = threading.Lock()
+        self._next_slot = time.monotonic()
+
+    def acquire(self) -> None:
+        """Wait for the next request slot"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + 1 / self.rate
+        time.sleep(slot - now)
+
+    def success(self) -> None:
+        with self._lock:
+            self.rate = min(self.rate + self.increase, self.max_rate)
+
+    def throttled(self) -> None:
+        with self._lock:
+            self.throttles += 1
+            self.rate = max(self.rate * self.decrease, self.min_rate)
+
+
+def call_with_backoff(call: Callable[[], T], limiter: AdaptiveRateLimiter, max_attempts: int = 8, base_delay: float = 0.2, max_delay: float = 20.0) -> T:
+    """Result of call, made at the limiter rate. Throttled calls are retried after a random delay below an exponential cap (full jitter)"""
+    for attempt in range(max_attempts):
+        limiter.acquire()
+        try:
+            result = call()
+        except ClientError as error:
+            if not is_throttling(error) or attempt == max_attempts - 1:
+                raise
+            limiter.throttled()
+            time.sleep(random.uniform(0, min(max_delay, base_delay * 2**attempt)))
+        else:
+            limiter.success()
+            return result
+    raise ValueError("max_attempts must be greater than zero")
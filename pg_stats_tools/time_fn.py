@@ -10,3 +10,19 @@ def parse_timestamp(tstmp: str) -> datetime:
         return datetime.fromisoformat(tstmp)
     except ValueError:
         raise typer.BadParameter("Invalid timestamp format. Please use ISO format (e.g., 'YYYY-MM-DDTHH:MM:SS')")
+
+
+INTERVAL_UNITS = {"s": 1, "m": 60, "h": 3600}
+
+
+def parse_interval(interval: str) -> float:
+    """Seconds of an interval given as a number with an optional unit: 30, 30s, 5m, 1h"""
+    unit = interval[-1:].lower()
+    value = interval[:-1] if unit in INTERVAL_UNITS else interval
+    try:
+        seconds = float(value) * INTERVAL_UNITS.get(unit, 1)
+    except ValueError as e:
+        raise typer.BadParameter("Invalid interval format. Please use seconds with an optional unit (e.g., '60s', '5m', '1h')") from e
+    if seconds <= 0:
+        raise typer.BadParameter("Interval must be greater than zero")
+    return seconds
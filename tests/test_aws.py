@@ -0,0 +1,59 @@
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pytest
+
+from pg_stats_tools import aws
+from pg_stats_tools.aws import AWSClient
+from pg_stats_tools.aws_metadata import InstanceMetadata, InstanceMetadataCache
+from pg_stats_tools.pi_cache import PIMetricsCache
+
+DB_INSTANCE = {
+    "DbiResourceId": "db-ABCDEFGHIJ",
+    "Engine": "postgres",
+    "EngineVersion": "15.4",
+    "PerformanceInsightsEnabled": True,
+    "PerformanceInsightsRetentionPeriod": 7,
+}
+
+
+class _RDSClient:
+    def __init__(self) -> None:
+        self.calls: List[Dict[str, Any]] = []
+
+    def describe_db_instances(self, **kvargs: Any) -> Dict[str, Any]:
+        self.calls.append(kvargs)
+        return {"DBInstances": [DB_INSTANCE]}
+
+
+def test_instance_metadata_cache_ttl(tmp_path: Path) -> None:
+    metadata = InstanceMetadata.from_db_instance(DB_INSTANCE)
+    cache = InstanceMetadataCache(str(tmp_path / "metadata.sqlite"))
+    assert cache.get("play", "eu-west-1", "db1") is None
+    cache.put("play", "eu-west-1", "db1", metadata)
+    assert cache.get("play", "eu-west-1", "db1") == metadata
+    assert cache.get("prod", "eu-west-1", "db1") is None
+    assert InstanceMetadataCache(cache.path, ttl=-1).get("play", "eu-west-1", "db1") is None
+
+
+def test_resource_id_is_described_once(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    rds_client = _RDSClient()
+    monkeypatch.setattr(aws, "aws_client", lambda profile, region, service_name, max_pool_connections: rds_client)
+    cache = InstanceMetadataCache(str(tmp_path / "metadata.sqlite"))
+    pi_cache = PIMetricsCache(str(tmp_path / "pi.sqlite"))
+    for _ in range(3):
+        # A new AWSClient per run, as each cli invocation does
+        assert AWSClient("play", "eu-west-1", metadata_cache=cache, pi_cache=pi_cache).rds_get_database_instance_resource_id("db1") == "db-ABCDEFGHIJ"
+    assert rds_client.calls == [{"DBInstanceIdentifier": "db1"}]
+
+
+def test_clients_are_reused(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    config = tmp_path / "config"
+    config.write_text("[profile play]\nregion = eu-west-1\n")
+    monkeypatch.setenv("AWS_CONFIG_FILE", str(config))
+    cache = InstanceMetadataCache(str(tmp_path / "metadata.sqlite"))
+    pi_cache = PIMetricsCache(str(tmp_path / "pi.sqlite"))
+    client = AWSClient("play", "eu-west-1", max_pool_connections=4, metadata_cache=cache, pi_cache=pi_cache)
+    assert client._pi_client is AWSClient("play", "eu-west-1", max_pool_connections=4, metadata_cache=cache, pi_cache=pi_cache)._pi_client
+    assert client._pi_client.meta.config.max_pool_connections == 4
+    assert client._rds_client is not client._pi_client
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pg_stats_tools.pg.stats.sql.classify import keyword_sql_types, leading_keyword, statement_keywords
+
+
+@pytest.mark.parametrize(
+    "query, keyword",
+    [
+        ("select 1", "SELECT"),
+        ("  \n-- comment SELECT\n/* multi\nline DELETE */ (SELECT 1) UNION (SELECT 2)", "SELECT"),
+        ("UPDATE t SET a = (SELECT max(a) FROM u)", "UPDATE"),
+        ("INSERT INTO t (a) SELECT a FROM u", "INSERT"),
+        ("WITH x AS (SELECT 1), y AS (SELECT ')' FROM z) DELETE FROM t USING x", "DELETE"),
+        ("with recursive x(n) as (values (1) union all select n + 1 from x) select * from x", "SELECT"),
+        ("WITH x AS (SELECT 1", "WITH"),
+        ("start transaction", "BEGIN"),
+        ("END", "COMMIT"),
+        ("VALUES (1)", "SELECT"),
+        ("EXPLAIN SELECT 1", "EXPLAIN"),
+        ("/* only a comment */", ""),
+    ],
+)
+def test_leading_keyword(query: str, keyword: str) -> None:
+    assert leading_keyword(query) == keyword
+
+
+def test_statement_keywords() -> None:
+    """Each (dbid, queryid) is classified once, the same queryid in other database keeps its own text"""
+    statements = pd.DataFrame({"dbid": [1, 1, 2, 1], "queryid": [10, 10, 10, 11], "query": ["SELECT 1", "SELECT 1", "DELETE FROM t", None]})
+    keywords = statement_keywords(statements)
+    assert list(keywords) == ["SELECT", "SELECT", "DELETE", ""]
+    assert list(keyword_sql_types(np.array(["SELECT", "BEGIN", "EXPLAIN"], dtype=object))) == ["SELECT", "TRANSACTION", "OTHER"]
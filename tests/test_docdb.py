@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pytest
+
+from pg_stats_tools import aws
+from pg_stats_tools.aws import AWSClient
+from pg_stats_tools.aws_metadata import InstanceMetadataCache
+from pg_stats_tools.docdb.reports import DocDBCounterMetrics, DocDBLoadByWaitState
+from pg_stats_tools.pi_cache import PIMetricsCache
+from pg_stats_tools.throttle import AdaptiveRateLimiter
+
+# Within the PI retention window, so the cache does not clip the range away
+END = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) - timedelta(days=1)
+
+
+class _Clients:
+    """RDS and PI stand ins: a DocumentDB and a Postgres instance, PI answers three points per series"""
+
+    def __init__(self) -> None:
+        self.describe_calls: List[str] = []
+        self.pi_calls: List[Dict[str, Any]] = []
+
+    def describe_db_instances(self, DBInstanceIdentifier: str) -> Dict[str, Any]:
+        self.describe_calls.append(DBInstanceIdentifier)
+        engine = "docdb" if DBInstanceIdentifier.startswith("docdb") else "postgres"
+        return {"DBInstances": [{"DbiResourceId": f"db-{DBInstanceIdentifier}", "Engine": engine, "PerformanceInsightsEnabled": True}]}
+
+    def get_resource_metrics(self, **kvargs: Any) -> Dict[str, Any]:
+        self.pi_calls.append(kvargs)
+        timestamps = [END - timedelta(minutes=3 - i) for i in range(3)]
+
+        def points(values: List[float]) -> List[Dict[str, Any]]:
+            return [{"Timestamp": timestamp, "Value": value} for timestamp, value in zip(timestamps, values)]
+
+        metric_list: List[Dict[str, Any]] = []
+        for query in kvargs["MetricQueries"]:
+            if query.get("GroupBy"):
+                metric_list.append({"Key": {"Metric": query["Metric"]}, "DataPoints": points([3.0, 3.0, 3.0])})
+                metric_list.append({"Key": {"Metric": query["Metric"], "Dimensions": {"db.wait_state.name": "CPU"}}, "DataPoints": points([2.0, 2.0, 2.0])})
+                metric_list.append({"Key": {"Metric": query["Metric"], "Dimensions": {"db.wait_state.name": "IO"}}, "DataPoints": points([1.0, 1.0, 1.0])})
+            else:
+                metric_list.append({"Key": {"Metric": query["Metric"]}, "DataPoints": points([10.0, 20.0, 30.0])})
+        return {"MetricList": metric_list}
+
+
+@pytest.fixture
+def client(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> AWSClient:
+    clients = _Clients()
+    monkeypatch.setattr(aws, "aws_client", lambda profile, region, service_name, max_pool_connections: clients)
+    return AWSClient(
+        "play",
+        "eu-west-1",
+        metadata_cache=InstanceMetadataCache(str(tmp_path / "metadata.sqlite")),
+        pi_cache=PIMetricsCache(str(tmp_path / "pi.sqlite")),
+        rate_limiter=AdaptiveRateLimiter(rate=1000, max_rate=1000),
+    )
+
+
+def test_docdb_load_by_wait_state(client: AWSClient) -> None:
+    report = DocDBLoadByWaitState(client, "docdb-1", time=END, time_delta="-1h", period_in_seconds=60)
+    data = report.fetch()["docdb_load_by_wait_state"]
+    assert data[["name", "avg", "pct_load"]].fillna("").values.tolist() == [["", 3.0, 100.0], ["CPU", 2.0, 66.67], ["IO", 1.0, 33.33]]
+    pi_calls: List[Dict[str, Any]] = client._pi_client.pi_calls  # type: ignore
+    assert pi_calls[0]["ServiceType"] == "DOCDB" and pi_calls[0]["Identifier"] == "db-docdb-1"
+
+
+def test_docdb_period_plan_is_shown(client: AWSClient, capsys: pytest.CaptureFixture[str]) -> None:
+    """Without a period, the planned one and its number of calls are printed before the fetch"""
+    DocDBLoadByWaitState(client, "docdb-1", time=END, time_delta="-1h").fetch()
+    assert "60s, 1 GetResourceMetrics calls at most" in capsys.readouterr().err
+    assert client._pi_client.pi_calls[0]["PeriodInSeconds"] == 60  # type: ignore
+
+
+def test_docdb_reports_share_cached_metadata(client: AWSClient) -> None:
+    DocDBLoadByWaitState(client, "docdb-1", time=END, period_in_seconds=60).fetch()
+    counters = DocDBCounterMetrics(client, "docdb-1", time=END, period_in_seconds=60, metrics=["os.cpuUtilization.total.avg"]).fetch()
+    assert counters["docdb_counter_metrics"][["metric", "avg", "max", "last"]].values.tolist() == [["os.cpuUtilization.total.avg", 20.0, 30.0, 30.0]]
+    assert client._rds_client.describe_calls == ["docdb-1"]  # type: ignore
+
+
+def test_docdb_service_type_must_match_engine(client: AWSClient) -> None:
+    with pytest.raises(ValueError, match="runs postgres"):
+        DocDBLoadByWaitState(client, "postgres-1", time=END, period_in_seconds=60).fetch()
@@ -0,0 +1,75 @@
+import io
+import time
+
+import numpy as np
+import pytest
+from rich.console import Console
+
+from pg_stats_tools.chart import envelope_rows, series_chart, sparkline
+from pg_stats_tools.downsample import lttb, min_max_envelope
+from pg_stats_tools.pi import MetricKey, MetricSeries
+
+
+def _series(values: np.ndarray) -> MetricSeries:
+    series = MetricSeries(MetricKey("db.load.avg"), len(values))
+    series.extend_arrays(np.arange(len(values)).astype("datetime64[s]"), values)
+    return series
+
+
+def test_lttb_keeps_ends_and_spikes() -> None:
+    x = np.arange(10_000, dtype=np.float64)
+    y = np.zeros(10_000)
+    y[1234], y[8765] = 50.0, -20.0
+    selected = lttb(x, y, 100)
+    assert len(selected) == 100 and selected[0] == 0 and selected[-1] == 9999
+    assert np.all(np.diff(selected) > 0)
+    assert 1234 in selected and 8765 in selected
+    assert list(lttb(x[:50], y[:50], 100)) == list(range(50))
+
+
+def test_lttb_skips_missing_values() -> None:
+    x = np.arange(1000, dtype=np.float64)
+    y = np.sin(x / 50)
+    y[::7] = np.nan
+    selected = lttb(x, y, 60)
+    assert len(selected) == 60 and np.isfinite(y[selected]).all()
+
+
+def test_min_max_envelope() -> None:
+    y = np.array([1.0, 5.0, np.nan, 2.0, np.nan, np.nan, 7.0, 3.0])
+    mins, maxs = min_max_envelope(y, 4)
+    np.testing.assert_array_equal(mins, [1.0, 2.0, np.nan, 3.0])
+    np.testing.assert_array_equal(maxs, [5.0, 2.0, np.nan, 7.0])
+    assert len(min_max_envelope(y, 100)[0]) == len(y)
+
+
+def test_sparkline_and_envelope_rows() -> None:
+    assert sparkline(np.array([0.0, 1.0, np.nan, 7.0])) == "▁▂ █"
+    assert envelope_rows(np.array([0.0, 0.0, np.nan]), np.array([0.0, 3.0, np.nan]), 4) == [" █ ", " █ ", " █ ", "██ "]
+
+
+def test_series_chart_renders() -> None:
+    console = Console(width=60, record=True, file=io.StringIO())
+    console.print(series_chart(_series(np.sin(np.arange(5000) / 100)), width=50, height=4))
+    output = console.export_text()
+    assert "db.load.avg" in output and "max 1" in output
+
+
+@pytest.mark.slow
+def test_benchmark_downsampling() -> None:
+    """A million points down to a terminal width"""
+    values = np.cumsum(np.random.default_rng(1).normal(size=1_000_000))
+    series = _series(values)
+    start = time.perf_counter()
+    x = series.timestamps.astype(np.int64).astype(np.float64)
+    selected = lttb(x, series.values, 200)
+    lttb_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    mins, maxs = min_max_envelope(series.values, 200)
+    envelope_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    Console(width=210, file=io.StringIO()).print(series_chart(series, width=200))
+    chart_seconds = time.perf_counter() - start
+    print(f"lttb: {lttb_seconds * 1000:.1f} ms, min/max: {envelope_seconds * 1000:.1f} ms, chart: {chart_seconds * 1000:.1f} ms for {len(values)} points")
+    assert len(selected) == 200 and maxs.max() == values.max() and mins.min() == values.min()
+    assert chart_seconds < 1
@@ -0,0 +1,69 @@
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+import pytest
+
+from pg_stats_tools.pg.stats.bundle.reports import REPORTS
+from pg_stats_tools.pg.stats.fleet.reports import Fleet, FleetInstance, merge_fleet_results, read_inventory
+from pg_stats_tools.pg.stats.reports import Report
+from pg_stats_tools.result import ReportData, ResultSet
+
+
+class _HostReport(Report):
+    """Report answering with its host, after the delay of the host"""
+
+    delays = {"slow": 1.5}
+
+    def __init__(self, pg_conn_params: Dict[str, Any], **kvargs: Any) -> None:
+        self._pg_conn_params = pg_conn_params
+
+    @classmethod
+    def get_help(cls) -> str:
+        return "Host"
+
+    def get_name(self) -> str:
+        return "host"
+
+    def fetch(self) -> Dict[str, ReportData]:
+        host = self._pg_conn_params["db_host"]
+        if host == "down":
+            raise ConnectionError("could not connect to server\nConnection refused")
+        time.sleep(self.delays.get(host, 0))
+        return {self.get_name(): ResultSet(["host", "connect_timeout"], [[host], [self._pg_conn_params.get("db_connect_timeout")]])}
+
+    def show(self, results: Dict[str, ReportData]) -> None:
+        pass
+
+
+def test_read_inventory(tmp_path: Path) -> None:
+    inventory = tmp_path / "inventory.yml"
+    inventory.write_text("defaults: {db_user: monitoring, db_name: postgres}\ninstances:\n  - {name: orders, db_host: orders.local}\n  - {db_host: billing.local, db_name: billing}\n")
+    assert read_inventory(str(inventory)) == [
+        FleetInstance("orders", {"db_user": "monitoring", "db_name": "postgres", "db_host": "orders.local"}),
+        FleetInstance("billing.local", {"db_user": "monitoring", "db_name": "billing", "db_host": "billing.local"}),
+    ]
+    inventory.write_text("instances:\n  - {db_name: postgres}\n")
+    with pytest.raises(ValueError):
+        read_inventory(str(inventory))
+
+
+def test_merge_fleet_results() -> None:
+    merged = merge_fleet_results([("a", {"s": ResultSet(["x"], [[1, 2]])}), ("b", {"s": ResultSet(["x"], [[3]])})])
+    assert list(merged["s"].columns) == ["instance", "x"]
+    assert merged["s"].values.tolist() == [["a", 1], ["a", 2], ["b", 3]]
+
+
+def test_fleet_reports_failed_instances_without_waiting_for_them(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setitem(REPORTS, "_HostReport", _HostReport)
+    instances = [FleetInstance(host, {"db_host": host}) for host in ["a", "slow", "down", "b"]]
+    fleet = Fleet("_HostReport", {}, instances, workers=4, timeout=0.5)
+    start = time.monotonic()
+    results, failures = fleet.fetch_all({"db_host": "", "db_user": "monitoring"})
+    assert time.monotonic() - start < 2
+    assert [name for name, _ in results] == ["a", "b"]
+    assert list(failures) == ["slow", "down"]
+    assert failures["down"] == "ConnectionError: Connection refused"
+    assert "timed out" in failures["slow"]
+    merged = merge_fleet_results(results)["host"]
+    assert merged["host"].tolist() == ["a", "b"] and merged["connect_timeout"].tolist() == [1, 1]
@@ -0,0 +1,41 @@
+import pandas as pd
+
+from pg_stats_tools.format import ColumnFormat, format_columns, format_decimal, format_duration, format_large_number
+
+
+def test_format_large_number() -> None:
+    """Units are applied by powers of 1000 and integral values keep no decimals"""
+    values = pd.Series([0, 999, 1000, 1234, 1234567, None])
+    assert list(format_large_number(values)) == ["0", "999", "1k", "1.23k", "1.23M", None]
+
+
+def test_format_large_number_rounds_into_the_next_unit() -> None:
+    """Values reaching 1000 once rounded are shown in the next unit"""
+    values = pd.Series([999.994, 999.996, 999_999.5])
+    assert list(format_large_number(values)) == ["999.99", "1k", "1M"]
+
+
+def test_format_decimal() -> None:
+    """Integral values of any size keep no decimals"""
+    values = pd.Series([1e20, -0.001, 2.5, 3, None])
+    assert list(format_decimal(values)) == ["100000000000000000000", "0", "2.50", "3", None]
+
+
+def test_format_duration() -> None:
+    """Milliseconds are shown in the largest unit reached"""
+    values = pd.Series([500, 1500, 90_000, 7_200_000, 172_800_000])
+    assert list(format_duration(values)) == ["500.00 ms", "1.50 s", "1.50 m", "2.00 h", "2.00 d"]
+
+
+def test_format_duration_rounds_into_the_next_unit() -> None:
+    """Values reaching the next unit once rounded are shown in it"""
+    values = pd.Series([999.994, 999.996, 59_999.999, -59_999.999])
+    assert list(format_duration(values)) == ["999.99 ms", "1.00 s", "1.00 m", "-1.00 m"]
+
+
+def test_format_columns_ignores_missing_columns() -> None:
+    """Only the columns present in the data are formatted"""
+    data = pd.DataFrame({"rows": [2500], "queryid": [2500]})
+    formatted = format_columns(data, {"rows": ColumnFormat.number, "time": ColumnFormat.duration})
+    assert formatted["rows"].tolist() == ["2.50k"]
+    assert formatted["queryid"].tolist() == [2500]
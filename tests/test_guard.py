@@ -0,0 +1,119 @@
+import time
+from typing import Any, List, Tuple
+
+import pandas as pd
+import pytest
+
+from pg_stats_tools.guard import STATEMENT_TAG, CostAction, QueryCostError, session_options, tag_statement
+from pg_stats_tools.pg.stats.sql.reports import footprint_entries, statement_excerpt
+from pg_stats_tools.psql import PgSession, _statement, time_budget
+
+
+class _Cursor:
+    def __init__(self, executed: List[Tuple[str, Any]], cost: float) -> None:
+        self._executed = executed
+        self._cost = cost
+
+    def __enter__(self) -> "_Cursor":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        pass
+
+    def execute(self, sql: str, params: Any = None) -> None:
+        self._executed.append((sql, params))
+
+    def fetchone(self) -> Tuple[Any, ...]:
+        return ([{"Plan": {"Node Type": "Seq Scan", "Total Cost": self._cost}}],)
+
+
+class _Connection:
+    """Connection stand in answering every EXPLAIN with a plan of the given cost"""
+
+    def __init__(self, cost: float) -> None:
+        self.executed: List[Tuple[str, Any]] = []
+        self._cost = cost
+
+    def cursor(self) -> _Cursor:
+        return _Cursor(self.executed, self._cost)
+
+
+def _session(**kvargs: Any) -> PgSession:
+    return PgSession(db_user="u", db_name="d", db_pass="", db_host="localhost", **kvargs)
+
+
+def test_session_options() -> None:
+    assert session_options(60000, 1000, "4MB") == "-c statement_timeout=60000 -c lock_timeout=1000 -c work_mem=4MB"
+    assert session_options(0, None, "") == ""
+    with pytest.raises(ValueError, match="work_mem"):
+        session_options(None, None, "4MB -c fsync=off")
+
+
+def test_statements_are_tagged_once() -> None:
+    tagged = tag_statement("SELECT 1")
+    assert tagged.startswith(STATEMENT_TAG) and tag_statement(tagged) == tagged
+
+
+def test_statements_within_max_cost_run_as_they_are() -> None:
+    conn = _Connection(cost=50.0)
+    _session(max_cost=100.0).check_cost(conn, "SELECT 1", None)  # type: ignore[arg-type]
+    assert [sql for sql, _ in conn.executed] == ["EXPLAIN (FORMAT JSON) SELECT 1"]
+
+
+def test_statements_above_max_cost_are_refused() -> None:
+    conn = _Connection(cost=5000.0)
+    with pytest.raises(QueryCostError, match="cost 5000"):
+        _session(max_cost=100.0).check_cost(conn, "SELECT 1", None)  # type: ignore[arg-type]
+
+
+def test_statements_above_max_cost_are_downgraded() -> None:
+    conn = _Connection(cost=5000.0)
+    _session(max_cost=100.0, over_cost=CostAction.downgrade).check_cost(conn, "SELECT 1", None)  # type: ignore[arg-type]
+    assert ("SELECT set_config(%s, %s, true)", ("max_parallel_workers_per_gather", "0")) in conn.executed
+
+
+def test_no_explain_without_max_cost() -> None:
+    conn = _Connection(cost=5000.0)
+    _session().check_cost(conn, "SELECT 1", None)  # type: ignore[arg-type]
+    assert conn.executed == []
+
+
+def test_statements_run_with_the_time_left_of_the_budget() -> None:
+    conn = _Connection(cost=0.0)
+    with time_budget(1.0):
+        _statement(_session(), conn, "SELECT 1", None, False, 60000)  # type: ignore[arg-type]
+        with time_budget(30.0):
+            _statement(_session(), conn, "SELECT 1", None, False, None)  # type: ignore[arg-type]
+    timeouts = [params[0] for sql, params in conn.executed if sql.startswith("SET LOCAL statement_timeout")]
+    assert len(timeouts) == 2 and all(0 < timeout <= 1000 for timeout in timeouts)
+
+
+def test_statements_do_not_start_once_the_budget_is_spent() -> None:
+    conn = _Connection(cost=0.0)
+    with time_budget(0.001), pytest.raises(TimeoutError):
+        time.sleep(0.01)
+        _statement(_session(), conn, "SELECT 1", None, False, None)  # type: ignore[arg-type]
+    assert conn.executed == []
+
+
+def test_footprint_entries_of_every_server_version() -> None:
+    common = {"calls": 4, "rows": 8, "shared_blks_hit": 10, "shared_blks_read": 2, "temp_blks_written": 0}
+    entries = pd.DataFrame(
+        {
+            "database": ["pg12", "pg17"],
+            "entry": [
+                {**common, "query": f"{STATEMENT_TAG}\nSELECT *\n  FROM pg_stat_statements", "total_time": 10.0},
+                {**common, "query": f"PREPARE pg_stats_tools_1 AS {STATEMENT_TAG}\nSELECT 1", "total_exec_time": 6.0, "total_plan_time": 2.0},
+            ],
+        }
+    )
+    data = footprint_entries(entries)
+    assert data[["statement", "total_time_ms", "mean_time_ms"]].values.tolist() == [["SELECT * FROM pg_stat_statements", 10.0, 2.5], ["SELECT 1", 8.0, 2.0]]
+
+
+def test_statement_excerpt_unwraps_cursors() -> None:
+    assert statement_excerpt(f'DECLARE "pg_stats_tools_result_set" CURSOR WITHOUT HOLD FOR {STATEMENT_TAG}\nSELECT 1') == "SELECT 1"
+
+
+def test_statement_excerpt_is_cut() -> None:
+    assert statement_excerpt(f"{STATEMENT_TAG} SELECT " + "x, " * 50, length=20) == "SELECT x, x, x, x, …"
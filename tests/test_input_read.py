@@ -0,0 +1,21 @@
+from pg_stats_tools.input_read import get_sql_template, read_sql_input
+
+
+def test_read_sql_input_binds_values() -> None:
+    """Values are bound parameters, the statement text does not change with them"""
+    first = read_sql_input("top_sql_stats_by_type", sql_type="SELECT", dbname="db1", count=10, top_stat_field="mean_time", fetch_fields=["calls"])
+    second = read_sql_input("top_sql_stats_by_type", sql_type="DELETE", dbname="db2", count=5, top_stat_field="mean_time", fetch_fields=["calls"])
+    assert first.sql == second.sql
+    assert "%(sql_type)s" in first.sql and "db1" not in first.sql
+    assert first.params == {"sql_type": "SELECT", "dbname": "db1", "count": 10}
+    assert second.params == {"sql_type": "DELETE", "dbname": "db2", "count": 5}
+
+
+def test_read_sql_input_skips_unused_values() -> None:
+    """Only the values of rendered clauses are bound"""
+    sql_input = read_sql_input("indexes_usage", schema="_all")
+    assert sql_input.params == {}
+
+
+def test_sql_templates_are_compiled_once() -> None:
+    assert get_sql_template("indexes_usage") is get_sql_template("indexes_usage")
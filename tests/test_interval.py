@@ -0,0 +1,33 @@
+import pandas as pd
+
+from pg_stats_tools.pg.stats.sql.interval import diff_statements
+
+
+def _sample(rows: list) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=["userid", "dbid", "queryid", "calls", "total_time", "mean_time", "max_time"])
+
+
+def test_diff_statements() -> None:
+    """Counters become per second rates, reset and new entries count from zero, evicted ones are dropped"""
+    first = _sample([(1, 1, 10, 100, 1000.0, 10.0, 50.0), (1, 1, 11, 50, 500.0, 10.0, 20.0), (1, 1, 12, 5, 5.0, 1.0, 1.0)])
+    second = _sample(
+        [
+            (1, 1, 10, 120, 1400.0, 11.7, 60.0),  # 20 calls, 400 ms
+            (1, 1, 11, 4, 40.0, 10.0, 20.0),  # reset
+            (1, 1, 13, 2, 10.0, 5.0, 6.0),  # new
+            (2, 1, 10, 7, 7.0, 1.0, 1.0),  # same queryid, other user
+        ]
+    )
+    rates, stats = diff_statements(first, second, seconds=2.0)
+    assert list(rates["queryid"]) == [10, 11, 13, 10]
+    assert list(rates["calls"]) == [10.0, 2.0, 1.0, 3.5]
+    assert list(rates["mean_time"]) == [20.0, 10.0, 5.0, 1.0]
+    assert rates["max_time"].isna().all()
+    assert stats == {"seconds": 2, "statements": 4, "new": 2, "reset": 1, "evicted": 1}
+
+
+def test_diff_statements_drops_idle() -> None:
+    """Statements without calls in the interval are not reported"""
+    sample = _sample([(1, 1, 10, 100, 1000.0, 10.0, 50.0)])
+    rates, stats = diff_statements(sample, sample, seconds=60.0)
+    assert rates.empty and stats["statements"] == 0
@@ -0,0 +1,138 @@
+import io
+import json
+from array import array
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import Dict, Iterator, Tuple
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pg_stats_tools.output import ArrowWriter, CsvWriter, JsonlWriter, OutputFormat, ParquetWriter, ReportOutput
+from pg_stats_tools.pg.stats.reports import Report
+from pg_stats_tools.result import ReportData, ResultSet
+
+
+def _batches() -> Iterator[Tuple[str, ReportData]]:
+    yield "usage", ResultSet(["relname", "buffers"], [["orders", "items"], array("q", [10, 20])])
+    yield "usage", ResultSet(["relname", "buffers"], [["lines"], array("q", [30])])
+
+
+class _BatchedReport(Report):
+    """Report yielding its table in two batches, it can not be fetched at once"""
+
+    @classmethod
+    def get_help(cls) -> str:
+        return "Batched"
+
+    def get_name(self) -> str:
+        return "usage"
+
+    def fetch(self) -> Dict[str, ReportData]:
+        raise AssertionError("written reports are not fetched at once")
+
+    def iter_batches(self) -> Iterator[Tuple[str, ReportData]]:
+        return _batches()
+
+    def show(self, results: Dict[str, ReportData]) -> None:
+        raise AssertionError("written reports are not shown")
+
+
+def test_jsonl_writer_values() -> None:
+    stream = io.BytesIO()
+    writer = JsonlWriter(stream)
+    data = pd.DataFrame(
+        {
+            "ratio": [np.nan, 1.5],
+            "calls": np.array([1, 2], dtype="int64"),
+            "mean": [Decimal("2.50"), None],
+            "at": [datetime(2024, 1, 2, 3, 4, 5), pd.NaT],
+            "running": [timedelta(minutes=1), timedelta(seconds=2)],
+        }
+    )
+    writer.write("sql", data)
+    writer.close()
+    assert [json.loads(line) for line in stream.getvalue().decode().splitlines()] == [
+        {"section": "sql", "ratio": None, "calls": 1, "mean": 2.5, "at": "2024-01-02T03:04:05", "running": 60.0},
+        {"section": "sql", "ratio": 1.5, "calls": 2, "mean": None, "at": None, "running": 2.0},
+    ]
+
+
+def test_csv_writer_repeats_header_for_other_columns() -> None:
+    stream = io.BytesIO()
+    writer = CsvWriter(stream)
+    for section, data in _batches():
+        writer.write(section, data)
+    writer.write("other", ResultSet(["x"], [["a,b"]]))
+    writer.close()
+    assert not stream.closed
+    assert stream.getvalue().decode() == 'section,relname,buffers\nusage,orders,10\nusage,items,20\nusage,lines,30\nsection,x\nother,"a,b"\n'
+
+
+def test_arrow_and_parquet_writers() -> None:
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    for writer_class, read in [(ArrowWriter, lambda stream: pa.ipc.open_stream(stream).read_all()), (ParquetWriter, pq.read_table)]:
+        stream = io.BytesIO()
+        writer = writer_class(stream)
+        writer.write("usage", ResultSet(["relname", "buffers"], [[], []]))
+        for section, data in _batches():
+            writer.write(section, data)
+        writer.close()
+        stream.seek(0)
+        table = read(stream)
+        assert table.column_names == ["section", "relname", "buffers"]
+        assert table.to_pydict() == {"section": ["usage"] * 3, "relname": ["orders", "items", "lines"], "buffers": [10, 20, 30]}
+
+
+def test_arrow_writer_empty_result_keeps_columns() -> None:
+    pa = pytest.importorskip("pyarrow")
+    stream = io.BytesIO()
+    writer = ArrowWriter(stream)
+    writer.write("usage", ResultSet(["relname", "buffers"], [[], []]))
+    writer.close()
+    table = pa.ipc.open_stream(io.BytesIO(stream.getvalue())).read_all()
+    assert table.column_names == ["section", "relname", "buffers"] and table.num_rows == 0
+
+
+def test_arrow_writer_refuses_other_columns() -> None:
+    pytest.importorskip("pyarrow")
+    writer = ArrowWriter(io.BytesIO())
+    writer.write("usage", ResultSet(["relname"], [["orders"]]))
+    with pytest.raises(ValueError, match="Use jsonl or csv"):
+        writer.write("other", ResultSet(["x", "y"], [[1], [2]]))
+
+
+def test_arrow_writer_types_columns_from_the_cursor() -> None:
+    pa = pytest.importorskip("pyarrow")
+    stream = io.BytesIO()
+    writer = ArrowWriter(stream)
+    # int8 calls, numeric mean time and text wait event, all NULL in the first batch
+    writer.write("top", ResultSet(["calls", "mean_time", "wait_event"], [[1], [None], [None]], [20, 1700, 25]))
+    writer.write("top", ResultSet(["calls", "mean_time", "wait_event"], [[2], [1.5], ["ClientRead"]], [20, 1700, 25]))
+    writer.close()
+    table = pa.ipc.open_stream(io.BytesIO(stream.getvalue())).read_all()
+    assert [str(field.type) for field in table.schema] == ["string", "int64", "double", "string"]
+    assert table.to_pydict()["mean_time"] == [None, 1.5] and table.to_pydict()["wait_event"] == [None, "ClientRead"]
+
+
+def test_arrow_writer_promotes_columns_of_batches_without_types() -> None:
+    pa = pytest.importorskip("pyarrow")
+    pd = pytest.importorskip("pandas")
+    stream = io.BytesIO()
+    writer = ArrowWriter(stream)
+    writer.write("first", pd.DataFrame({"calls": [1, 2], "wait_event": [None, None]}))
+    writer.write("second", pd.DataFrame({"calls": [2.5, 3.5], "wait_event": ["ClientRead", None]}))
+    writer.close()
+    table = pa.ipc.open_stream(io.BytesIO(stream.getvalue())).read_all()
+    assert [str(field.type) for field in table.schema] == ["string", "double", "string"]
+    assert table.to_pydict() == {"section": ["first", "first", "second", "second"], "calls": [1.0, 2.0, 2.5, 3.5], "wait_event": [None, None, "ClientRead", None]}
+
+
+def test_report_run_writes_batches(tmp_path: Path) -> None:
+    path = tmp_path / "usage.jsonl"
+    _BatchedReport().run(output=ReportOutput(OutputFormat.jsonl, str(path)))
+    assert [json.loads(line)["relname"] for line in path.read_text().splitlines()] == ["orders", "items", "lines"]
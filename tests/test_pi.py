@@ -0,0 +1,241 @@
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Literal
+
+import numpy as np
+import pytest
+from botocore.exceptions import ClientError
+
+from pg_stats_tools.aws import PIAwsClient
+from pg_stats_tools.pi import MetricKey, MetricSeries, expected_points, plan_period, time_windows
+from pg_stats_tools.pi_cache import PI_OPEN_TAIL_SECONDS, PIMetricsCache, merge_segments, uncovered
+from pg_stats_tools.throttle import AdaptiveRateLimiter
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+class _PIClient:
+    """
+    Local stub of the PI GetResourceMetrics API: one point per period in [StartTime, EndTime), valued by its period number
+    and stamped with the start or the end of the period (PeriodAlignment), in pages of points_per_page. Each call takes latency seconds and is throttled beyond max_concurrent calls in flight
+    """
+
+    def __init__(self, points_per_page: int, latency: float = 0, max_concurrent: int = 0) -> None:
+        self.points_per_page = points_per_page
+        self.latency = latency
+        self.max_concurrent = max_concurrent
+        self.calls: List[Dict[str, Any]] = []
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def get_resource_metrics(self, **kvargs: Any) -> Dict[str, Any]:
+        with self._lock:
+            self.calls.append(kvargs)
+            self.in_flight += 1
+            throttled = bool(self.max_concurrent) and self.in_flight > self.max_concurrent
+        try:
+            time.sleep(self.latency)
+            if throttled:
+                raise ClientError({"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}}, "GetResourceMetrics")
+            return self._page(kvargs)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def _page(self, kvargs: Dict[str, Any]) -> Dict[str, Any]:
+        period = kvargs["PeriodInSeconds"]
+        first_period = math.ceil((kvargs["StartTime"] - START).total_seconds() / period)
+        periods = max(math.ceil((kvargs["EndTime"] - START).total_seconds() / period) - first_period, 0)
+        first = int(kvargs.get("NextToken", "0"))
+        last = min(first + self.points_per_page, periods)
+        stamp = period if kvargs["PeriodAlignment"] == "END_TIME" else 0
+        points = [{"Timestamp": START + timedelta(seconds=(first_period + i) * period + stamp), "Value": float(first_period + i)} for i in range(first, last)]
+        page: Dict[str, Any] = {
+            "MetricList": [
+                {"Key": {"Metric": "db.load.avg"}, "DataPoints": points},
+                {"Key": {"Metric": "db.load.avg", "Dimensions": {"db.wait_event.type": "CPU"}}, "DataPoints": points[:1]},
+            ]
+        }
+        if last < periods:
+            page["NextToken"] = str(last)
+        return page
+
+
+def _client(pi_client: _PIClient) -> PIAwsClient:
+    client = PIAwsClient(AdaptiveRateLimiter(rate=1000, max_rate=1000))
+    client._pi_client = pi_client  # type: ignore
+    return client
+
+
+def test_pi_iter_resource_metrics_follows_next_token() -> None:
+    pi_client = _PIClient(points_per_page=300)
+    pages = _client(pi_client).pi_iter_resource_metrics("RDS", "db-ABC", [{"Metric": "db.load.avg"}], START, START + timedelta(seconds=1000), period_in_seconds=1)
+    counts = [len(series[MetricKey("db.load.avg")]) for series in pages]
+    assert counts == [300, 600, 900, 1000]
+    assert "NextToken" not in pi_client.calls[0]
+    assert [call.get("NextToken") for call in pi_client.calls[1:]] == ["300", "600", "900"]
+    assert all(call["MaxResults"] == 25 for call in pi_client.calls)
+
+
+def test_pi_get_all_resource_metrics_series() -> None:
+    end = START + timedelta(seconds=1000)
+    series = _client(_PIClient(points_per_page=300)).pi_get_all_resource_metrics(
+        "RDS", "db-ABC", [{"Metric": "db.load.avg"}], START, end, period_in_seconds=1, period_alignment="START_TIME"
+    )
+    load = series[MetricKey("db.load.avg")]
+    assert load.timestamps[0] == np.datetime64("2024-01-01T00:00:00") and load.timestamps[-1] == np.datetime64("2024-01-01T00:16:39")
+    np.testing.assert_array_equal(load.values, np.arange(1000, dtype=np.float64))
+    # Preallocated for the whole range, no growth
+    assert len(load._values) == expected_points(START, end, 1)
+    cpu = series[MetricKey("db.load.avg", (("db.wait_event.type", "CPU"),))]
+    assert str(cpu.key) == "db.load.avg{db.wait_event.type=CPU}"
+    assert list(cpu.values) == [0.0, 300.0, 600.0, 900.0]
+
+
+def test_metric_series_grows_and_keeps_missing_values() -> None:
+    series = _client(_PIClient(points_per_page=1)).pi_get_all_resource_metrics("RDS", "db-ABC", [], START, START, period_in_seconds=60)
+    assert series[MetricKey("db.load.avg")].count == 0
+    grown = MetricSeries(MetricKey("db.load.avg"), 1)
+    grown.append([{"Timestamp": START}, {"Timestamp": START + timedelta(seconds=60), "Value": 1.5}])
+    assert np.isnan(grown.values[0]) and grown.values[1] == 1.5
+
+
+def test_time_windows() -> None:
+    start = START + timedelta(seconds=1234)
+    end = START + timedelta(hours=3)
+    windows = time_windows(start, end, 1, window_points=3600)
+    assert windows[0][0] == start and windows[-1][1] == end
+    assert [window_end for _, window_end in windows[:-1]] == [window_start for window_start, _ in windows[1:]]
+    assert [window_end for _, window_end in windows[:-1]] == [START + timedelta(hours=1), START + timedelta(hours=2)]
+    assert time_windows(start, end, 60) == [(start, end)]
+
+
+def test_sharded_resource_metrics_match_sequential() -> None:
+    start, end = START + timedelta(seconds=1234), START + timedelta(hours=3, seconds=17)
+    client = _client(_PIClient(points_per_page=1000))
+    sequential = client.pi_get_all_resource_metrics("RDS", "db-ABC", [{"Metric": "db.load.avg"}], start, end, period_in_seconds=1)
+    sharded = client.pi_get_sharded_resource_metrics("RDS", "db-ABC", [{"Metric": "db.load.avg"}], start, end, period_in_seconds=1, max_workers=4, window_points=3600)
+    load = sharded[MetricKey("db.load.avg")]
+    np.testing.assert_array_equal(load.timestamps, sequential[MetricKey("db.load.avg")].timestamps)
+    np.testing.assert_array_equal(load.values, np.arange(1234, 3 * 3600 + 17, dtype=np.float64))
+    assert len(sharded[MetricKey("db.load.avg", (("db.wait_event.type", "CPU"),))]) > 4
+
+
+def test_sharded_resource_metrics_retry_throttled_calls() -> None:
+    pi_client = _PIClient(points_per_page=600, latency=0.005, max_concurrent=2)
+    client = _client(pi_client)
+    end = START + timedelta(hours=2)
+    series = client.pi_get_sharded_resource_metrics("RDS", "db-ABC", [{"Metric": "db.load.avg"}], START, end, period_in_seconds=1, max_workers=8, window_points=600)
+    assert client._rate_limiter.throttles > 0
+    np.testing.assert_array_equal(series[MetricKey("db.load.avg")].values, np.arange(2 * 3600, dtype=np.float64))
+
+
+@pytest.mark.slow
+def test_benchmark_sharded_resource_metrics() -> None:
+    """Six hours at one second resolution from a stub PI API answering in 100ms, sequential pages against sharded windows"""
+    end = START + timedelta(hours=6)
+    results = {}
+    for max_workers in (1, 10):
+        client = PIAwsClient(AdaptiveRateLimiter())
+        client._pi_client = _PIClient(points_per_page=1000, latency=0.1, max_concurrent=8)  # type: ignore
+        started = time.perf_counter()
+        series = client.pi_get_sharded_resource_metrics("RDS", "db-ABC", [{"Metric": "db.load.avg"}], START, end, period_in_seconds=1, max_workers=max_workers)
+        results[max_workers] = time.perf_counter() - started
+        assert len(series[MetricKey("db.load.avg")]) == 6 * 3600
+        print(f"{max_workers} workers: {results[max_workers]:.2f}s, {6 * 3600 / results[max_workers]:.0f} points/s, {client._rate_limiter.throttles} throttles")
+    assert results[10] < results[1]
+
+
+def test_uncovered_and_merge_segments() -> None:
+    assert uncovered(0, 100, [(10, 20), (15, 30), (50, 60), (90, 200)]) == [(0, 10), (30, 50), (60, 90)]
+    assert uncovered(0, 100, []) == [(0, 100)]
+    assert merge_segments([(50, 60), (10, 20), (15, 30), (30, 40)]) == [(10, 40), (50, 60)]
+
+
+def test_pi_metrics_cache_gaps(tmp_path: Path) -> None:
+    cache = PIMetricsCache(str(tmp_path / "pi.sqlite"))
+    queries: List[Any] = [{"Metric": "db.load.avg", "GroupBy": {"Group": "db.wait_event"}}]
+    start, end = START + timedelta(hours=1), START + timedelta(hours=2)
+    now = (START + timedelta(days=1)).timestamp()
+    series = _client(_PIClient(points_per_page=1000)).pi_get_all_resource_metrics("RDS", "db-ABC", queries, start, end, period_in_seconds=60)
+    cache.put("db-ABC", queries, 60, start, end, series, now=now)
+    assert cache.gaps("db-ABC", queries, 60, START, START + timedelta(hours=3), now=now) == [(START, start), (end, START + timedelta(hours=3))]
+    assert cache.gaps("db-ABC", queries, 1, start, end, now=now) == [(start, end)]
+    assert cache.gaps("db-ABC", [{"Metric": "db.load.avg"}], 60, start, end, now=now) == [(start, end)]
+    cached = cache.get("db-ABC", queries, 60, start + timedelta(minutes=30), end)
+    np.testing.assert_array_equal(cached[MetricKey("db.load.avg")].values, np.arange(90, 120, dtype=np.float64))
+    # Only the part of the range within retention is fetched
+    assert cache.gaps("db-ABC", queries, 60, START, start, retention_days=1, now=now) == [(START + timedelta(minutes=1), start)]
+
+
+def test_pi_metrics_cache_refreshes_open_tail(tmp_path: Path) -> None:
+    cache = PIMetricsCache(str(tmp_path / "pi.sqlite"))
+    queries: List[Any] = [{"Metric": "db.load.avg"}]
+    start, end = START, START + timedelta(hours=1)
+    series = _client(_PIClient(points_per_page=1000)).pi_get_all_resource_metrics("RDS", "db-ABC", queries, start, end, period_in_seconds=60)
+    cache.put("db-ABC", queries, 60, start, end, series, now=end.timestamp())
+    assert cache.gaps("db-ABC", queries, 60, start, end, now=end.timestamp()) == [(end - timedelta(seconds=PI_OPEN_TAIL_SECONDS), end)]
+
+
+def test_cached_resource_metrics_only_fetch_gaps(tmp_path: Path) -> None:
+    pi_client = _PIClient(points_per_page=1000)
+    client = _client(pi_client)
+    client._pi_cache = PIMetricsCache(str(tmp_path / "pi.sqlite"))
+    end = datetime.fromtimestamp(time.time() // 60 * 60, tz=timezone.utc)
+    queries: List[Any] = [{"Metric": "db.load.avg"}]
+    last_hour = client.pi_get_cached_resource_metrics("RDS", "db-ABC", queries, end - timedelta(hours=1), end, period_in_seconds=60)
+    assert len(last_hour[MetricKey("db.load.avg")]) == 60
+    pi_client.calls.clear()
+    last_3_hours = client.pi_get_cached_resource_metrics("RDS", "db-ABC", queries, end - timedelta(hours=3), end, period_in_seconds=60)
+    assert [(call["StartTime"], call["EndTime"]) for call in pi_client.calls] == [
+        (end - timedelta(hours=3), end - timedelta(hours=1)),
+        (end - timedelta(seconds=PI_OPEN_TAIL_SECONDS), end),
+    ]
+    load = last_3_hours[MetricKey("db.load.avg")]
+    assert len(load) == 180 and np.all(np.diff(load.values) == 1)
+
+
+@pytest.mark.parametrize("period_alignment", ["END_TIME", "START_TIME"])
+def test_cached_resource_metrics_match_uncached(tmp_path: Path, period_alignment: Literal["END_TIME", "START_TIME"]) -> None:
+    """The cache returns the points PI returns, stamped at the end or the start of their period, and keeps both alignments apart"""
+    pi_client = _PIClient(points_per_page=1000)
+    client = _client(pi_client)
+    client._pi_cache = PIMetricsCache(str(tmp_path / "pi.sqlite"))
+    end = datetime.fromtimestamp(time.time() // 60 * 60, tz=timezone.utc) - timedelta(hours=1)
+    queries: List[Any] = [{"Metric": "db.load.avg"}]
+    other_alignment: Literal["END_TIME", "START_TIME"] = "START_TIME" if period_alignment == "END_TIME" else "END_TIME"
+    client.pi_get_cached_resource_metrics("RDS", "db-ABC", queries, end - timedelta(hours=2), end, period_in_seconds=60, period_alignment=other_alignment)
+    direct = client.pi_get_all_resource_metrics("RDS", "db-ABC", queries, end - timedelta(hours=1), end, period_in_seconds=60, period_alignment=period_alignment)
+    cached = client.pi_get_cached_resource_metrics("RDS", "db-ABC", queries, end - timedelta(hours=1), end, period_in_seconds=60, period_alignment=period_alignment)
+    load, cached_load = direct[MetricKey("db.load.avg")], cached[MetricKey("db.load.avg")]
+    assert len(cached_load) == len(load) == 60
+    np.testing.assert_array_equal(cached_load.timestamps, load.timestamps)
+    np.testing.assert_array_equal(cached_load.values, load.values)
+
+
+@pytest.mark.parametrize(
+    "hours, max_points, period, calls",
+    [
+        (1, 3600, 1, 1),
+        (1, 200, 60, 1),
+        (24, 300, 300, 1),
+        (24, 24 * 3600, 1, 24),
+        (24 * 7, 200, 3600, 1),
+        (24 * 30, 200, 86400, 1),
+        (24 * 365, 200, 86400, 1),
+    ],
+)
+def test_plan_period(hours: int, max_points: int, period: int, calls: int) -> None:
+    plan = plan_period(START, START + timedelta(hours=hours), [{"Metric": "db.load.avg"}], max_points=max_points)
+    assert (plan.period_in_seconds, plan.calls) == (period, calls)
+    assert plan.points == math.ceil(hours * 3600 / period)
+
+
+def test_plan_period_pages_grouped_queries() -> None:
+    queries = [{"Metric": "db.load.avg", "GroupBy": {"Group": "db.wait_event"}}, {"Metric": "db.load.avg", "GroupBy": {"Group": "db.sql", "Limit": 25}}]
+    plan = plan_period(START, START + timedelta(hours=3), queries, max_points=100_000)
+    assert plan.windows == 3 and plan.pages_per_window == 2 and plan.calls == 6
+    assert plan.describe() == "10800 points per series every 1s, 6 GetResourceMetrics calls at most"
@@ -0,0 +1,54 @@
+from array import array
+from typing import Iterator, List
+
+import pytest
+from tabulate import tabulate
+
+from pg_stats_tools.format import TableFormatOption
+from pg_stats_tools.render import RENDER_SAMPLE_ROWS, _tabulate_padded, fit, render_table, sample_layout, table_rows
+from pg_stats_tools.result import ResultSet
+
+
+def _result(count: int) -> ResultSet:
+    return ResultSet(
+        ["relname", "buffers", "pct"],
+        [[f"table_{i % 37}" for i in range(count)], array("q", range(count)), array("d", [i / 7 for i in range(count)])],
+    )
+
+
+def _lines(blocks: Iterator[str]) -> List[str]:
+    return "\n".join(blocks).splitlines()
+
+
+def test_small_tables_are_rendered_by_tabulate() -> None:
+    result = _result(10)
+    assert list(render_table(result, "psql")) == [tabulate(result, headers="keys", tablefmt="psql")]  # pyright: ignore
+
+
+@pytest.mark.parametrize("tablefmt", [tablefmt.value for tablefmt in TableFormatOption])
+def test_chunks_join_into_the_whole_table(tablefmt: str) -> None:
+    result = _result(RENDER_SAMPLE_ROWS + 50)
+    headers, _, rows = table_rows(result)
+    all_rows = list(rows)
+    layout = sample_layout(headers, all_rows[:RENDER_SAMPLE_ROWS])
+    whole = _tabulate_padded([[fit(value, column) for value, column in zip(row, layout)] for row in all_rows], headers, tablefmt)
+    assert _lines(render_table(result, tablefmt, first_rows=7)) == whole
+
+
+def test_first_block_is_a_screenful() -> None:
+    blocks = render_table(_result(RENDER_SAMPLE_ROWS * 3), "github", first_rows=5)
+    first = next(blocks).splitlines()
+    assert first[0].split("|")[1].strip() == "relname" and len(first) == 2 + 5
+    assert first[2].split("|")[2] == " " * 9 + "0 "
+
+
+def test_cells_wider_than_the_sample_are_cut() -> None:
+    result = ResultSet(["name"], [["short"] * RENDER_SAMPLE_ROWS + ["much longer than the sample"]])
+    assert _lines(render_table(result, "plain"))[-1] == "much…"
+
+
+def test_pages_repeat_the_header() -> None:
+    pages = list(render_table(_result(5), "github", page_size=2))
+    assert len(pages) == 3
+    assert all(page.startswith("| relname") for page in pages)
+    assert len(pages[2].splitlines()) == 3
@@ -0,0 +1,374 @@
+"""
+Report benchmarks against a throwaway local Postgres. Run with: make benchmarks (pytest --runslow -n0 -s)
+
+A server with pg_stat_statements and pg_buffercache is created from the binaries of PG_BENCH_BIN (default: the
+directory of initdb on the PATH) and loaded with a synthetic workload: many schemas, tables and indexes and thousands
+of distinct statements. Every report is then timed end to end, split into template render, query execution
+(server side, from EXPLAIN ANALYZE), fetch (transfer and conversion, the rest of the query phase) and rendering.
+The SQL type classification of the report queries is also timed against the former chained ILIKE CASE, on synthetic
+statement texts.
+
+Results are written as JSON to PG_BENCH_OUTPUT (default: .benchmarks/reports_<commit>.json) and compared with the
+previous results file of the same directory. PG_BENCH_SCALE multiplies the number of schemas.
+"""
+
+import contextlib
+import glob
+import io
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Dict, Iterator, List, Union
+
+import psycopg2
+import pytest
+from tabulate import tabulate
+
+from pg_stats_tools import psql
+from pg_stats_tools.input_read import SqlInput, read_sql_input
+from pg_stats_tools.pg.stats.bundle.reports import REPORTS, BundleEntry
+from pg_stats_tools.pg.stats.sql.classify import leading_keyword_join, sql_type_case
+
+BENCH_SCHEMAS = 20
+BENCH_TABLES_PER_SCHEMA = 25
+BENCH_ROWS_PER_TABLE = 1000
+# Executions of every workload statement, with different values
+BENCH_CALLS = 3
+# Runs of every report, phases are the median of the runs
+BENCH_REPEATS = 3
+# Report args other than the defaults: the workload tables are not in the public schema
+BENCH_REPORT_ARGS: Dict[str, Dict[str, Any]] = {
+    "IndexesUsageHints": {"schema": "_all"},
+    "IndexesUsage": {"schema": "_all"},
+    "TableCacheHits": {"schema": "_all"},
+    "IndexCacheHits": {"schema": "_all"},
+    "Usage": {"schema": "_all"},
+}
+# Statement shapes run on every workload table. Each shape and table is a distinct pg_stat_statements entry (table names
+# are unique across schemas, PG 18 jumbles relations by name)
+WORKLOAD_STATEMENTS = [
+    "SELECT * FROM {table} WHERE id = %(id)s",
+    "SELECT count(*) FROM {table} WHERE account = %(account)s",
+    "SELECT account, sum(amount) FROM {table} GROUP BY account ORDER BY 2 DESC LIMIT 10",
+    "SELECT * FROM {table} WHERE created_at > now() - interval '1 day' ORDER BY created_at DESC LIMIT 5",
+    "UPDATE {table} SET amount = amount + 1 WHERE id = %(id)s",
+    "INSERT INTO {table} (account, amount, note) VALUES (%(account)s, %(id)s, 'bench')",
+    "DELETE FROM {table} WHERE id = %(id)s AND note = 'bench'",
+]
+# Keywords of the former sql_time_stats_by_type.sql CASE, checked in order against the whole text with ILIKE
+ILIKE_SQL_TYPES = [
+    ("SELECT", "SELECT"),
+    ("FETCH", "FETCH"),
+    ("INSERT", "INSERT"),
+    ("UPDATE", "UPDATE"),
+    ("DELETE", "DELETE"),
+    ("CREATE", "CREATE"),
+    ("DROP", "DROP"),
+    ("ALTER", "ALTER"),
+    ("TRUNCATE", "TRUNCATE"),
+    ("GRANT", "GRANT"),
+    ("REVOKE", "REVOKE"),
+    ("MOVE", "MOVE"),
+    ("COMMIT", "COMMIT"),
+    ("ROLLBACK", "ROLLBACK"),
+    ("SAVEPOINT", "SAVEPOINT"),
+    ("BEGIN", "TRANSACTION"),
+]
+# Statement texts classified by the classifier benchmark: {i} makes each one distinct, trailing spaces vary their length
+CLASSIFIER_TEMPLATES = [
+    "SELECT a, b FROM t{i} WHERE c = $1 AND d IN (SELECT d FROM u{i})",
+    "/* app */ INSERT INTO t{i} (a, b) VALUES ($1, $2) RETURNING id",
+    "UPDATE t{i} SET a = a + $1 WHERE id = (SELECT max(id) FROM t{i})",
+    "WITH old AS (SELECT id FROM t{i} WHERE created < $1) DELETE FROM t{i} USING old WHERE t{i}.id = old.id",
+    "BEGIN",
+    "COMMIT",
+]
+CLASSIFIER_STATEMENTS = 210_000
+# Reports reading the pg_stat_statements columns PostgreSQL 13 renamed (total_time, mean_time, blk_read_time): they are
+# skipped on newer servers, any other report failing fails the benchmark
+PRE_PG13_REPORTS = ["SQLTimeStatsBySQLType", "SQLStatsBySQLType", "SQLStatsSimplifiedBySQLType"]
+
+
+def _bin_dir() -> Union[str, None]:
+    if os.environ.get("PG_BENCH_BIN"):
+        return os.environ["PG_BENCH_BIN"]
+    initdb = shutil.which("initdb")
+    return os.path.dirname(initdb) if initdb else None
+
+
+def _free_port() -> int:
+    with contextlib.closing(socket.socket(socket.AF_INET, socket.SOCK_STREAM)) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+class LocalPostgres:
+    """Server of a temporary data directory, listening on a free localhost port, with trust authentication"""
+
+    def __init__(self, bin_dir: str, data_dir: str) -> None:
+        self._bin_dir = bin_dir
+        self._data_dir = data_dir
+        self.port = _free_port()
+
+    def _run(self, program: str, *args: str) -> None:
+        subprocess.run([os.path.join(self._bin_dir, program), *args], check=True, capture_output=True)
+
+    def start(self) -> None:
+        self._run("initdb", "-D", self._data_dir, "-U", "postgres", "--auth=trust", "-E", "UTF8")
+        options = (
+            f"-p {self.port} -c listen_addresses=127.0.0.1 -c unix_socket_directories='' "
+            "-c shared_preload_libraries=pg_stat_statements -c pg_stat_statements.max=10000 -c track_io_timing=on"
+        )
+        self._run("pg_ctl", "-D", self._data_dir, "-o", options, "-l", os.path.join(self._data_dir, "server.log"), "-w", "start")
+
+    def stop(self) -> None:
+        self._run("pg_ctl", "-D", self._data_dir, "-m", "immediate", "-w", "stop")
+
+    def conn_params(self) -> Dict[str, Any]:
+        """Connection params of the reports"""
+        return {"db_user": "postgres", "db_name": "postgres", "db_pass": "", "db_host": "127.0.0.1", "db_port": self.port}
+
+    def connect(self) -> Any:
+        conn = psycopg2.connect(host="127.0.0.1", port=self.port, user="postgres", dbname="postgres")
+        conn.autocommit = True
+        return conn
+
+
+def load_workload(conn: Any, schemas: int) -> Dict[str, Any]:
+    """Create the workload tables, run every workload statement and return the size of the workload"""
+    with conn.cursor() as cursor:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_stat_statements")
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_buffercache")
+        # One DO block: setup statements are nested, so they are not pg_stat_statements entries
+        cursor.execute(
+            """
+            DO $$
+            BEGIN
+                FOR s IN 1..%(schemas)s LOOP
+                    EXECUTE format('CREATE SCHEMA bench_%%s', s);
+                    FOR t IN 1..%(tables)s LOOP
+                        EXECUTE format(
+                            'CREATE TABLE bench_%%1$s.t_%%1$s_%%2$s (id bigserial PRIMARY KEY, account int, amount numeric, note text, '
+                            'created_at timestamptz DEFAULT now());'
+                            'CREATE INDEX ON bench_%%1$s.t_%%1$s_%%2$s (account);'
+                            'CREATE INDEX ON bench_%%1$s.t_%%1$s_%%2$s (created_at);'
+                            'INSERT INTO bench_%%1$s.t_%%1$s_%%2$s (account, amount, note) '
+                            'SELECT i %%%% 50, i, md5(i::text) FROM generate_series(1, %(rows)s) i',
+                            s, t
+                        );
+                    END LOOP;
+                END LOOP;
+            END $$
+            """,
+            {"schemas": schemas, "tables": BENCH_TABLES_PER_SCHEMA, "rows": BENCH_ROWS_PER_TABLE},
+        )
+        cursor.execute("ANALYZE")
+        cursor.execute("SELECT pg_stat_statements_reset()")
+        tables = [f"bench_{s}.t_{s}_{t}" for s in range(1, schemas + 1) for t in range(1, BENCH_TABLES_PER_SCHEMA + 1)]
+        for call in range(BENCH_CALLS):
+            for table in tables:
+                for statement in WORKLOAD_STATEMENTS:
+                    cursor.execute(statement.format(table=table), {"id": call * 7 + 1, "account": call})
+        cursor.execute("SELECT count(*) FROM pg_stat_statements")
+        statements = cursor.fetchone()[0]
+        cursor.execute("SELECT current_setting('server_version'), current_setting('server_version_num')::int")
+        server_version, server_version_num = cursor.fetchone()
+    return {
+        "server_version": server_version,
+        "server_version_num": server_version_num,
+        "schemas": schemas,
+        "tables": len(tables),
+        "indexes": len(tables) * 3,
+        "rows_per_table": BENCH_ROWS_PER_TABLE,
+        "statements": statements,
+    }
+
+
+class ReportTimer:
+    """Phase timings of one report run. Template renders are timed, and their statements kept, by wrapping read_sql_input"""
+
+    def __init__(self) -> None:
+        self.template = 0.0
+        self.statements: List[SqlInput] = []
+
+    def read_sql_input(self, report_name: str, **kvargs: Any) -> SqlInput:
+        start = time.perf_counter()
+        sql_input = read_sql_input(report_name, **kvargs)
+        self.template += time.perf_counter() - start
+        self.statements.append(sql_input)
+        return sql_input
+
+
+def sql_input_modules() -> List[ModuleType]:
+    """
+    Modules rendering statements with read_sql_input: the report modules and the ones reports run statements through
+    (sql.texts, which the interval mode of sql.interval also goes through). Their statements are all timed and explained
+    """
+    return [
+        module
+        for name, module in list(sys.modules.items())
+        if name.startswith("pg_stats_tools.") and name != read_sql_input.__module__ and getattr(module, "read_sql_input", None) is read_sql_input
+    ]
+
+
+def _query_seconds() -> float:
+    return sum(sum(session.timings.get("query", [])) for session in psql.get_sessions())
+
+
+def _execution_seconds(conn: Any, statements: List[SqlInput]) -> float:
+    """Server side planning and execution time of the statements, as EXPLAIN ANALYZE reports them"""
+    total_ms = 0.0
+    with conn.cursor() as cursor:
+        for sql, params in statements:
+            cursor.execute(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}", params or None)
+            plan = cursor.fetchone()[0][0]
+            total_ms += plan["Planning Time"] + plan["Execution Time"]
+    return total_ms / 1000
+
+
+def time_report(report_name: str, conn_params: Dict[str, Any], conn: Any, monkeypatch: pytest.MonkeyPatch) -> Dict[str, Any]:
+    runs: List[Dict[str, float]] = []
+    rows = 0
+    # Before any of them is patched
+    modules = sql_input_modules()
+    for _ in range(BENCH_REPEATS):
+        timer = ReportTimer()
+        for module in modules:
+            monkeypatch.setattr(module, "read_sql_input", timer.read_sql_input)
+        report = BundleEntry(0, report_name, BENCH_REPORT_ARGS.get(report_name, {}), None).build(conn_params)
+        start = time.perf_counter()
+        query_start = _query_seconds()
+        results = report.fetch()
+        query = _query_seconds() - query_start
+        render_start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            report.show(results)
+        end = time.perf_counter()
+        execution = _execution_seconds(conn, timer.statements)
+        runs.append(
+            {
+                "template_s": timer.template,
+                "execution_s": execution,
+                "fetch_s": max(query - execution, 0.0),
+                "render_s": end - render_start,
+                "total_s": end - start,
+            }
+        )
+        rows = sum(len(data) for data in results.values())
+    monkeypatch.undo()
+    return {**{phase: round(statistics.median(run[phase] for run in runs), 6) for phase in runs[0]}, "rows": rows}
+
+
+def ilike_sql_type_case(query_column: str) -> str:
+    """SQL type expression of the former report queries"""
+    whens = " ".join(f"WHEN {query_column} ILIKE '%{keyword}%' THEN '{sql_type}'" for keyword, sql_type in ILIKE_SQL_TYPES)
+    return f"CASE {whens} ELSE 'OTHER' END"
+
+
+def time_classifier(conn: Any, sql: str) -> Dict[str, Any]:
+    """Median server side time (EXPLAIN ANALYZE) of a classifying statement, and the statements per SQL type it returns"""
+    with conn.cursor() as cursor:
+        seconds = []
+        for _ in range(BENCH_REPEATS):
+            cursor.execute(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}")
+            plan = cursor.fetchone()[0][0]
+            seconds.append((plan["Planning Time"] + plan["Execution Time"]) / 1000)
+        cursor.execute(sql)
+        counts = dict(cursor.fetchall())
+    return {"execution_s": round(statistics.median(seconds), 6), "sql_types": counts}
+
+
+def _commit() -> str:
+    result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=Path(__file__).parent)
+    return result.stdout.strip() or "unknown"
+
+
+def compare(results: Dict[str, Any], previous: Dict[str, Any]) -> str:
+    """Total time of every report against the previous results"""
+    rows = []
+    for name, timings in results["reports"].items():
+        before = previous.get("reports", {}).get(name, {}).get("total_s")
+        ratio = round(timings["total_s"] / before, 2) if before else None
+        rows.append([name, before, timings["total_s"], ratio])
+    return tabulate(rows, headers=["report", f"total_s {previous.get('commit')}", f"total_s {results['commit']}", "ratio"], tablefmt="github")
+
+
+@pytest.fixture(scope="module")
+def local_postgres(tmp_path_factory: pytest.TempPathFactory) -> Iterator[LocalPostgres]:
+    bin_dir = _bin_dir()
+    if bin_dir is None:
+        pytest.skip("no postgres binaries: put initdb on the PATH or set PG_BENCH_BIN")
+    if hasattr(os, "geteuid") and os.geteuid() == 0:
+        pytest.skip("initdb can not run as root")
+    server = LocalPostgres(bin_dir, str(tmp_path_factory.mktemp("pg_bench") / "data"))
+    server.start()
+    try:
+        yield server
+    finally:
+        psql.close_sessions()
+        server.stop()
+
+
+@pytest.mark.slow
+def test_report_benchmarks(local_postgres: LocalPostgres, monkeypatch: pytest.MonkeyPatch) -> None:
+    with contextlib.closing(local_postgres.connect()) as conn:
+        try:
+            workload = load_workload(conn, BENCH_SCHEMAS * int(os.environ.get("PG_BENCH_SCALE", "1")))
+        except psycopg2.errors.UndefinedFile as e:
+            pytest.skip(f"pg_stat_statements or pg_buffercache is not installed: {e}")
+        skipped = PRE_PG13_REPORTS if workload["server_version_num"] >= 130000 else []
+        reports = {
+            report_name: time_report(report_name, local_postgres.conn_params(), conn, monkeypatch) for report_name in REPORTS if report_name not in skipped
+        }
+    results = {"commit": _commit(), "created_at": datetime.now(timezone.utc).isoformat(), "workload": workload, "reports": reports, "skipped": skipped}
+    output = os.environ.get("PG_BENCH_OUTPUT") or os.path.join(".benchmarks", f"reports_{results['commit']}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    previous_files = sorted(
+        (path for path in glob.glob(os.path.join(os.path.dirname(output) or ".", "reports_*.json")) if path != output), key=os.path.getmtime
+    )
+    with open(output, "w") as output_file:
+        json.dump(results, output_file, indent=2)
+    print(tabulate([{"report": name, **timings} for name, timings in reports.items()], headers="keys", tablefmt="github"))
+    if skipped:
+        print(f"Skipped on PostgreSQL {workload['server_version']}: {', '.join(skipped)}")
+    if previous_files:
+        with open(previous_files[-1]) as previous_file:
+            print(compare(results, json.load(previous_file)))
+    assert workload["statements"] >= len(WORKLOAD_STATEMENTS) * workload["tables"]
+    assert list(reports) == [report_name for report_name in REPORTS if report_name not in skipped]
+
+
+@pytest.mark.slow
+def test_classifier_benchmarks(local_postgres: LocalPostgres) -> None:
+    """Server side SQL type classification: the leading keyword template of the report queries against the former chained ILIKE CASE"""
+    with contextlib.closing(local_postgres.connect()) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "CREATE TABLE bench_classifier AS SELECT replace((%(templates)s::text[])[i %% %(templates_count)s + 1], '{i}', i::text) || repeat(' ', i %% 400) AS query "
+                "FROM generate_series(0, %(count)s - 1) AS i",
+                {"templates": CLASSIFIER_TEMPLATES, "templates_count": len(CLASSIFIER_TEMPLATES), "count": CLASSIFIER_STATEMENTS},
+            )
+            cursor.execute("ANALYZE bench_classifier")
+        ilike = time_classifier(conn, f"SELECT {ilike_sql_type_case('query')} AS sql_type, count(*) FROM bench_classifier GROUP BY 1")
+        keyword = time_classifier(
+            conn, f"SELECT {sql_type_case()} AS sql_type, count(*) FROM bench_classifier {leading_keyword_join('bench_classifier.query')} GROUP BY 1"
+        )
+    print(
+        tabulate(
+            [["chained ILIKE", ilike["execution_s"], ilike["sql_types"]], ["leading keyword", keyword["execution_s"], keyword["sql_types"]]],
+            headers=["classifier", f"execution_s ({CLASSIFIER_STATEMENTS} statements)", "sql_types"],
+            tablefmt="github",
+        )
+    )
+    # Each template is its own SQL type, where ILIKE finds the SELECT of the subqueries first
+    per_template = CLASSIFIER_STATEMENTS // len(CLASSIFIER_TEMPLATES)
+    assert keyword["sql_types"] == {sql_type: per_template for sql_type in ["SELECT", "INSERT", "UPDATE", "DELETE", "TRANSACTION", "COMMIT"]}
+    assert ilike["sql_types"]["SELECT"] == 3 * per_template
@@ -0,0 +1,52 @@
+from array import array
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, List, Tuple
+
+from tabulate import tabulate
+
+from pg_stats_tools.result import ResultSet
+
+
+class _Cursor:
+    """Server side cursor stand in: columns are described once rows are fetched"""
+
+    def __init__(self, columns: List[str], rows: List[Tuple[Any, ...]]) -> None:
+        self._columns = columns
+        self._rows = rows
+        self.description = None
+
+    def fetchmany(self, size: int) -> List[Tuple[Any, ...]]:
+        self.description = [(column,) for column in self._columns]
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+
+def test_result_set_from_cursor() -> None:
+    rows = [("public", "orders", 10, Decimal("1.50"), None), ("public", "items", 20, Decimal("2"), 1)]
+    result = ResultSet.from_cursor(_Cursor(["schema", "rel_name", "buffers", "pct", "maybe"], rows))
+    assert len(result) == 2
+    assert isinstance(result["buffers"], array) and result["buffers"].typecode == "q"
+    assert isinstance(result["pct"], array) and list(result["pct"]) == [1.5, 2.0]
+    assert result["maybe"] == [None, 1]
+    assert result["schema"][0] is result["schema"][1]
+    frame = result.to_pandas()
+    assert list(frame.columns) == ["schema", "rel_name", "buffers", "pct", "maybe"]
+    assert str(frame["buffers"].dtype) == "int64"
+    assert tabulate(result, headers="keys") == tabulate(frame, headers="keys", showindex=False)
+
+
+def test_result_set_to_csv(tmp_path: Path) -> None:
+    result = ResultSet(["a", "b"], [array("q", [1, 2]), ["x", None]])
+    result.to_csv(str(tmp_path / "result.csv"), index=False)
+    assert (tmp_path / "result.csv").read_text() == "a,b\n1,x\n2,\n"
+
+
+def test_result_set_batches_from_cursor() -> None:
+    rows = [(i, f"rel_{i}") for i in range(5)]
+    batches = list(ResultSet.batches_from_cursor(_Cursor(["buffers", "rel_name"], rows), batch_rows=2))
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert all(batch.columns == ["buffers", "rel_name"] for batch in batches)
+    assert list(batches[2]["buffers"]) == [4] and batches[2]["rel_name"] == ["rel_4"]
+    empty = list(ResultSet.batches_from_cursor(_Cursor(["buffers", "rel_name"], []), batch_rows=2))
+    assert len(empty) == 1 and empty[0].columns == ["buffers", "rel_name"] and empty[0].empty
@@ -0,0 +1,90 @@
+from decimal import Decimal
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from pg_stats_tools.guard import STATEMENT_TAG
+from pg_stats_tools.pg.stats.sql.reports import SQLStatsSimplifiedBySQLType, ToolFootprint
+
+pytest.importorskip("pyarrow")
+
+from pg_stats_tools.snapshot import Snapshot, write_snapshot  # noqa: E402
+
+
+def _statements() -> pd.DataFrame:
+    rows = [
+        ("SELECT 1", 10, 100.0, 5, 5),
+        ("  select * from t", 0, 0.0, 0, 0),
+        ("INSERT INTO t VALUES (1)", 2, 40.0, 0, 4),
+    ]
+    data = pd.DataFrame(rows, columns=["query", "calls", "total_time", "shared_blks_read", "shared_blks_hit"])
+    for column in ["local_blks_read", "temp_blks_read", "local_blks_hit", "shared_blks_written", "local_blks_written", "temp_blks_written"]:
+        data[column] = 0
+    return data.assign(
+        usename="app",
+        datname="db",
+        queryid=range(len(rows)),
+        rows=[Decimal(10), Decimal(0), Decimal(2)],
+        blk_read_time=0.0,
+        blk_write_time=0.0,
+    )
+
+
+def test_snapshot_round_trip(tmp_path: Path) -> None:
+    """Tables and metadata are read back from the snapshot file"""
+    path = str(tmp_path / "snapshot.tar")
+    write_snapshot(path, {"pg_stat_statements": _statements()}, {"captured_at": "2024-01-01T00:00:00+00:00"})
+    snapshot = Snapshot(path)
+    assert snapshot.tables() == ["pg_stat_statements"]
+    assert snapshot.captured_at is not None and snapshot.captured_at.year == 2024
+    assert list(snapshot.table("pg_stat_statements")["rows"]) == [10.0, 0.0, 2.0]
+    with pytest.raises(KeyError):
+        snapshot.table("pg_stat_activity")
+
+
+def test_simplified_report_from_snapshot(tmp_path: Path) -> None:
+    """Statements are classified by leading keyword and sorted with NULLs first, as the report query does"""
+    path = str(tmp_path / "snapshot.tar")
+    write_snapshot(path, {"pg_stat_statements": _statements()}, {})
+    report = SQLStatsSimplifiedBySQLType(
+        pg_conn_params={},
+        sql_types={"SELECT": "SELECT", "INSERT": "INSERT"},
+        top_stat_field="atime",
+        sort="DESC",
+        format="github",
+        dbname="_all",
+        count=10,
+    )
+    results = report.fetch_snapshot(Snapshot(path))
+    assert list(results["SELECT"]["queryid"]) == [1, 0]
+    assert list(results["SELECT"]["buff_blk_r_pct"]) == [-1.0, 50.0]
+    assert list(results["INSERT"]["atime"]) == [20.0]
+
+
+def test_tool_footprint_from_snapshot(tmp_path: Path) -> None:
+    """Only the statements tagged by the tool are accounted"""
+    statements = _statements()
+    statements.loc[2, "query"] = f"{STATEMENT_TAG}\nINSERT INTO t VALUES (1)"
+    path = str(tmp_path / "snapshot.tar")
+    write_snapshot(path, {"pg_stat_statements": statements}, {})
+    results = ToolFootprint(pg_conn_params={}).fetch_snapshot(Snapshot(path))
+    assert results["tool_footprint"][["entries", "calls", "total_time_ms"]].values.tolist() == [[1, 2, 40.0]]
+    assert results["statements"][["database", "statement"]].values.tolist() == [["db", "INSERT INTO t VALUES (1)"]]
+
+
+def test_snapshot_command_checks_pyarrow_before_capturing(monkeypatch: pytest.MonkeyPatch) -> None:
+    import typer
+
+    from pg_stats_tools.pg.snapshot import cli
+
+    def missing_pyarrow(purpose: str) -> None:
+        raise ImportError(f"pyarrow is needed to {purpose}")
+
+    def capture(*args: object) -> None:
+        raise AssertionError("statistics captured without pyarrow")
+
+    monkeypatch.setattr(cli, "import_pyarrow", missing_pyarrow)
+    monkeypatch.setattr(cli, "capture_snapshot", capture)
+    with pytest.raises(typer.BadParameter, match="write snapshots"):
+        cli.snapshot(output="unused.tar")
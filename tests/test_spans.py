@@ -0,0 +1,74 @@
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator
+
+import pytest
+
+from pg_stats_tools import spans
+from pg_stats_tools.pg.stats.reports import Report
+from pg_stats_tools.result import ReportData, ResultSet
+
+
+@pytest.fixture
+def profiling() -> Iterator[None]:
+    spans.enable()
+    yield
+    spans.disable()
+
+
+class _Report(Report):
+    @classmethod
+    def get_help(cls) -> str:
+        return ""
+
+    def get_name(self) -> str:
+        return "fake"
+
+    def fetch(self) -> Dict[str, ReportData]:
+        with spans.span("query"):
+            time.sleep(0.01)
+        return {"fake": ResultSet(["a"], [[1]])}
+
+    def show(self, results: Dict[str, Any]) -> None:
+        pass
+
+
+def test_spans_are_no_ops_when_disabled() -> None:
+    spans.disable()
+    with spans.span("query"):
+        pass
+    spans.record("db_borrow", time.monotonic())
+    assert spans.span("query") is spans.span("fetch_rows")
+    assert not any(span.name in ("query", "db_borrow") for span in spans.get_spans())
+
+
+def test_self_time_excludes_nested_spans(profiling: None) -> None:
+    with spans.span("query"):
+        start = time.monotonic()
+        time.sleep(0.02)
+        spans.record("db_borrow", start)
+        with spans.span("execute"):
+            time.sleep(0.02)
+    recorded = {span.name: span for span in spans.get_spans()}
+    assert [span.name for span in spans.get_spans()] == ["db_borrow", "execute", "query"]
+    assert recorded["query"].duration >= 0.04
+    assert recorded["query"].self_duration == pytest.approx(recorded["query"].duration - recorded["execute"].duration - recorded["db_borrow"].duration)
+
+
+def test_report_run_breakdown(profiling: None) -> None:
+    _Report().run()
+    rows = {row[0]: row for row in spans.breakdown()}
+    assert list(rows) == ["query", "fetch", "show", "report"]
+    assert rows["fetch"][1] == 1 and rows["fetch"][2] >= 0.01 and rows["fetch"][3] < 0.01
+
+
+def test_chrome_trace(profiling: None, tmp_path: Path) -> None:
+    _Report().run()
+    trace_file = tmp_path / "trace.json"
+    spans.write_trace(str(trace_file))
+    events = json.loads(trace_file.read_text())["traceEvents"]
+    report = next(event for event in events if event["name"] == "report")
+    query = next(event for event in events if event["name"] == "query")
+    assert report["ph"] == "X" and report["args"] == {"report": "fake"}
+    assert report["ts"] <= query["ts"] and query["ts"] + query["dur"] <= report["ts"] + report["dur"]
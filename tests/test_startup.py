@@ -0,0 +1,53 @@
+import subprocess
+import sys
+from typing import Dict
+
+import pytest
+
+# Report dependencies the cli must not import before a report runs
+HEAVY_MODULES = ["pandas", "numpy", "psycopg2", "sshtunnel", "paramiko", "jinja2", "tabulate", "boto3", "pyarrow", "sqlalchemy"]
+# Import time of the cli on top of typer (which brings click and rich), in microseconds. Only checked with --runslow,
+# wall clock times are not reliable on a loaded machine
+STARTUP_BUDGET_US = 50_000
+
+
+def _import_times(statement: str) -> Dict[str, int]:
+    """Cumulative import time of every module imported by statement, as reported by python -X importtime"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], capture_output=True, text=True, check=True)
+    times: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line and "cumulative" not in line:
+            _, cumulative, module = line.split("|")
+            times[module.strip()] = int(cumulative)
+    return times
+
+
+def test_cli_startup_is_lazy() -> None:
+    times = _import_times("import pg_stats_tools.main")
+    assert [module for module in HEAVY_MODULES if module in times] == []
+
+
+@pytest.mark.slow
+def test_cli_startup_time() -> None:
+    times = _import_times("import pg_stats_tools.main")
+    assert times["pg_stats_tools.main"] - times["typer"] < STARTUP_BUDGET_US
+
+
+def test_group_help_imports_no_report() -> None:
+    """Listing the subcommands of a group does not import them"""
+    statement = (
+        "from pg_stats_tools.main import app\n"
+        "try:\n"
+        "    app(['pg', 'stats', '--help'])\n"
+        "except SystemExit:\n"
+        "    pass\n"
+    )
+    times = _import_times(statement)
+    assert [module for module in HEAVY_MODULES if module in times] == []
+    assert "pg_stats_tools.pg.stats.sql.cli" not in times
+
+
+def test_bundle_reports_import_no_command_module() -> None:
+    """Bundles run the SQL reports without loading their typer commands"""
+    times = _import_times("import pg_stats_tools.pg.stats.bundle.reports")
+    assert "pg_stats_tools.pg.stats.sql.cli" not in times
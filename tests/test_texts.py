@@ -0,0 +1,50 @@
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+import pytest
+
+from pg_stats_tools.pg.stats.sql import texts
+from pg_stats_tools.pg.stats.sql.reports import SQLStatsBySQLType
+from pg_stats_tools.pg.stats.sql.texts import QueryTextCache, with_statement_keywords
+
+
+def test_query_text_cache_evicts_least_recently_used(tmp_path: Path) -> None:
+    """Reading an entry keeps it, the oldest unread entry is evicted first"""
+    cache = QueryTextCache(path=str(tmp_path / "texts.sqlite"), max_entries=2)
+    cache.put("db:5432", {(1, 10): "SELECT 1"})
+    cache.put("db:5432", {(1, 11): "SELECT 2"})
+    assert cache.get("db:5432", [(1, 10)]) == {(1, 10): "SELECT 1"}
+    cache.put("db:5432", {(1, 12): "SELECT 3"})
+    assert cache.get("db:5432", [(1, 10), (1, 11), (1, 12)]) == {(1, 10): "SELECT 1", (1, 12): "SELECT 3"}
+    assert cache.get("other:5432", [(1, 10)]) == {}
+
+
+def test_query_text_cache_keywords(tmp_path: Path) -> None:
+    """Keywords are cached without texts, a text put later keeps the keyword of its statement"""
+    cache = QueryTextCache(path=str(tmp_path / "texts.sqlite"))
+    cache.put_keywords("db:5432", {(1, 10): "SELECT", (1, 11): "INSERT"})
+    cache.put("db:5432", {(1, 11): "insert into t values (1)", (1, 12): "WITH x AS (SELECT 1) DELETE FROM t"})
+    assert cache.get_keywords("db:5432", [(1, 10), (1, 11), (1, 12)]) == {(1, 10): "SELECT", (1, 11): "INSERT", (1, 12): "DELETE"}
+    assert cache.get("db:5432", [(1, 10), (1, 11)]) == {(1, 11): "insert into t values (1)"}
+
+
+def test_texts_are_resolved_for_the_rows_shown(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Statements are ranked by their cached keywords, texts are only needed for the top rows"""
+    monkeypatch.setenv("PG_STATS_TOOLS_CACHE_DIR", str(tmp_path))
+
+    def execute_sql(**kvargs: Any) -> pd.DataFrame:
+        raise AssertionError("every keyword and text needed is cached")
+
+    monkeypatch.setattr(texts, "execute_sql", execute_sql)
+    cache = QueryTextCache()
+    cache.put_keywords("db:5432", {(1, 10): "SELECT", (1, 11): "SELECT", (1, 12): "INSERT"})
+    cache.put("db:5432", {(1, 10): "SELECT * FROM t", (1, 12): "INSERT INTO t VALUES (1)"})
+    statements = pd.DataFrame(
+        {"usename": "app", "datname": "db", "dbid": 1, "queryid": [10, 11, 12], "calls": 1, "rows": 1, "total_time": 1.0, "mean_time": [9.0, 1.0, 5.0]}
+    )
+    conn_params = {"db_host": "db", "db_port": 5432}
+    report = SQLStatsBySQLType(conn_params, sql_types={"SELECT": "SELECT", "INSERT": "INSERT"}, fetch_fields=["calls"], top_stat_field="mean_time", dbname="_all", count=1)
+    results = report.from_statements(with_statement_keywords(conn_params, statements))
+    assert results["SELECT"][["queryid", "query"]].values.tolist() == [[10, "SELECT * FROM t"]]
+    assert results["INSERT"][["queryid", "query"]].values.tolist() == [[12, "INSERT INTO t VALUES (1)"]]
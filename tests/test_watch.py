@@ -0,0 +1,19 @@
+import pandas as pd
+
+from pg_stats_tools.pg.stats.watch import row_keys
+from pg_stats_tools.psql import prepared_statement
+
+
+def test_prepared_statement() -> None:
+    """Placeholders become $n in order of first use, the name only depends on the text"""
+    name, sql, values = prepared_statement("SELECT 1 WHERE a = %(a)s AND b = %(b)s AND c = %(a)s LIMIT %(count)s", {"count": 5, "b": "x", "a": 1})
+    assert sql == "SELECT 1 WHERE a = $1 AND b = $2 AND c = $1 LIMIT $3"
+    assert values == [1, "x", 5]
+    assert prepared_statement("SELECT 1 WHERE a = %(a)s AND b = %(b)s AND c = %(a)s LIMIT %(count)s", {"count": 9, "b": "y", "a": 2})[0] == name
+
+
+def test_row_keys_ignore_volatile_columns() -> None:
+    first = pd.DataFrame({"query": ["SELECT 1", "UPDATE t"], "time_running": ["1s", "2s"], "state": ["active", "active"]})
+    second = pd.DataFrame({"query": ["SELECT 1", "UPDATE t"], "time_running": ["2s", "3s"], "state": ["active", "idle in transaction"]})
+    previous = set(row_keys(first, ["time_running"]))
+    assert [key in previous for key in row_keys(second, ["time_running"])] == [True, False]